@@ -1,17 +1,40 @@
 # app/__init__.py
 from flask import Flask
-from .routes import main
-from .auth import auth
 
 
-def create_app():
+def create_app(preload_model=False):
+    """Tworzy aplikację. ``preload_model=True`` ładuje model synchronicznie
+    (serwer produkcyjny robi to w procesie głównym przed fork)."""
+    # import dopiero tutaj, żeby `python -m app.<moduł>` nie ładował modelu rekomendacji
+    from .routes import main
+    from .auth import auth
+    from .admin import admin
+    from .recommender import load_model, start_background_load, sync_model_with_current
+    from .threads import limit_native_threads, log_parallelism
+
+    # limit wątków BLAS/OpenMP przed pierwszymi obliczeniami (dziedziczony przez procesy robocze)
+    limit_native_threads()
+
     app = Flask(__name__)
     app.secret_key = 'tajny_klucz'
-    
+
 
 
     # rejestracja blueprintów
     app.register_blueprint(main)
     app.register_blueprint(auth)
+    app.register_blueprint(admin)
+
+    @app.before_request
+    def follow_current_model_version():
+        # procesy robocze przechodzą na wersję modelu zbudowaną przez inny proces
+        sync_model_with_current()
+
+    if preload_model:
+        load_model()
+    else:
+        # model rekomendacji ładuje się w tle - logowanie i listy działają od razu
+        start_background_load()
+    log_parallelism()
 
-    return app
\ No newline at end of file
+    return app
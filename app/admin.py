@@ -0,0 +1,242 @@
+# admin.py
+"""Endpointy administracyjne modelu rekomendacji i ich klient CLI.
+
+    GET  /admin/model          - serwowana wersja i stan ostatniej przebudowy
+    POST /admin/model/reload   - przebudowa w tle i podmiana modelu bez przestoju
+    GET  /admin/memory         - pamięć (RSS) tego procesu i pozostałych procesów roboczych
+    GET  /admin/signals        - kolejka i zapis ocen niejawnych (app/signals.py) w tym procesie
+    GET  /admin/feed           - listy "For You" (app/feed.py) trzymane w tym procesie
+    GET  /admin/admission      - pula obliczeń rekomendacji: kolejka, odmowy, czas w kolejce i obliczeń
+    GET  /admin/parallelism    - procesy x wątki obliczeń x wątki natywne (BLAS/OpenMP) tego procesu
+    GET  /admin/cache          - pamięć podręczna wyników rekomendacji w tym procesie (trafienia, usunięcia, scalone obliczenia)
+
+Dostęp wymaga nagłówka ``X-Admin-Token`` zgodnego z MOVIEMANIAC_ADMIN_TOKEN
+(bez ustawionego tokenu endpointy są wyłączone).
+
+CLI: ``python -m app.admin status|reload|memory [--force] [--url URL] [--token TOKEN]``.
+"""
+import argparse
+import hmac
+import json
+import os
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from flask import Blueprint, jsonify, request
+
+from .config import ADMIN_TOKEN, ADMIN_URL, MODEL_DIR
+
+admin = Blueprint('admin', __name__, url_prefix='/admin')
+
+
+@admin.before_request
+def require_admin_token():
+    if not ADMIN_TOKEN:
+        return jsonify({'error': 'Endpointy administracyjne są wyłączone (brak MOVIEMANIAC_ADMIN_TOKEN)'}), 403
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN):
+        return jsonify({'error': 'Nieprawidłowy token administratora'}), 401
+    return None
+
+
+@admin.route('/model', methods=['GET'])
+def model_status():
+    from .recommender import get_status
+    return jsonify(get_status())
+
+
+@admin.route('/model/reload', methods=['POST'])
+def model_reload():
+    from .recommender import get_status, start_reload
+
+    data = request.get_json(silent=True) or {}
+    force = bool(data.get('force')) or request.args.get('force') == '1'
+    reload_id = start_reload(force=force)
+    status = get_status()
+    status['reload_started'] = reload_id is not None
+    status['reload_id'] = reload_id
+    return jsonify(status), (202 if reload_id else 409)
+
+
+# --- Pamięć procesów ---
+STATUS_FIELDS = ('VmRSS', 'RssAnon', 'RssFile', 'RssShmem')
+
+
+def _read_kb_fields(path, fields):
+    values = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            key, _, rest = line.partition(':')
+            if key in fields:
+                values[key] = int(rest.split()[0])
+    return values
+
+
+def _model_mapping_kb(pid, model_dir):
+    """Rss i Pss stron plików artefaktu zmapowanych przez proces (z /proc/<pid>/smaps)."""
+    model_dir = os.path.realpath(model_dir)
+    totals = {'Rss': 0, 'Pss': 0}
+    in_model = False
+    with open(f'/proc/{pid}/smaps', encoding='utf-8') as f:
+        for line in f:
+            key, _, rest = line.partition(':')
+            if ' ' not in key:
+                if key in totals and in_model:
+                    totals[key] += int(rest.split()[0])
+                continue
+            # nagłówek mapowania: "adres uprawnienia offset urządzenie inode [ścieżka]"
+            parts = line.split(None, 5)
+            in_model = len(parts) == 6 and parts[5].strip().startswith(model_dir + os.sep)
+    return totals
+
+
+def process_memory(pid, model_dir=MODEL_DIR):
+    """Pamięć procesu w MB: RSS z podziałem na anonimową/plikową/współdzieloną,
+    PSS (strony współdzielone podzielone między procesy) i udział mapowań artefaktu."""
+    status = _read_kb_fields(f'/proc/{pid}/status', STATUS_FIELDS)
+    rollup = _read_kb_fields(f'/proc/{pid}/smaps_rollup', ('Pss',))
+    model = _model_mapping_kb(pid, model_dir)
+    mb = lambda kb: round(kb / 1024, 1)
+    return {
+        'pid': pid,
+        'rss_mb': mb(status.get('VmRSS', 0)),
+        'rss_anon_mb': mb(status.get('RssAnon', 0)),
+        'rss_file_mb': mb(status.get('RssFile', 0)),
+        'rss_shmem_mb': mb(status.get('RssShmem', 0)),
+        'pss_mb': mb(rollup.get('Pss', 0)),
+        'model_rss_mb': mb(model['Rss']),
+        'model_pss_mb': mb(model['Pss'])
+    }
+
+
+def _sibling_workers():
+    """Procesy z tym samym rodzicem i tą samą linią poleceń (pozostałe procesy robocze serwera)."""
+    ppid = os.getppid()
+    with open('/proc/self/cmdline', 'rb') as f:
+        cmdline = f.read()
+    pids = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit() or int(entry) == os.getpid():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', encoding='utf-8') as f:
+                parent = int(f.read().rsplit(')', 1)[1].split()[1])
+            with open(f'/proc/{entry}/cmdline', 'rb') as f:
+                same_command = f.read() == cmdline
+        except (OSError, IndexError, ValueError):
+            continue
+        if parent == ppid and same_command:
+            pids.append(int(entry))
+    return sorted(pids)
+
+
+@admin.route('/memory', methods=['GET'])
+def memory():
+    if not os.path.exists('/proc/self/smaps_rollup'):
+        return jsonify({'error': 'Statystyki pamięci dostępne tylko na Linuksie (/proc)'}), 501
+    workers = []
+    for pid in _sibling_workers():
+        try:
+            workers.append(process_memory(pid))
+        except OSError:  # proces zakończył się w międzyczasie
+            continue
+    return jsonify({
+        'self': process_memory(os.getpid()),
+        'workers': workers
+    })
+
+
+@admin.route('/signals', methods=['GET'])
+def signals():
+    from .signals import signal_writer
+    return jsonify(signal_writer.stats())
+
+
+@admin.route('/feed', methods=['GET'])
+def feed():
+    from .feed import feed_cache
+    return jsonify(feed_cache.stats())
+
+
+@admin.route('/admission', methods=['GET'])
+def admission():
+    from .admission import recommendation_executor
+    return jsonify(recommendation_executor.stats())
+
+
+@admin.route('/parallelism', methods=['GET'])
+def parallelism():
+    from .threads import parallelism_report
+    return jsonify(parallelism_report())
+
+
+@admin.route('/cache', methods=['GET'])
+def cache():
+    from .recommender import get_status, recommendation_cache, recommendation_flights
+    return jsonify(dict(recommendation_cache.stats(), version=get_status()['version'],
+                        single_flight=recommendation_flights.stats()))
+
+
+# --- CLI ---
+def _call(url, token, method='GET', payload=None):
+    body = json.dumps(payload).encode('utf-8') if payload is not None else None
+    req = urllib.request.Request(url, data=body, method=method, headers={
+        'X-Admin-Token': token,
+        'Content-Type': 'application/json'
+    })
+    try:
+        with urllib.request.urlopen(req, timeout=30) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m app.admin', description="Zarządzanie modelem działającej aplikacji")
+    parser.add_argument('command', choices=['status', 'reload', 'memory'])
+    parser.add_argument('--url', default=ADMIN_URL, help="adres aplikacji")
+    parser.add_argument('--token', default=ADMIN_TOKEN, help="token administratora")
+    parser.add_argument('--force', action='store_true', help="przebuduj artefakt nawet jeśli jest aktualny")
+    parser.add_argument('--no-wait', action='store_true', help="nie czekaj na zakończenie przebudowy")
+    args = parser.parse_args(argv)
+    base = args.url.rstrip('/') + '/admin/model'
+
+    if args.command in ('status', 'memory'):
+        url = base if args.command == 'status' else args.url.rstrip('/') + '/admin/memory'
+        code, status = _call(url, args.token)
+        print(json.dumps(status, indent=2, ensure_ascii=False))
+        return 0 if code == 200 else 1
+
+    code, status = _call(base + '/reload', args.token, 'POST', {'force': args.force})
+    if code != 202:
+        print(f"BŁĄD: przebudowa nie została uruchomiona ({code}): {status.get('error') or status.get('last_reload')}")
+        return 1
+    reload_id = status.get('reload_id')
+    print(f"ADMIN INFO: Przebudowa {reload_id} uruchomiona, serwowana wersja: {status.get('version')}")
+    if args.no_wait:
+        return 0
+
+    # stan przebudowy leży w katalogu modelu, więc odpowiada każdy proces roboczy;
+    # czekamy na zakończenie tej przebudowy (nowsza oznacza, że ta już się skończyła)
+    while True:
+        time.sleep(2)
+        code, status = _call(base, args.token)
+        reload_state = status.get('last_reload') or {}
+        if code == 200 and reload_state.get('id') == reload_id and reload_state.get('state') == 'running':
+            continue
+        if code == 200 and reload_state.get('id') is not None:
+            break
+    if reload_state.get('id') != reload_id:
+        print(f"ADMIN INFO: Przebudowa {reload_id} zakończona; trwa już kolejna ({reload_state.get('id')}).")
+        return 0
+    # pozostałe procesy robocze przechodzą na opublikowaną wersję w ciągu MOVIEMANIAC_MODEL_SYNC_INTERVAL s
+    print(f"ADMIN INFO: Przebudowa: {reload_state.get('state')}, opublikowana wersja: {reload_state.get('version')}")
+    if reload_state.get('state') in ('failed', 'interrupted'):
+        print(f"BŁĄD: {reload_state.get('error') or 'przebudowa przerwana'}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
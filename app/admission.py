@@ -0,0 +1,123 @@
+# admission.py
+"""Kontrola dostępu do ciężkich obliczeń rekomendacji.
+
+Obliczenia (wyszukiwanie sąsiadów przy chybieniu pamięci podręcznej, zapytania
+wsadowe) wykonuje osobna pula ``RECOMMEND_MAX_CONCURRENCY`` wątków z kolejką
+o głębokości ``RECOMMEND_MAX_QUEUE``. Żądanie ponad limit kolejki albo takie,
+które czekało w kolejce dłużej niż ``RECOMMEND_QUEUE_TIMEOUT`` s, dostaje od
+razu ``Overloaded`` - trasy odpowiadają wtedy 503 z ``Retry-After`` albo
+popularnymi filmami, a tanie strony (listy, logowanie) nie czekają za skokiem
+ruchu na rekomendacje.
+
+Czas oczekiwania w kolejce i czas obliczenia mierzone są osobno (``stats()``).
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .config import RECOMMEND_MAX_CONCURRENCY, RECOMMEND_MAX_QUEUE, RECOMMEND_QUEUE_TIMEOUT
+from .threads import limit_native_threads
+
+
+class Overloaded(Exception):
+    """Brak miejsca w kolejce obliczeń rekomendacji albo zbyt długie oczekiwanie."""
+
+
+def _percentiles(samples):
+    if not samples:
+        return {'p50_ms': None, 'p99_ms': None}
+    values = np.fromiter(samples, dtype=np.float64) * 1000
+    return {'p50_ms': round(float(np.percentile(values, 50)), 3),
+            'p99_ms': round(float(np.percentile(values, 99)), 3)}
+
+
+class BoundedExecutor:
+    """Pula wątków z ograniczoną kolejką; ``run`` wykonuje funkcję w puli i czeka na wynik.
+
+    Pula tworzona jest leniwie w każdym procesie (wątki nie przechodzą przez fork).
+    """
+
+    def __init__(self, max_workers=RECOMMEND_MAX_CONCURRENCY, max_queue=RECOMMEND_MAX_QUEUE,
+                 queue_timeout=RECOMMEND_QUEUE_TIMEOUT, samples=1000):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._pending = 0
+        self._running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._queue_wait = deque(maxlen=samples)
+        self._compute = deque(maxlen=samples)
+
+    def _get_executor(self):
+        if self._executor is None or self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._pending = self._running = 0
+            # limit wątków natywnych ustawiany też w każdym wątku puli (OpenMP liczy go per wątek)
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='recommend',
+                                                initializer=limit_native_threads)
+        return self._executor
+
+    def _finished(self, future):
+        with self._lock:
+            self._pending -= 1
+
+    def run(self, fn, *args, **kwargs):
+        """Wynik ``fn(*args, **kwargs)`` policzony w puli; Overloaded, gdy nie ma miejsca lub czasu."""
+        with self._lock:
+            executor = self._get_executor()
+            if self._pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise Overloaded("Kolejka obliczeń rekomendacji jest pełna")
+            self._pending += 1
+
+        started = threading.Event()
+        timing = {'enqueued': time.perf_counter()}
+
+        def task():
+            timing['started'] = time.perf_counter()
+            started.set()
+            with self._lock:
+                self._running += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                finished = time.perf_counter()
+                with self._lock:
+                    self._running -= 1
+                    self.completed += 1
+                    self._queue_wait.append(timing['started'] - timing['enqueued'])
+                    self._compute.append(finished - timing['started'])
+
+        future = executor.submit(task)
+        future.add_done_callback(self._finished)
+        if not started.wait(self.queue_timeout) and future.cancel():
+            with self._lock:
+                self.timed_out += 1
+            raise Overloaded("Zbyt długie oczekiwanie w kolejce obliczeń rekomendacji")
+        return future.result()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'running': self._running,
+                'queued': max(0, self._pending - self._running),
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'queue_wait': _percentiles(self._queue_wait),
+                'compute': _percentiles(self._compute),
+            }
+
+
+recommendation_executor = BoundedExecutor()
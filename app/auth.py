@@ -10,7 +10,7 @@ def get_db_connection():
     conn.row_factory = sqlite3.Row
     return conn'''
 
-DATABASE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'movielens.db')
+from .config import DATABASE_PATH
 
 
 def get_db_connection():
@@ -0,0 +1,179 @@
+# cache.py
+"""Pamięć podręczna w procesie: LRU z limitem liczby wpisów i/lub bajtów
+oraz opcjonalnym czasem życia wpisu.
+
+Bezpieczna dla wątków (serwer gthread). Każdy proces roboczy ma własną kopię -
+wartości muszą dać się odtworzyć po chybieniu. Liczniki trafień, chybień
+i usunięć służą do strojenia limitów (``stats()``).
+
+``SingleFlight`` scala współbieżne obliczenia tej samej wartości - przy
+chybieniu liczy ją jeden wątek, a pozostałe czekają na jego wynik.
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+def estimate_size(value):
+    """Przybliżony rozmiar wartości w bajtach (listy, krotki, zbiory i słowniki liczone rekurencyjnie)."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(v) for v in value)
+    return size
+
+
+class LRUCache:
+    """``max_entries`` / ``max_bytes`` - None oznacza brak limitu; ``ttl`` w sekundach (None = bez wygasania)."""
+
+    def __init__(self, max_entries=None, max_bytes=None, ttl=None, sizeof=estimate_size):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.rejected = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def _remove(self, key):
+        _, size, _ = self._data.pop(key)
+        self.bytes -= size
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            expires_at, _, value = item
+            if expires_at is not None and expires_at < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        size = self.sizeof(value)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                # wartość większa niż cały limit - nie wypychamy dla niej wszystkiego
+                self.rejected += 1
+                return
+            expires_at = time.monotonic() + self.ttl if self.ttl else None
+            self._data[key] = (expires_at, size, value)
+            self.bytes += size
+            while ((self.max_entries is not None and len(self._data) > self.max_entries)
+                   or (self.max_bytes is not None and self.bytes > self.max_bytes)):
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+
+    def clear(self):
+        """Usuwa wszystkie wpisy (np. po podmianie modelu)."""
+        with self._lock:
+            self.invalidations += len(self._data)
+            self._data.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._data),
+                'bytes': self.bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'rejected': self.rejected,
+            }
+
+
+class _Flight:
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Scala współbieżne obliczenia o tym samym kluczu.
+
+    Pierwsze wywołanie ``do(key, fn)`` liczy ``fn()``, a wywołania z tym samym
+    kluczem, które przyjdą w trakcie, czekają na nie i dostają ten sam wynik
+    (albo ten sam wyjątek). ``coalesced`` to liczba zaoszczędzonych obliczeń.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.calls = 0
+        self.computations = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.max_waiters = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            self.calls += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                flight.waiters += 1
+                self.coalesced += 1
+                self.max_waiters = max(self.max_waiters, flight.waiters)
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+        except Exception as e:
+            flight.error = e
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                self.computations += 1
+                del self._flights[key]
+            flight.done.set()
+        return flight.result
+
+    def stats(self):
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'computations': self.computations,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._flights),
+                'max_waiters': self.max_waiters,
+                'errors': self.errors,
+            }
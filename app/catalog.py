@@ -0,0 +1,69 @@
+# catalog.py
+"""Katalog filmów w pamięci: kolumny jako tablice indeksowane numerem wiersza.
+
+Dane pochodzą z artefaktu modelu (mmap), więc katalog nie kopiuje napisów
+do pamięci procesu. Wyszukiwanie po movie_id i po tytule to wyszukiwanie
+binarne po zapisanej w artefakcie kolejności sortowania, a odczyt kolumn
+dla k kandydatów to k odwołań do tablic - bez skanowania DataFrame'u.
+"""
+import bisect
+
+import numpy as np
+
+
+class Catalog:
+
+    def __init__(self, artifact):
+        self.movie_ids = artifact.catalog_movie_id
+        self.titles = artifact.catalog['title']
+        self.clean_titles_lc = artifact.catalog['clean_title_lc']
+        self.norm_titles = artifact.catalog['norm_title']
+        self.overviews = artifact.catalog['overview']
+        self.poster_paths = artifact.catalog['poster_path']
+        self._id_order = artifact.catalog_id_order
+        self._sorted_ids = self.movie_ids[self._id_order]
+        self._orders = artifact.catalog_orders
+        self._matrix_rows = artifact.matrix_catalog_rows
+        self.titles_json_path = artifact.catalog_titles_path
+
+    def __len__(self):
+        return len(self.movie_ids)
+
+    # --- Wyszukiwanie wiersza ---
+    def row_for_id(self, movie_id):
+        """Wiersz katalogu dla movie_id albo None."""
+        try:
+            pos = int(np.searchsorted(self._sorted_ids, movie_id))
+        except (TypeError, ValueError):
+            return None
+        if pos < len(self._sorted_ids) and self._sorted_ids[pos] == movie_id:
+            return int(self._id_order[pos])
+        return None
+
+    def _row_for_string(self, column, values, value):
+        order = self._orders[column]
+        pos = bisect.bisect_left(order, (False, value), key=lambda row: (values.nulls[row], values[row] or ''))
+        if pos < len(order) and values[order[pos]] == value:
+            return int(order[pos])
+        return None
+
+    def row_for_title(self, title):
+        """Pierwszy wiersz z dokładnie takim tytułem (z rokiem) albo None."""
+        return self._row_for_string('title', self.titles, title)
+
+    def row_for_clean_title(self, clean_title_lc):
+        """Pierwszy wiersz o danym clean_title_lc albo None."""
+        return self._row_for_string('clean_title_lc', self.clean_titles_lc, clean_title_lc)
+
+    def rows_for_matrix_rows(self, matrix_rows):
+        """Wiersze katalogu dla wierszy macierzy ocen (-1, gdy filmu nie ma w katalogu)."""
+        return self._matrix_rows[np.asarray(matrix_rows, dtype=np.int64)]
+
+    # --- Odczyt ---
+    def movie(self, row):
+        return {
+            "id": int(self.movie_ids[row]),
+            "title": self.titles[row],
+            "overview": self.overviews[row],
+            "poster_path": self.poster_paths[row]
+        }
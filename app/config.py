@@ -0,0 +1,106 @@
+# config.py
+import os
+
+BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Ścieżki można nadpisać zmiennymi środowiskowymi (np. w kontenerze)
+DATABASE_PATH = os.environ.get('MOVIEMANIAC_DB', os.path.join(BASE_DIR, 'movielens.db'))
+MODEL_DIR = os.environ.get('MOVIEMANIAC_MODEL_DIR', os.path.join(BASE_DIR, 'model'))
+
+# Ile poprzednich wersji artefaktu modelu zostawiać na dysku
+MODEL_KEEP_VERSIONS = int(os.environ.get('MOVIEMANIAC_MODEL_KEEP_VERSIONS', 2))
+
+# Liczba wierszy ocen czytanych z bazy naraz przy budowie modelu (strumieniowo, kursorem)
+RATINGS_CHUNK_SIZE = int(os.environ.get('MOVIEMANIAC_RATINGS_CHUNK_SIZE', 200000))
+
+# Kolumnowa kopia tabel ocen (app/ratings_store.py) czytana przy pełnej budowie modelu
+# zamiast SQLite; pusta wartość = budowa czyta oceny wprost z bazy
+RATINGS_STORE_DIR = os.environ.get('MOVIEMANIAC_RATINGS_STORE_DIR', os.path.join(BASE_DIR, 'ratings_store'))
+
+# Źródło sąsiadów w get_recommendations (app/neighbors.py):
+#   'knn'         - dokładny kosinus (ExactBackend): rzadkie mnożenie macierz-wektor na macierzy
+#                   z artefaktu (mmap), bez kopii NearestNeighbors w pamięci procesu
+#   'precomputed' - odczyt z tabeli similar_movies (python -m app.similarity)
+#   'lsh'         - przybliżony indeks LSH zapisany w artefakcie modelu
+#   'svd'         - gęste osadzenia filmów (obcięte SVD) zapisane w artefakcie modelu
+RECOMMENDER_BACKEND = os.environ.get('MOVIEMANIAC_RECOMMENDER_BACKEND', 'knn')
+
+# Pokrętła indeksu LSH (recall <-> opóźnienie): długość szkicu w bitach
+# (wielokrotność 64, zapisywana w indeksie) i liczba kandydatów do dokładnego rankingu
+LSH_BITS = int(os.environ.get('MOVIEMANIAC_LSH_BITS', 512))
+LSH_CANDIDATES = int(os.environ.get('MOVIEMANIAC_LSH_CANDIDATES', 1000))
+
+# Liczba sąsiadów zapisywanych dla każdego filmu w tabeli similar_movies
+SIMILAR_TOP_K = int(os.environ.get('MOVIEMANIAC_SIMILAR_TOP_K', 100))
+
+# Wymiar osadzeń filmów dla backendu 'svd'
+SVD_DIM = int(os.environ.get('MOVIEMANIAC_SVD_DIM', 128))
+
+# Kursor "pokaż więcej" rekomendacji: długość listy rankingowej liczonej raz na film
+RECOMMEND_CURSOR_DEPTH = int(os.environ.get('MOVIEMANIAC_RECOMMEND_CURSOR_DEPTH', 200))
+
+# Pamięć podręczna wyników rekomendacji w procesie (LRU): limit bajtów i wpisów,
+# czas życia wpisu w s (0 = bez limitu / bez wygasania) oraz liczba najczęściej
+# ocenianych filmów, których listy liczone są z góry po załadowaniu modelu
+RECOMMEND_CACHE_MAX_BYTES = int(os.environ.get('MOVIEMANIAC_RECOMMEND_CACHE_MAX_BYTES', 64 * 2 ** 20))
+RECOMMEND_CACHE_MAX_ENTRIES = int(os.environ.get('MOVIEMANIAC_RECOMMEND_CACHE_MAX_ENTRIES', 10000))
+RECOMMEND_CACHE_TTL = float(os.environ.get('MOVIEMANIAC_RECOMMEND_CACHE_TTL', 900))
+RECOMMEND_WARMUP_MOVIES = int(os.environ.get('MOVIEMANIAC_RECOMMEND_WARMUP_MOVIES', 100))
+
+# GET /api/movies/<id>/similar: największe n i czas (s), przez jaki przeglądarki/proxy
+# mogą trzymać odpowiedź bez pytania serwera (potem walidacja ETagiem - wersją modelu)
+SIMILAR_MAX_N = int(os.environ.get('MOVIEMANIAC_SIMILAR_MAX_N', 50))
+SIMILAR_MAX_AGE = int(os.environ.get('MOVIEMANIAC_SIMILAR_MAX_AGE', 300))
+
+# Limity zapytania POST /api/recommendations/batch (liczba filmów i rekomendacji na film)
+BATCH_MAX_SEEDS = int(os.environ.get('MOVIEMANIAC_BATCH_MAX_SEEDS', 500))
+BATCH_MAX_N = int(os.environ.get('MOVIEMANIAC_BATCH_MAX_N', 50))
+
+# Token endpointów administracyjnych (nagłówek X-Admin-Token); pusty = endpointy wyłączone
+ADMIN_TOKEN = os.environ.get('MOVIEMANIAC_ADMIN_TOKEN', '')
+# Adres działającej aplikacji dla `python -m app.admin`
+ADMIN_URL = os.environ.get('MOVIEMANIAC_ADMIN_URL', 'http://127.0.0.1:5000')
+
+# Co ile sekund proces sprawdza plik `current` w MODEL_DIR i przechodzi na nowszą
+# wersję zbudowaną przez inny proces (0 = nie sprawdza)
+MODEL_SYNC_INTERVAL = float(os.environ.get('MOVIEMANIAC_MODEL_SYNC_INTERVAL', 30))
+
+# Serwer produkcyjny (python -m app.serve, gunicorn)
+SERVE_BIND = os.environ.get('MOVIEMANIAC_BIND', '0.0.0.0:5000')
+SERVE_WORKERS = int(os.environ.get('MOVIEMANIAC_WORKERS', os.cpu_count() or 1))
+SERVE_THREADS = int(os.environ.get('MOVIEMANIAC_THREADS', 4))
+# recykling procesu roboczego po N żądaniach (+ losowy rozrzut, żeby nie restartowały się naraz)
+SERVE_MAX_REQUESTS = int(os.environ.get('MOVIEMANIAC_MAX_REQUESTS', 1000))
+SERVE_MAX_REQUESTS_JITTER = int(os.environ.get('MOVIEMANIAC_MAX_REQUESTS_JITTER', 100))
+# limit czasu żądania i czas na dokończenie żądań przy restarcie (sekundy)
+SERVE_TIMEOUT = int(os.environ.get('MOVIEMANIAC_TIMEOUT', 30))
+SERVE_GRACEFUL_TIMEOUT = int(os.environ.get('MOVIEMANIAC_GRACEFUL_TIMEOUT', 30))
+
+# Kontrola dostępu do obliczeń rekomendacji (app/admission.py): liczba wątków
+# obliczeniowych na proces (domyślnie rdzenie podzielone między procesy robocze),
+# głębokość kolejki, najdłuższe oczekiwanie w kolejce (s) i wartość nagłówka
+# Retry-After odpowiedzi 503
+RECOMMEND_MAX_CONCURRENCY = int(os.environ.get('MOVIEMANIAC_RECOMMEND_MAX_CONCURRENCY',
+                                               max(1, (os.cpu_count() or 1) // max(1, SERVE_WORKERS))))
+RECOMMEND_MAX_QUEUE = int(os.environ.get('MOVIEMANIAC_RECOMMEND_MAX_QUEUE', 16))
+RECOMMEND_QUEUE_TIMEOUT = float(os.environ.get('MOVIEMANIAC_RECOMMEND_QUEUE_TIMEOUT', 2.0))
+RECOMMEND_RETRY_AFTER = int(os.environ.get('MOVIEMANIAC_RECOMMEND_RETRY_AFTER', 2))
+
+# Limit wątków natywnych (BLAS/OpenMP) na proces, app/threads.py;
+# 0 = rdzenie / (procesy robocze x wątki obliczeniowe), co najmniej 1
+NATIVE_THREADS = int(os.environ.get('MOVIEMANIAC_NATIVE_THREADS', 0))
+
+# Oceny niejawne z sygnałów aplikacji (app/signals.py): zapis partiami co N s / po N zdarzeniach,
+# nakładanie na model co N s (0 = tylko przez `python -m app.model_store update`)
+SIGNALS_FLUSH_INTERVAL = float(os.environ.get('MOVIEMANIAC_SIGNALS_FLUSH_INTERVAL', 1.0))
+SIGNALS_BATCH_SIZE = int(os.environ.get('MOVIEMANIAC_SIGNALS_BATCH_SIZE', 1000))
+SIGNALS_QUEUE_SIZE = int(os.environ.get('MOVIEMANIAC_SIGNALS_QUEUE_SIZE', 100000))
+SIGNALS_FOLD_INTERVAL = float(os.environ.get('MOVIEMANIAC_SIGNALS_FOLD_INTERVAL', 300))
+
+# Lista "For You" (app/feed.py): długość, czas życia (s), odświeżanie w tle co N s dla
+# użytkowników aktywnych w ostatnich N s, limit list trzymanych w pamięci procesu
+FEED_SIZE = int(os.environ.get('MOVIEMANIAC_FEED_SIZE', 20))
+FEED_TTL = float(os.environ.get('MOVIEMANIAC_FEED_TTL', 600))
+FEED_REFRESH_INTERVAL = float(os.environ.get('MOVIEMANIAC_FEED_REFRESH_INTERVAL', 5))
+FEED_ACTIVE_WINDOW = float(os.environ.get('MOVIEMANIAC_FEED_ACTIVE_WINDOW', 1800))
+FEED_MAX_USERS = int(os.environ.get('MOVIEMANIAC_FEED_MAX_USERS', 10000))
@@ -1,9 +1,9 @@
 # db_utils.py
 import sqlite3
-import os
 from werkzeug.security import generate_password_hash
 
-DATABASE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'movielens.db')
+from .config import DATABASE_PATH
+from .signals import record_signal
 
 
 def get_db_connection():
@@ -44,6 +44,7 @@ def add_or_update_watchlist(user_id, movie_id, watched=0):
                 (user_id, movie_id, watched)
             )
         conn.commit()
+    record_signal(user_id, movie_id, 'watched' if watched else 'watchlist')
 
 
 
@@ -54,6 +55,7 @@ def remove_from_watchlist(user_id, movie_id):
             (user_id, movie_id)
         )
         conn.commit()
+    record_signal(user_id, movie_id, 'watchlist_removed')
 
 def update_watchlist_item(user_id, movie_id, watched=None):
     if watched is None:
@@ -65,6 +67,7 @@ def update_watchlist_item(user_id, movie_id, watched=None):
     with get_db_connection() as conn:
         conn.execute(query, params)
         conn.commit()
+    record_signal(user_id, movie_id, 'watched' if watched else 'watchlist')
     return True
 
 
@@ -78,6 +81,7 @@ def mark_movie_as_watched(user_id, movie_id):
     )
     conn.commit()
     conn.close()
+    record_signal(user_id, movie_id, 'watched')
 
 
 
@@ -87,6 +91,7 @@ def add_to_favorites(user_id, movie_id):
     with get_db_connection() as conn:
         conn.execute(query, [user_id, movie_id])
         conn.commit()
+    record_signal(user_id, movie_id, 'favorite')
     return True # już w ulubionych
 
 def remove_from_favorites(user_id, movie_id):
@@ -94,6 +99,7 @@ def remove_from_favorites(user_id, movie_id):
     with get_db_connection() as conn:
         conn.execute(query, [user_id, movie_id])
         conn.commit()
+    record_signal(user_id, movie_id, 'favorite_removed')
     return True
 
 def get_favorites_for_user(user_id):
@@ -0,0 +1,183 @@
+# feed.py
+"""Spersonalizowana lista "For You" z ulubionych i obejrzanych filmów użytkownika.
+
+Lista liczona jest w tle (``get_personalized_recommendations`` - jedno
+mnożenie macierz-wektor dla całej historii) i trzymana w pamięci procesu
+z czasem życia ``FEED_TTL``. Dashboard tylko odczytuje gotową listę, więc
+nigdy nie czeka na model; brak listy oznacza "w przygotowaniu".
+
+Wątek odświeżający co ``FEED_REFRESH_INTERVAL`` s liczy listy zamówione
+przy żądaniach oraz listy aktywnych użytkowników (widzianych w ostatnich
+``FEED_ACTIVE_WINDOW`` s), które wygasły, zostały unieważnione (nowy
+ulubiony/obejrzany film) albo pochodzą ze starszej wersji modelu.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from .config import (
+    DATABASE_PATH,
+    FEED_ACTIVE_WINDOW,
+    FEED_MAX_USERS,
+    FEED_REFRESH_INTERVAL,
+    FEED_SIZE,
+    FEED_TTL
+)
+from .recommender import get_personalized_recommendations, model_holder
+from .signals import SIGNAL_WEIGHTS
+
+
+def user_history(user_id, db_path=DATABASE_PATH):
+    """Seedy (ulubione + obejrzane, z wagami sygnałów) i wszystkie filmy znane użytkownikowi."""
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        favorites = {row[0] for row in conn.execute("SELECT movie_id FROM favorites WHERE user_id = ?", (user_id,))}
+        watchlist = conn.execute("SELECT movie_id, watched FROM watchlist WHERE user_id = ?", (user_id,)).fetchall()
+    finally:
+        conn.close()
+    weights = {movie_id: SIGNAL_WEIGHTS['watched'] for movie_id, watched in watchlist if watched}
+    weights.update({movie_id: SIGNAL_WEIGHTS['favorite'] for movie_id in favorites})
+    seen_ids = list(favorites | {movie_id for movie_id, _ in watchlist})
+    return list(weights), list(weights.values()), seen_ids
+
+
+def compute_feed(user_id, n=FEED_SIZE, db_path=DATABASE_PATH):
+    seed_ids, seed_weights, seen_ids = user_history(user_id, db_path)
+    if not seed_ids:
+        return []
+    return get_personalized_recommendations(seed_ids, seed_weights, seen_ids, n=n)
+
+
+class FeedEntry:
+
+    def __init__(self, items, version, computed_at):
+        self.items = items
+        self.version = version
+        self.computed_at = computed_at
+        self.stale = False
+
+
+class FeedCache:
+    """Listy "For You" w pamięci procesu i wątek, który je odświeża.
+
+    Wątek startuje leniwie przy pierwszym odczycie w danym procesie (także
+    w procesie roboczym po fork). ``get`` nigdy nie liczy listy sam - zwraca
+    ostatnią gotową (także przeterminowaną, do czasu przeliczenia) i zamawia
+    odświeżenie.
+    """
+
+    def __init__(self, db_path=DATABASE_PATH, n=FEED_SIZE, ttl=FEED_TTL, active_window=FEED_ACTIVE_WINDOW,
+                 refresh_interval=FEED_REFRESH_INTERVAL, max_users=FEED_MAX_USERS):
+        self.db_path = db_path
+        self.n = n
+        self.ttl = ttl
+        self.active_window = active_window
+        self.refresh_interval = refresh_interval
+        self.max_users = max_users
+        self._entries = {}
+        self._last_seen = {}
+        self._requested = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+        self.computed = 0
+        self.last_refresh_seconds = None
+
+    def _ensure_started(self):
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='feed-refresher', daemon=True)
+            self._thread.start()
+
+    def _needs_refresh(self, entry, now, version):
+        return (entry is None or entry.stale or now - entry.computed_at > self.ttl
+                or (version is not None and entry.version != version))
+
+    def get(self, user_id):
+        """Gotowa lista użytkownika albo None (zamówiona - będzie przy kolejnym odczycie)."""
+        self._ensure_started()
+        now = time.time()
+        model = model_holder.get()
+        with self._lock:
+            self._last_seen[user_id] = now
+            entry = self._entries.get(user_id)
+            if self._needs_refresh(entry, now, model.version if model is not None else None):
+                self._requested.add(user_id)
+                self._wakeup.set()
+        return entry.items if entry is not None else None
+
+    def invalidate(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                entry.stale = True
+            if user_id in self._last_seen:
+                self._requested.add(user_id)
+                self._wakeup.set()
+
+    def _due_users(self):
+        now = time.time()
+        model = model_holder.get()
+        version = model.version if model is not None else None
+        with self._lock:
+            for user_id, last_seen in list(self._last_seen.items()):
+                if now - last_seen > self.active_window:
+                    # nieaktywny użytkownik - lista nie jest już odświeżana ani trzymana
+                    del self._last_seen[user_id]
+                    self._entries.pop(user_id, None)
+                elif self._needs_refresh(self._entries.get(user_id), now, version):
+                    self._requested.add(user_id)
+            due, self._requested = self._requested, set()
+        return due
+
+    def refresh(self, user_id):
+        model = model_holder.get()
+        if model is None:
+            return None
+        entry = FeedEntry(compute_feed(user_id, self.n, self.db_path), model.version, time.time())
+        with self._lock:
+            if user_id in self._last_seen and (user_id in self._entries or len(self._entries) < self.max_users):
+                self._entries[user_id] = entry
+        self.computed += 1
+        return entry
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.refresh_interval)
+            self._wakeup.clear()
+            if model_holder.get() is None:
+                continue
+            start = time.time()
+            for user_id in self._due_users():
+                try:
+                    self.refresh(user_id)
+                except Exception as e:
+                    print(f"BŁĄD: Nie udało się przeliczyć listy For You użytkownika {user_id}: {e}")
+            self.last_refresh_seconds = round(time.time() - start, 3)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'users': len(self._entries),
+                'active_users': len(self._last_seen),
+                'pending': len(self._requested),
+                'computed': self.computed,
+                'last_refresh_seconds': self.last_refresh_seconds,
+            }
+
+
+feed_cache = FeedCache()
+
+
+def get_feed(user_id):
+    return feed_cache.get(user_id)
+
+
+def invalidate_feed(user_id):
+    feed_cache.invalidate(user_id)
@@ -0,0 +1,351 @@
+# ingest.py
+"""Tworzenie i odświeżanie movielens.db z plików MovieLens i zrzutu metadanych TMDB.
+
+Pliki czytane są strumieniowo (moduł csv) i zapisywane partiami
+``executemany`` w dużych transakcjach, z PRAGMA przyspieszającymi ładowanie
+(bez synchronizacji z dyskiem, dziennik w pamięci) - na czas ingestu baza
+nie powinna być używana przez aplikację.
+
+Kolumny pochodne (``clean_title``, ``clean_title_lc``, ``release_year``,
+gatunki rozdzielone ``|``) liczone są raz, tutaj. Oceny mają unikalny indeks
+(user_id, movie_id): ponowna ocena pary zastępuje poprzednią (najnowsza
+wygrywa, jak w modelu), więc w tabeli nie ma duplikatów.
+
+    python -m app.ingest --movies movies.csv --links links.csv --metadata tmdb.csv --ratings ratings.csv
+    python -m app.ingest --ratings ratings_new.csv      # dopisanie/aktualizacja samych ocen
+
+Pliki MovieLens: movies.csv (movieId,title,genres), links.csv
+(movieId,imdbId,tmdbId), ratings.csv (userId,movieId,rating,timestamp).
+Zrzut metadanych: CSV z kolumną ``id`` (TMDB) i m.in. overview, poster_path,
+vote_average, vote_count, keywords, tagline, status, release_date, runtime,
+budget, revenue, original_language, production_companies, production_countries,
+homepage; listy jako "a, b" albo jako lista słowników z kluczem ``name``.
+"""
+import argparse
+import ast
+import csv
+import os
+import re
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+
+from .config import DATABASE_PATH
+from .model_store import ensure_change_tracking
+from .signals import ensure_schema as ensure_signals_schema
+
+DEFAULT_BATCH_SIZE = 50000
+# liczba wierszy w jednej transakcji
+DEFAULT_COMMIT_ROWS = 1000000
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS movies (
+        movie_id INTEGER PRIMARY KEY, title TEXT, clean_title TEXT, clean_title_lc TEXT, genres TEXT,
+        overview TEXT, poster_path TEXT, release_year INTEGER, vote_average REAL, vote_count INTEGER,
+        keywords TEXT, tagline TEXT, status TEXT, release_date TEXT, runtime INTEGER, budget INTEGER,
+        revenue INTEGER, original_language TEXT, production_companies TEXT, production_countries TEXT,
+        homepage TEXT
+    );
+    CREATE TABLE IF NOT EXISTS ratings (user_id INTEGER, movie_id INTEGER, rating REAL, timestamp INTEGER);
+    CREATE TABLE IF NOT EXISTS users (
+        user_id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT, email TEXT, password TEXT
+    );
+    CREATE TABLE IF NOT EXISTS watchlist (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, movie_id INTEGER,
+        watched INTEGER DEFAULT 0, added_date TEXT DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE IF NOT EXISTS favorites (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, movie_id INTEGER,
+        added_date TEXT DEFAULT CURRENT_TIMESTAMP, UNIQUE(user_id, movie_id)
+    );
+"""
+
+MOVIE_COLUMNS = (
+    'movie_id', 'title', 'clean_title', 'clean_title_lc', 'genres', 'overview', 'poster_path', 'release_year',
+    'vote_average', 'vote_count', 'keywords', 'tagline', 'status', 'release_date', 'runtime', 'budget',
+    'revenue', 'original_language', 'production_companies', 'production_countries', 'homepage'
+)
+# kolumny liczone z samego movies.csv (bez metadanych)
+MOVIELENS_COLUMNS = ('title', 'clean_title', 'clean_title_lc', 'genres', 'release_year')
+# kolumny przepisywane ze zrzutu metadanych: kolumna -> konwersja
+METADATA_COLUMNS = {
+    'overview': str, 'poster_path': str, 'vote_average': float, 'vote_count': int, 'tagline': str,
+    'status': str, 'release_date': str, 'runtime': int, 'budget': int, 'revenue': int,
+    'original_language': str, 'homepage': str,
+}
+
+YEAR_PATTERN = re.compile(r'\((\d{4})\)')
+NO_GENRES = '(no genres listed)'
+
+
+# --- Kolumny pochodne ---
+def clean_title(title):
+    """Tytuł bez roku w nawiasach i nadmiarowych spacji (``normalize_title`` bez zmiany wielkości liter)."""
+    return re.sub(r'\s+', ' ', YEAR_PATTERN.sub('', title)).strip()
+
+
+def release_year(title, release_date=None):
+    """Rok z tytułu MovieLens "Tytuł (1995)", a gdy go brak - z daty premiery TMDB."""
+    years = YEAR_PATTERN.findall(title or '')
+    if years:
+        return int(years[-1])
+    if release_date and release_date[:4].isdigit():
+        return int(release_date[:4])
+    return None
+
+
+def _names(value):
+    """Elementy listy ze zrzutu: "a, b" albo "[{'id': 1, 'name': 'a'}, ...]"."""
+    value = (value or '').strip()
+    if not value:
+        return []
+    if value.startswith('['):
+        try:
+            items = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            return []
+        return [item['name'] if isinstance(item, dict) else str(item) for item in items]
+    return [part.strip() for part in value.split(',') if part.strip()]
+
+
+def _convert(value, kind):
+    if value is None or value == '':
+        return None
+    try:
+        return kind(float(value)) if kind is int else kind(value)
+    except ValueError:
+        return None
+
+
+def metadata_columns(record):
+    """Kolumny tabeli movies z wiersza zrzutu metadanych."""
+    columns = {column: _convert(record.get(column), kind) for column, kind in METADATA_COLUMNS.items()}
+    # słowa kluczowe jak w db_utils.get_all_keywords ("a, b"), firmy i kraje jak w widoku filmu ("a|b")
+    columns['keywords'] = ', '.join(_names(record.get('keywords'))) or None
+    columns['production_companies'] = '|'.join(_names(record.get('production_companies'))) or None
+    columns['production_countries'] = '|'.join(_names(record.get('production_countries'))) or None
+    return columns
+
+
+def movie_row(movie_id, title, genres, metadata=None):
+    metadata = metadata or {}
+    title_clean = clean_title(title)
+    row = dict(metadata, movie_id=movie_id, title=title, clean_title=title_clean, clean_title_lc=title_clean.lower(),
+               genres='' if genres == NO_GENRES else genres,
+               release_year=release_year(title, metadata.get('release_date')))
+    return tuple(row.get(column) for column in MOVIE_COLUMNS)
+
+
+# --- Ładowanie ---
+@contextmanager
+def bulk_load(conn):
+    """PRAGMA na czas ładowania (bez fsync, dziennik w pamięci, duży cache); potem przywraca poprzednie."""
+    journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    synchronous = conn.execute("PRAGMA synchronous").fetchone()[0]
+    conn.execute("PRAGMA journal_mode = MEMORY")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute("PRAGMA cache_size = -262144")  # 256 MB
+    try:
+        yield conn
+    finally:
+        conn.commit()
+        conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+        conn.execute(f"PRAGMA synchronous = {synchronous}")
+
+
+def _read_csv(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        yield from csv.DictReader(f)
+
+
+def _batches(rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Progress:
+    """Liczba wierszy i wiersze/s etapu (log co ``every`` wierszy)."""
+
+    def __init__(self, name, every=DEFAULT_COMMIT_ROWS):
+        self.name = name
+        self.every = every
+        self.rows = 0
+        self.start = time.time()
+        self._next = every
+
+    def add(self, n):
+        self.rows += n
+        if self.rows >= self._next:
+            self._next += self.every
+            print(f"INGEST INFO: {self.name}: {self.rows} wierszy ({self.rate():.0f} wierszy/s).")
+
+    def rate(self):
+        elapsed = time.time() - self.start
+        return self.rows / elapsed if elapsed > 0 else 0.0
+
+    def done(self):
+        print(f"INGEST INFO: {self.name}: {self.rows} wierszy w {time.time() - self.start:.1f}s "
+              f"({self.rate():.0f} wierszy/s).")
+        return {'rows': self.rows, 'seconds': round(time.time() - self.start, 3),
+                'rows_per_s': round(self.rate(), 1)}
+
+
+def read_links(path):
+    """movieId MovieLens -> id TMDB."""
+    links = {}
+    for record in _read_csv(path):
+        if record.get('tmdbId'):
+            links[int(record['movieId'])] = int(float(record['tmdbId']))
+    return links
+
+
+def read_metadata(path, tmdb_ids):
+    """Kolumny metadanych filmów o podanych id TMDB (pozostałe wiersze zrzutu są pomijane)."""
+    csv.field_size_limit(min(sys.maxsize, 2 ** 31 - 1))
+    progress = Progress('metadane')
+    metadata = {}
+    for record in _read_csv(path):
+        progress.add(1)
+        tmdb_id = _convert(record.get('id'), int)
+        if tmdb_id in tmdb_ids:
+            metadata[tmdb_id] = metadata_columns(record)
+    progress.done()
+    return metadata
+
+
+def ingest_movies(conn, movies_path, links_path=None, metadata_path=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Wstawia lub aktualizuje filmy z movies.csv (z metadanymi TMDB przez links.csv).
+
+    Istniejącym filmom nadpisuje tylko kolumny, które daje ten przebieg: bez
+    ``metadata_path`` - tylko kolumny z movies.csv, więc metadane TMDB
+    załadowane wcześniej zostają (rok z daty premiery też, gdy tytuł go nie ma).
+    """
+    links = read_links(links_path) if links_path else {}
+    metadata = read_metadata(metadata_path, set(links.values())) if metadata_path else {}
+
+    def rows():
+        for record in _read_csv(movies_path):
+            movie_id = int(record['movieId'])
+            yield movie_row(movie_id, record['title'], record['genres'], metadata.get(links.get(movie_id)))
+
+    columns = [column for column in MOVIE_COLUMNS if column != 'movie_id'
+               and (metadata_path or column in MOVIELENS_COLUMNS)]
+    updates = [f"{column} = excluded.{column}" if metadata_path or column != 'release_year'
+               else f"{column} = COALESCE(excluded.{column}, movies.{column})" for column in columns]
+    insert = (f"INSERT INTO movies ({', '.join(MOVIE_COLUMNS)}) VALUES ({', '.join('?' * len(MOVIE_COLUMNS))}) "
+              f"ON CONFLICT(movie_id) DO UPDATE SET {', '.join(updates)}")
+    progress = Progress('filmy')
+    for batch in _batches(rows(), batch_size):
+        conn.executemany(insert, batch)
+        progress.add(len(batch))
+    conn.commit()
+    return progress.done()
+
+
+def ensure_ratings_index(conn):
+    """Unikalny indeks (user_id, movie_id); wcześniejsze duplikaty usuwa (zostaje ostatnio dopisana ocena)."""
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'ratings_user_movie'").fetchone():
+        return 0
+    removed = conn.execute(
+        "DELETE FROM ratings WHERE rowid NOT IN (SELECT MAX(rowid) FROM ratings GROUP BY user_id, movie_id)"
+    ).rowcount
+    conn.execute("CREATE UNIQUE INDEX ratings_user_movie ON ratings (user_id, movie_id)")
+    conn.commit()
+    if removed:
+        print(f"INGEST INFO: Usunięto {removed} zduplikowanych ocen.")
+    return removed
+
+
+def ingest_ratings(conn, ratings_path, batch_size=DEFAULT_BATCH_SIZE, commit_rows=DEFAULT_COMMIT_ROWS):
+    """Dopisuje oceny z ratings.csv; ocena istniejącej pary zastępuje poprzednią (nowy rowid).
+
+    Zastąpienie (INSERT OR REPLACE) nie uruchamia wyzwalaczy licznika zmian,
+    więc dla modelu to dopisanie: ``update`` nakłada nową ocenę przyrostowo
+    (nadpisuje starą ocenę pary), bez pełnej budowy.
+    """
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(ratings)")}
+    missing = [column for column in ('user_id', 'movie_id', 'rating', 'timestamp') if column not in columns]
+    if missing:
+        raise ValueError(f"Tabela ratings nie ma kolumn: {', '.join(missing)} - dodaj je "
+                         f"(np. ALTER TABLE ratings ADD COLUMN timestamp INTEGER) albo utwórz bazę od nowa.")
+    ensure_ratings_index(conn)
+
+    def rows():
+        for record in _read_csv(ratings_path):
+            yield (int(record['userId']), int(record['movieId']), float(record['rating']),
+                   _convert(record.get('timestamp'), int))
+
+    progress = Progress('oceny', every=commit_rows)
+    uncommitted = 0
+    for batch in _batches(rows(), batch_size):
+        conn.executemany("INSERT OR REPLACE INTO ratings (user_id, movie_id, rating, timestamp) VALUES (?, ?, ?, ?)",
+                         batch)
+        progress.add(len(batch))
+        uncommitted += len(batch)
+        if uncommitted >= commit_rows:
+            conn.commit()
+            uncommitted = 0
+    conn.commit()
+    return progress.done()
+
+
+def ingest(db_path=DATABASE_PATH, movies_path=None, links_path=None, metadata_path=None, ratings_path=None,
+           batch_size=DEFAULT_BATCH_SIZE, commit_rows=DEFAULT_COMMIT_ROWS):
+    """Tworzy schemat (gdy go brak) i ładuje podane pliki; zwraca statystyki etapów."""
+    start = time.time()
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    report = {}
+    try:
+        conn.executescript(SCHEMA)
+        ensure_signals_schema(conn)
+        # zmiany filmów i ocen w miejscu zlicza licznik modelu - bez niego model ich nie wykryje
+        tracked = ensure_change_tracking(conn)
+        with bulk_load(conn):
+            if movies_path:
+                report['movies'] = ingest_movies(conn, movies_path, links_path, metadata_path, batch_size)
+            if ratings_path:
+                report['ratings'] = ingest_ratings(conn, ratings_path, batch_size, commit_rows)
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    print(f"INGEST INFO: Baza {db_path} gotowa w {time.time() - start:.1f}s.")
+    if movies_path and not tracked:
+        print("INGEST INFO: Zmieniony katalog filmów - przebuduj model: python -m app.model_store build --force")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m app.ingest',
+                                     description="Ładowanie plików MovieLens/TMDB do movielens.db")
+    parser.add_argument('--db', default=DATABASE_PATH, help="ścieżka do movielens.db (tworzona, gdy jej brak)")
+    parser.add_argument('--movies', help="movies.csv (movieId,title,genres)")
+    parser.add_argument('--links', help="links.csv (movieId,imdbId,tmdbId) - łączy filmy z metadanymi")
+    parser.add_argument('--metadata', help="zrzut metadanych TMDB (CSV z kolumną id)")
+    parser.add_argument('--ratings', help="ratings.csv (userId,movieId,rating,timestamp)")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help="wierszy na executemany")
+    parser.add_argument('--commit-rows', type=int, default=DEFAULT_COMMIT_ROWS, help="wierszy na transakcję")
+    args = parser.parse_args(argv)
+
+    if not (args.movies or args.ratings):
+        parser.error("podaj --movies i/lub --ratings")
+    if args.metadata and not args.links:
+        parser.error("--metadata wymaga --links (mapowanie movieId -> id TMDB)")
+    try:
+        ingest(args.db, args.movies, args.links, args.metadata, args.ratings, args.batch_size, args.commit_rows)
+    except ValueError as e:
+        print(f"BŁĄD: {e}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
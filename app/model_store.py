@@ -0,0 +1,1069 @@
+# model_store.py
+"""Artefakt modelu rekomendacji zapisywany na dysku.
+
+Układ katalogu MODEL_DIR:
+    current                    - nazwa aktualnie obowiązującej wersji
+    <wersja>/manifest.json     - format, suma kontrolna, stan bazy i opis plików
+    <wersja>/*.npy             - tablice otwierane przez np.load(mmap_mode='r')
+
+Budowa: ``python -m app.model_store build``, aktualizacja przyrostowa o oceny
+dopisane od ostatniej wersji: ``python -m app.model_store update``. Proces
+webowy tylko otwiera artefakt (mmap) i przebudowuje go wyłącznie wtedy, gdy
+jest nieaktualny.
+"""
+import argparse
+import bisect
+import hashlib
+import json
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+
+try:
+    import fcntl
+except ImportError:  # Windows - budowa bez blokady plikowej
+    fcntl = None
+
+from .config import DATABASE_PATH, MODEL_DIR, MODEL_KEEP_VERSIONS, RATINGS_CHUNK_SIZE
+
+FORMAT_VERSION = 4
+MANIFEST_NAME = 'manifest.json'
+CATALOG_TITLES_NAME = 'catalog_titles.json'
+CURRENT_NAME = 'current'
+
+CATALOG_STRING_COLUMNS = ('title', 'clean_title', 'clean_title_lc', 'norm_title', 'genres', 'overview', 'poster_path')
+# kolumny, po których katalog wyszukuje binarnie (zapisywana jest ich kolejność sortowania)
+CATALOG_SORTED_COLUMNS = ('title', 'clean_title_lc')
+
+
+# --- Normalizacja tytułów ---
+def normalize_title(title):
+    if not isinstance(title, str):
+        return ""
+    # usuń rok w nawiasach
+    title = re.sub(r'\(\d{4}\)', '', title)
+    title = re.sub(r'\s+', ' ', title).strip()
+    return title.lower()
+
+
+# --- Indeks movie_id <-> wiersz macierzy ---
+class MovieIndex:
+    """Kompaktowy indeks wierszy macierzy: posortowana tablica movie_id.
+
+    Zastępuje indeks DataFrame'u z pivotu - wiersz ``i`` macierzy
+    odpowiada filmowi ``ids[i]``, a wyszukiwanie odbywa się przez searchsorted.
+    """
+
+    def __init__(self, ids):
+        self.ids = np.asarray(ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, row):
+        return self.ids[row]
+
+    def __contains__(self, movie_id):
+        return self.get_row(movie_id) is not None
+
+    def get_row(self, movie_id):
+        """Zwraca numer wiersza dla movie_id albo None, jeśli filmu nie ma w macierzy."""
+        try:
+            row = int(np.searchsorted(self.ids, movie_id))
+        except (TypeError, ValueError):
+            return None
+        if row < len(self.ids) and self.ids[row] == movie_id:
+            return row
+        return None
+
+    def get_rows(self, movie_ids):
+        """Numery wierszy dla tablicy movie_id (-1 dla filmów spoza macierzy)."""
+        movie_ids = np.asarray(movie_ids, dtype=np.int64)
+        if not len(self.ids):
+            return np.full(len(movie_ids), -1, dtype=np.int64)
+        rows = np.minimum(np.searchsorted(self.ids, movie_ids), len(self.ids) - 1)
+        return np.where(self.ids[rows] == movie_ids, rows, -1)
+
+    def get_loc(self, movie_id):
+        row = self.get_row(movie_id)
+        if row is None:
+            raise KeyError(movie_id)
+        return row
+
+
+def _unique_last(keys):
+    """Posortowane unikalne klucze i pozycje ich ostatnich wystąpień."""
+    # sortowanie stabilne - w grupie równych kluczy ostatni element ma największą pozycję
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    last = np.empty(len(keys), dtype=bool)
+    if len(keys):
+        last[-1] = True
+        np.not_equal(keys[1:], keys[:-1], out=last[:-1])
+    return keys[last], order[last]
+
+
+def _dense_codes(ids):
+    """Posortowane unikalne identyfikatory (int64) i numer każdego elementu wśród nich (int32).
+
+    Przy zwartym zakresie identyfikatorów (jak w MovieLens) wystarcza tablica
+    przeglądowa wielkości zakresu - bez sortowania wszystkich ocen i bez
+    tablic int64 długości liczby ocen, które zwraca np.unique.
+    """
+    ids = np.asarray(ids)
+    if len(ids) == 0:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int32)
+    low = ids.min()
+    span = int(ids.max()) - int(low) + 1
+    if span > 4 * len(ids) + 1024:
+        unique_ids, inverse = np.unique(ids, return_inverse=True)
+        return unique_ids.astype(np.int64), inverse.astype(np.int32)
+    offsets = ids - low
+    present = np.zeros(span, dtype=bool)
+    present[offsets] = True
+    lookup = np.cumsum(present, dtype=np.int32)
+    lookup -= 1
+    return np.flatnonzero(present) + int(low), lookup[offsets]
+
+
+def build_item_user_matrix(movie_ids, user_ids, ratings, ratings_scale=1):
+    """Buduje macierz film x użytkownik (CSR) bezpośrednio z kolumn ocen.
+
+    Identyfikatory są mapowane na ciągłe numery wierszy/kolumn, a z duplikatów
+    (user_id, movie_id) zostaje ostatnie wystąpienie (oceny czytane są po
+    rowid, więc wygrywa najnowsza - tak samo jak przy aktualizacji
+    przyrostowej). Pamięć rośnie z liczbą ocen, a nie z iloczynem
+    filmy x użytkownicy. ``ratings_scale`` - oceny zapisane jako kody
+    (np. kody półgwiazdkowe int8 z ``read_ratings``) są dzielone przez skalę.
+
+    Zwraca (MovieIndex, macierz CSR, tablica user_id kolumn).
+    """
+    unique_movie_ids, rows = _dense_codes(movie_ids)
+    unique_user_ids, cols = _dense_codes(user_ids)
+
+    n_movies, n_users = len(unique_movie_ids), len(unique_user_ids)
+    keys = rows.astype(np.int64)
+    keys *= n_users
+    keys += cols
+    del rows, cols
+    keys, last = _unique_last(keys)
+
+    # wspólny typ indeksów, żeby scipy nie kopiowało tablic przy otwieraniu z mmap
+    index_dtype = np.int32 if max(len(keys), n_users) < np.iinfo(np.int32).max else np.int64
+    indices = np.empty(len(keys), dtype=index_dtype)
+    np.remainder(keys, n_users, out=indices, casting='unsafe')
+    indptr = np.searchsorted(keys, np.arange(n_movies + 1, dtype=np.int64) * n_users).astype(index_dtype)
+    del keys
+    data = np.asarray(ratings)[last].astype(np.float64)
+    if ratings_scale != 1:
+        data /= ratings_scale
+    matrix = csr_matrix((data, indices, indptr), shape=(n_movies, n_users))
+    matrix.eliminate_zeros()
+
+    return MovieIndex(unique_movie_ids), matrix, unique_user_ids
+
+
+def patch_item_user_matrix(movie_index, matrix, user_ids, movie_ids, new_user_ids, ratings):
+    """Nakłada nowe oceny na istniejącą macierz, przepisując tylko wiersze, których dotyczą.
+
+    Nowe filmy i użytkownicy wstawiani są w kolejności identyfikatorów (jak przy
+    pełnej budowie), ocena tej samej pary nadpisuje poprzednią. Wiersze bez
+    nowych ocen są kopiowane blokami, bez rozpakowywania do par (wiersz, kolumna).
+
+    Zwraca (MovieIndex, macierz CSR, user_ids, zmienione wiersze, stary wiersz -> nowy wiersz).
+    """
+    movie_ids = np.asarray(movie_ids)
+    new_user_ids = np.asarray(new_user_ids)
+    all_movie_ids = np.union1d(movie_index.ids, movie_ids)
+    all_user_ids = np.union1d(user_ids, new_user_ids)
+    n_movies, n_users = len(all_movie_ids), len(all_user_ids)
+    row_map = np.searchsorted(all_movie_ids, movie_index.ids)
+    col_map = np.searchsorted(all_user_ids, user_ids)
+    same_columns = n_users == len(user_ids)
+
+    # nowe oceny jako posortowane klucze (wiersz, kolumna), z ostatnią oceną pary
+    keys = np.searchsorted(all_movie_ids, movie_ids).astype(np.int64) * n_users \
+        + np.searchsorted(all_user_ids, new_user_ids)
+    keys, last = _unique_last(keys)
+    delta_rows, delta_cols = keys // n_users, keys % n_users
+    delta_values = np.asarray(ratings, dtype=np.float64)[last]
+    changed_rows = np.unique(delta_rows)
+
+    # stare wpisy zmienionych wierszy + nowe oceny (nowe po starych - wygrywają)
+    old_row_of = np.full(n_movies, -1, dtype=np.int64)
+    old_row_of[row_map] = np.arange(len(row_map))
+    changed_old = old_row_of[changed_rows]
+    changed_old = changed_old[changed_old >= 0]
+    old_part = matrix[changed_old].tocoo()
+    merged_keys = np.concatenate([
+        row_map[changed_old][old_part.row].astype(np.int64) * n_users + col_map[old_part.col],
+        keys
+    ])
+    merged_values = np.concatenate([old_part.data, delta_values])
+    merged_keys, last = _unique_last(merged_keys)
+    merged_values = merged_values[last]
+    nonzero = merged_values != 0
+    merged_keys, merged_values = merged_keys[nonzero], merged_values[nonzero]
+    merged_rows = merged_keys // n_users
+
+    # długości wierszy i nowy indptr
+    lengths = np.zeros(n_movies, dtype=np.int64)
+    lengths[row_map] = np.diff(matrix.indptr)
+    lengths[changed_rows] = np.bincount(merged_rows, minlength=n_movies)[changed_rows]
+    nnz = int(lengths.sum())
+    index_dtype = np.int32 if max(nnz, n_users) < np.iinfo(np.int32).max else np.int64
+    indptr = np.zeros(n_movies + 1, dtype=index_dtype)
+    np.cumsum(lengths, out=indptr[1:])
+    data = np.empty(nnz, dtype=matrix.data.dtype)
+    indices = np.empty(nnz, dtype=index_dtype)
+
+    # bloki niezmienionych wierszy między kolejnymi zmienionymi wierszami
+    block_start = 0
+    for stop in list(changed_rows) + [n_movies]:
+        if stop > block_start:
+            old_start, old_stop = old_row_of[block_start], old_row_of[stop - 1] + 1
+            src = slice(matrix.indptr[old_start], matrix.indptr[old_stop])
+            dst = slice(indptr[block_start], indptr[stop])
+            data[dst] = matrix.data[src]
+            indices[dst] = matrix.indices[src] if same_columns else col_map[matrix.indices[src]]
+        block_start = stop + 1
+
+    # zmienione wiersze (posortowane klucze -> kolejno wiersz po wierszu)
+    positions = indptr[merged_rows] + (np.arange(len(merged_rows)) - np.searchsorted(merged_rows, merged_rows))
+    data[positions] = merged_values
+    indices[positions] = merged_keys % n_users
+
+    patched = csr_matrix((data, indices, indptr), shape=(n_movies, n_users), copy=False)
+    return MovieIndex(all_movie_ids), patched, all_user_ids, changed_rows, row_map
+
+
+# --- Kolumny tekstowe (bufor UTF-8 + offsety) ---
+class StringColumn:
+    """Kolumna napisów przechowywana jako jeden bufor bajtów i tablica offsetów.
+
+    Wartość ``i`` to ``data[offsets[i]:offsets[i + 1]]``; ``nulls[i]`` oznacza
+    brak wartości. Wszystkie trzy tablice mogą pochodzić z mmap.
+    """
+
+    def __init__(self, data, offsets, nulls):
+        self.data = data
+        self.offsets = offsets
+        self.nulls = nulls
+
+    @classmethod
+    def encode(cls, values):
+        encoded = [v.encode('utf-8') if isinstance(v, str) else None for v in values]
+        nulls = np.fromiter((e is None for e in encoded), dtype=bool, count=len(encoded))
+        lengths = np.fromiter((len(e) if e is not None else 0 for e in encoded), dtype=np.int64, count=len(encoded))
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        data = np.frombuffer(b''.join(e for e in encoded if e is not None), dtype=np.uint8)
+        return cls(data, offsets, nulls)
+
+    def __len__(self):
+        return len(self.nulls)
+
+    def __getitem__(self, i):
+        if self.nulls[i]:
+            return None
+        return bytes(self.data[self.offsets[i]:self.offsets[i + 1]]).decode('utf-8')
+
+    def tolist(self):
+        return [self[i] for i in range(len(self))]
+
+
+class TitleMap:
+    """Mapa znormalizowany tytuł -> movie_id oparta o posortowaną kolumnę kluczy."""
+
+    def __init__(self, keys, ids):
+        self.keys = keys
+        self.ids = ids
+
+    def get(self, key, default=None):
+        if not isinstance(key, str):
+            return default
+        pos = bisect.bisect_left(self.keys, key)
+        if pos < len(self.keys) and self.keys[pos] == key:
+            return int(self.ids[pos])
+        return default
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        return len(self.keys)
+
+
+# --- Stan bazy, z którego zbudowano artefakt ---
+# tabele ocen: (tabela, zapytanie o oceny z rowid w przedziale (?, ?]) - użytkownicy aplikacji
+# (oceny niejawne, app/signals.py) dostają ujemne user_id, żeby nie zderzyć się z MovieLens;
+# górna granica to max_rowid ze stanu bazy, więc oceny dopisane w trakcie czytania
+# trafią do następnej aktualizacji, a nie do dwóch wersji naraz
+RATING_SOURCES = (
+    ('ratings', "SELECT user_id, movie_id, rating FROM ratings "
+                "WHERE rowid > ? AND rowid <= ? ORDER BY rowid"),
+    ('implicit_ratings', "SELECT -user_id, movie_id, rating FROM implicit_ratings "
+                         "WHERE rowid > ? AND rowid <= ? ORDER BY rowid"),
+)
+SOURCE_TABLES = ('movies',) + tuple(table for table, _ in RATING_SOURCES)
+
+
+def _table_exists(conn, table):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone() is not None
+
+
+# Liczność i max_rowid nie zmieniają się przy UPDATE, więc zmiany w miejscu (UPDATE, DELETE)
+# tabel źródłowych zlicza tabela CHANGES_TABLE, utrzymywana wyzwalaczami. INSERT OR REPLACE
+# (ingest) nie uruchamia wyzwalaczy DELETE (bez PRAGMA recursive_triggers) - to dopisanie.
+# Wyzwalacze zakłada ingest i pełna budowa (pod blokadą budowy); odczyt stanu tylko je czyta.
+CHANGES_TABLE = 'source_changes'
+CHANGE_EVENTS = ('update', 'delete')
+
+
+def _trigger_names(conn):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+
+
+def ensure_change_tracking(conn):
+    """Tworzy (raz) licznik zmian i wyzwalacze UPDATE/DELETE tabel źródłowych.
+
+    False, gdy się nie da (baza tylko do odczytu) - stan zmian jest wtedy
+    nieznany i każda aktualizacja kończy się pełną budową.
+    """
+    tables = [table for table in SOURCE_TABLES if _table_exists(conn, table)]
+    triggers = _trigger_names(conn)
+    missing = [(table, event) for table in tables for event in CHANGE_EVENTS
+               if f"{CHANGES_TABLE}_{table}_{event}" not in triggers]
+    if not missing and _table_exists(conn, CHANGES_TABLE):
+        return True
+    try:
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {CHANGES_TABLE} "
+                     f"(table_name TEXT PRIMARY KEY, changes INTEGER NOT NULL DEFAULT 0)")
+        for table, event in missing:
+            conn.execute(f"INSERT OR IGNORE INTO {CHANGES_TABLE} (table_name) VALUES (?)", (table,))
+            conn.execute(f"CREATE TRIGGER IF NOT EXISTS {CHANGES_TABLE}_{table}_{event} AFTER {event.upper()} "
+                         f"ON {table} BEGIN UPDATE {CHANGES_TABLE} SET changes = changes + 1 "
+                         f"WHERE table_name = '{table}'; END")
+        conn.commit()
+    except sqlite3.OperationalError as e:
+        conn.rollback()
+        print(f"MODEL INFO: Brak śledzenia zmian w miejscu ({e}) - aktualizacje będą pełną budową.")
+        return False
+    return True
+
+
+def _tracked_changes(conn):
+    """Licznik zmian tabel, które mają oba wyzwalacze; bez tabeli licznika - pusty słownik."""
+    if not _table_exists(conn, CHANGES_TABLE):
+        return {}
+    triggers = _trigger_names(conn)
+    return {table: changes
+            for table, changes in conn.execute(f"SELECT table_name, changes FROM {CHANGES_TABLE}")
+            if all(f"{CHANGES_TABLE}_{table}_{event}" in triggers for event in CHANGE_EVENTS)}
+
+
+def get_db_state(conn):
+    """Zwraca liczność, największy rowid i licznik zmian w miejscu tabel, z których budowany jest model.
+
+    Tylko odczyt - licznik tabeli bez wyzwalaczy to None (stan zmian nieznany).
+    """
+    changes = _tracked_changes(conn)
+    state = {}
+    for table in SOURCE_TABLES:
+        if not _table_exists(conn, table):
+            state[table] = {'count': 0, 'max_rowid': 0, 'changes': None}
+            continue
+        count, max_rowid = conn.execute(f"SELECT COUNT(*), MAX(rowid) FROM {table}").fetchone()
+        state[table] = {'count': count, 'max_rowid': max_rowid or 0, 'changes': changes.get(table)}
+    return state
+
+
+def only_appended(old, new, appended):
+    """Czy tabela od stanu ``old`` tylko przyrosła o ``appended`` wierszy (INSERT, także INSERT OR REPLACE).
+
+    REPLACE usuwa poprzednią ocenę pary bez wyzwalacza, więc liczność może wzrosnąć
+    mniej - nowa ocena tej pary jest wśród dopisanych i nadpisuje starą. Bez
+    licznika zmian (brak wyzwalaczy) nie da się wykluczyć UPDATE - odpowiedź to nie.
+    """
+    if old.get('changes') is None or new.get('changes') is None:
+        return False
+    return new['changes'] == old['changes'] and new['count'] <= old['count'] + appended
+
+
+# --- Zapis / odczyt tablic ---
+def save_array(dir_path, name, array):
+    """Zapisuje tablicę atomowo (plik tymczasowy + rename), bo inne procesy mogą ją mapować."""
+    path = os.path.join(dir_path, name + '.npy')
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        np.save(f, np.ascontiguousarray(array))
+    os.replace(tmp_path, path)
+    return name + '.npy'
+
+
+def load_array(dir_path, name, mmap=True):
+    path = os.path.join(dir_path, name + '.npy')
+    if mmap:
+        try:
+            return np.load(path, mmap_mode='r')
+        except ValueError:
+            # pustej tablicy nie da się zmapować
+            pass
+    return np.load(path)
+
+
+def _save_strings(dir_path, name, column):
+    save_array(dir_path, name + '.data', column.data)
+    save_array(dir_path, name + '.offsets', column.offsets)
+    save_array(dir_path, name + '.nulls', column.nulls)
+
+
+def _load_strings(dir_path, name, mmap=True):
+    return StringColumn(
+        load_array(dir_path, name + '.data', mmap),
+        load_array(dir_path, name + '.offsets', mmap),
+        load_array(dir_path, name + '.nulls', mmap)
+    )
+
+
+def _file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _combined_checksum(file_checksums):
+    """Suma kontrolna całego artefaktu - SHA-256 po nazwach i sumach wszystkich plików."""
+    digest = hashlib.sha256()
+    for name in sorted(file_checksums):
+        digest.update(f"{name}:{file_checksums[name]}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _write_manifest(dir_path, manifest):
+    tmp_path = os.path.join(dir_path, MANIFEST_NAME + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(dir_path, MANIFEST_NAME))
+
+
+def row_norms(matrix):
+    """Normy L2 wierszy macierzy CSR bez tworzenia kopii całej macierzy."""
+    n_rows = matrix.shape[0]
+    rows = np.repeat(np.arange(n_rows), np.diff(matrix.indptr))
+    return np.sqrt(np.bincount(rows, weights=np.square(matrix.data, dtype=np.float64), minlength=n_rows))
+
+
+# --- Strumieniowy odczyt ocen ---
+# oceny MovieLens są wielokrotnościami 0.5 - zapisywane jako kody int8 (ocena x 2)
+HALF_STAR_SCALE = 2
+
+
+def peak_memory_mb():
+    """Szczytowe RSS bieżącego procesu w MB (None, gdy system go nie podaje)."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux podaje KB, macOS bajty
+    return round(peak / (2 ** 20 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _fits(values, dtype):
+    info = np.iinfo(dtype)
+    return len(values) == 0 or (values.min() >= info.min and values.max() <= info.max)
+
+
+class RatingColumns:
+    """Oceny w zwartych kolumnach: user_id i movie_id jako int32, ocena jako kod
+    półgwiazdkowy int8 (``ratings_scale`` = 2) albo float32 (``ratings_scale`` = 1).
+
+    Kolumny są prealokowane na znaną liczbę ocen i dopełniane partiami; typ
+    kolumny rozszerza się (int64 / float32) dopiero wtedy, gdy partia się
+    w nim nie mieści.
+    """
+
+    def __init__(self, capacity):
+        self.size = 0
+        self.user_ids = np.empty(capacity, dtype=np.int32)
+        self.movie_ids = np.empty(capacity, dtype=np.int32)
+        self.ratings = np.empty(capacity, dtype=np.int8)
+        self.ratings_scale = HALF_STAR_SCALE
+
+    def _reserve(self, n):
+        capacity = len(self.user_ids)
+        if self.size + n <= capacity:
+            return
+        # więcej wierszy niż w policzonym stanie bazy (zapis w trakcie odczytu)
+        capacity = max(self.size + n, capacity + capacity // 2)
+        for name in ('user_ids', 'movie_ids', 'ratings'):
+            column = np.empty(capacity, dtype=getattr(self, name).dtype)
+            column[:self.size] = getattr(self, name)[:self.size]
+            setattr(self, name, column)
+
+    def append(self, block):
+        """Dopisuje partię - tablicę n x 3 kolumn (user_id, movie_id, rating)."""
+        n = len(block)
+        self._reserve(n)
+        end = self.size + n
+        for name, values in (('user_ids', block[:, 0]), ('movie_ids', block[:, 1])):
+            column = getattr(self, name)
+            if column.dtype == np.int32 and not _fits(values, np.int32):
+                column = column.astype(np.int64)
+                setattr(self, name, column)
+            column[self.size:end] = values
+
+        values = block[:, 2]
+        if self.ratings.dtype == np.int8:
+            codes = np.rint(values * HALF_STAR_SCALE)
+            # NaN i oceny spoza siatki półgwiazdek nie przejdą porównania
+            if np.array_equal(codes / HALF_STAR_SCALE, values) and _fits(codes, np.int8):
+                self.ratings[self.size:end] = codes
+            else:
+                self.ratings = self.ratings.astype(np.float32) / np.float32(HALF_STAR_SCALE)
+                self.ratings_scale = 1
+        if self.ratings.dtype == np.float32:
+            self.ratings[self.size:end] = values
+        self.size = end
+
+    def columns(self):
+        """(user_ids, movie_ids, ratings) przycięte do liczby wczytanych ocen (widoki, bez kopii)."""
+        return self.user_ids[:self.size], self.movie_ids[:self.size], self.ratings[:self.size]
+
+    @property
+    def nbytes(self):
+        return sum(column[:self.size].nbytes for column in self.columns())
+
+
+def read_ratings(conn, db_state, since=None, chunk_size=RATINGS_CHUNK_SIZE):
+    """Czyta oceny ze wszystkich źródeł strumieniowo (``fetchmany``) do zwartych kolumn.
+
+    Odczyt obejmuje wiersze do ``max_rowid`` z ``db_state`` - tak jak stan
+    zapisany w manifeście - a przy ``since`` (wcześniejszy stan bazy) tylko
+    wiersze dopisane po nim. W pamięci nie powstaje ani lista krotek całej
+    tabeli, ani DataFrame z kolumnami int64/float64 - tylko partia
+    ``chunk_size`` wierszy i docelowe kolumny (9 bajtów na ocenę). Duplikaty
+    (user_id, movie_id) usuwa ``build_item_user_matrix`` na tych kolumnach.
+    """
+    start = time.time()
+    since = since or {}
+    sources = [(table, query) for table, query in RATING_SOURCES if _table_exists(conn, table)]
+    lower = {table: since.get(table, {}).get('max_rowid', 0) for table, _ in sources}
+    columns = RatingColumns(sum(max(0, db_state[table]['count'] - since.get(table, {}).get('count', 0))
+                                for table, _ in sources))
+    for table, query in sources:
+        cursor = conn.execute(query, (lower[table], db_state[table]['max_rowid']))
+        while True:
+            chunk = cursor.fetchmany(chunk_size)
+            if not chunk:
+                break
+            columns.append(np.array(chunk, dtype=np.float64))
+    print(f"MODEL INFO: Wczytano {columns.size} ocen ({columns.nbytes / 2 ** 20:.1f} MB w kolumnach) "
+          f"w {time.time() - start:.1f}s.")
+    return columns
+
+
+# --- Budowa artefaktu ---
+def read_movies(conn):
+    """Wczytuje z bazy katalog filmów potrzebny do budowy modelu."""
+    movies_df = pd.read_sql_query(
+        "SELECT movie_id, title, clean_title, clean_title_lc, genres, overview, poster_path FROM movies",
+        conn
+    )
+    movies_df['movie_id'] = pd.to_numeric(movies_df['movie_id'])
+    # Upewnij się, że clean_title_lc jest lowercase
+    movies_df['clean_title_lc'] = movies_df['clean_title'].str.lower()
+    return movies_df
+
+
+def write_matrix_files(dir_path, movie_index, matrix, user_ids, norms=None):
+    """Zapisuje macierz CSR i tablice zależne od jej wierszy/kolumn (pliki ``matrix_*``)."""
+    save_array(dir_path, 'matrix_data', matrix.data)
+    save_array(dir_path, 'matrix_indices', matrix.indices)
+    save_array(dir_path, 'matrix_indptr', matrix.indptr)
+    save_array(dir_path, 'matrix_movie_ids', movie_index.ids)
+    save_array(dir_path, 'matrix_user_ids', user_ids)
+    save_array(dir_path, 'matrix_row_norms', row_norms(matrix) if norms is None else norms)
+
+
+def write_matrix_catalog_rows(dir_path, movie_index, catalog_ids, id_order):
+    """Wiersz macierzy -> wiersz katalogu (-1, gdy filmu z ocenami nie ma w tabeli movies)."""
+    matrix_catalog_rows = np.full(len(movie_index), -1, dtype=np.int64)
+    if len(catalog_ids):
+        sorted_ids = catalog_ids[id_order]
+        pos = np.minimum(np.searchsorted(sorted_ids, movie_index.ids), len(sorted_ids) - 1)
+        found = sorted_ids[pos] == movie_index.ids
+        matrix_catalog_rows[found] = id_order[pos[found]]
+    save_array(dir_path, 'matrix_catalog_rows', matrix_catalog_rows)
+
+
+def write_artifact_files(dir_path, movies_df, movie_index, matrix, user_ids):
+    """Zapisuje wszystkie tablice modelu do katalogu ``dir_path``."""
+    write_matrix_files(dir_path, movie_index, matrix, user_ids)
+
+    # Słownik: normalized_clean_title -> movie_id (ostatnie wystąpienie wygrywa, jak w to_dict)
+    title_to_id = {}
+    for key, movie_id in zip(movies_df['clean_title_lc'], movies_df['movie_id']):
+        if isinstance(key, str):
+            title_to_id[key] = movie_id
+    keys = sorted(title_to_id)
+    _save_strings(dir_path, 'title_keys', StringColumn.encode(keys))
+    save_array(dir_path, 'title_ids', np.array([title_to_id[k] for k in keys], dtype=np.int64))
+
+    # Kolumny katalogu; znormalizowany tytuł liczony raz tutaj, a nie przy każdym zapytaniu
+    catalog_ids = movies_df['movie_id'].to_numpy(dtype=np.int64)
+    save_array(dir_path, 'catalog_movie_id', catalog_ids)
+    movies_df = movies_df.assign(norm_title=movies_df['title'].map(normalize_title))
+    for column in CATALOG_STRING_COLUMNS:
+        _save_strings(dir_path, 'catalog_' + column, StringColumn.encode(movies_df[column].tolist()))
+
+    # Lista tytułów do autouzupełniania jako gotowy JSON - serwowana wprost z pliku,
+    # bez budowania listy słowników w każdym procesie roboczym
+    titles = [
+        {'title': title, 'poster_path': poster_path if isinstance(poster_path, str) else None}
+        for title, poster_path in zip(movies_df['title'], movies_df['poster_path'])
+        if isinstance(title, str)
+    ]
+    with open(os.path.join(dir_path, CATALOG_TITLES_NAME), 'w', encoding='utf-8') as f:
+        json.dump(titles, f, ensure_ascii=False)
+
+    # Indeksy katalogu: kolejność wierszy po movie_id i po tytułach (wyszukiwanie binarne)
+    id_order = np.argsort(catalog_ids, kind='stable')
+    save_array(dir_path, 'catalog_id_order', id_order)
+    for column in CATALOG_SORTED_COLUMNS:
+        save_array(dir_path, f'catalog_{column}_order', _string_order(movies_df[column].tolist()))
+
+    write_matrix_catalog_rows(dir_path, movie_index, catalog_ids, id_order)
+
+
+def _string_order(values):
+    """Kolejność wierszy posortowanych po wartości (braki na końcu, remisy w kolejności wierszy)."""
+    order = sorted(range(len(values)), key=lambda i: (values[i] is None, values[i] or ''))
+    return np.array(order, dtype=np.int64)
+
+
+@contextmanager
+def _build_lock(model_dir):
+    os.makedirs(model_dir, exist_ok=True)
+    with open(os.path.join(model_dir, '.lock'), 'w') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def try_lock(dir_path, name):
+    """Nieblokująca blokada pliku ``name`` w ``dir_path``, wspólna dla wszystkich procesów.
+
+    Zwraca otwarty plik (blokada trwa do ``release_lock`` albo końca procesu)
+    albo None, gdy blokadę trzyma już ktoś inny.
+    """
+    os.makedirs(dir_path, exist_ok=True)
+    lock_file = open(os.path.join(dir_path, name), 'w')
+    if fcntl is not None:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return None
+    return lock_file
+
+
+def release_lock(lock_file):
+    if lock_file is not None:
+        lock_file.close()
+
+
+def is_locked(dir_path, name):
+    """Czy blokadę ``name`` trzyma teraz jakiś proces (także ten)."""
+    lock_file = try_lock(dir_path, name)
+    release_lock(lock_file)
+    return lock_file is None
+
+
+def _no_progress(phase, fraction):
+    pass
+
+
+def build_artifact(db_path=DATABASE_PATH, model_dir=MODEL_DIR, on_progress=_no_progress):
+    """Buduje nową wersję artefaktu, ustawia ją jako bieżącą i zwraca jej nazwę.
+
+    ``on_progress(faza, ułamek)`` jest wołane na początku kolejnych etapów.
+    """
+    from .ratings_store import store_for_build
+
+    start = time.time()
+    on_progress('reading_db', 0.05)
+    conn = sqlite3.connect(db_path)
+    try:
+        # pod blokadą budowy - wyzwalacze zakłada naraz tylko jeden proces
+        ensure_change_tracking(conn)
+        db_state = get_db_state(conn)
+        movies_df = read_movies(conn)
+        # oceny z kolumnowej kopii (odświeżanej przyrostowo), a bez niej - strumieniowo z SQLite
+        store = store_for_build(conn, db_state, db_path)
+        ratings = read_ratings(conn, db_state) if store is None else None
+    finally:
+        conn.close()
+    print("MODEL INFO: Dane filmów i ocen załadowane z bazy danych.")
+
+    on_progress('building_matrix', 0.4)
+    if store is not None:
+        movie_index, matrix, user_ids = store.item_user_matrix()
+        n_ratings = len(store)
+        del store
+    else:
+        user_ids, movie_ids, values = ratings.columns()
+        movie_index, matrix, user_ids = build_item_user_matrix(movie_ids, user_ids, values, ratings.ratings_scale)
+        n_ratings = ratings.size
+        del ratings, movie_ids, values
+    print(f"MODEL INFO: Macierz użytkownik-film utworzona ({matrix.nnz} ocen, "
+          f"pominięte duplikaty i zera: {n_ratings - matrix.nnz}).")
+
+    on_progress('writing_artifact', 0.7)
+    version = _write_version(
+        model_dir,
+        lambda tmp_dir: write_artifact_files(tmp_dir, movies_df, movie_index, matrix, user_ids),
+        {'db_path': os.path.abspath(db_path), 'db_state': db_state,
+         'shape': list(matrix.shape), 'nnz': int(matrix.nnz)}
+    )
+    print(f"MODEL INFO: Artefakt {version} zbudowany w {time.time() - start:.1f}s "
+          f"(szczytowa pamięć procesu: {peak_memory_mb()} MB).")
+    return version
+
+
+def _write_version(model_dir, write_files, manifest_fields, known_checksums=None):
+    """Zapisuje pliki nowej wersji w katalogu tymczasowym, dopisuje manifest,
+    publikuje katalog pod nazwą wersji i ustawia ją jako bieżącą.
+
+    ``known_checksums`` - sumy plików przeniesionych bez zmian z poprzedniej wersji.
+    """
+    os.makedirs(model_dir, exist_ok=True)
+    tmp_dir = os.path.join(model_dir, f'.build-{os.getpid()}-{int(time.time())}')
+    os.makedirs(tmp_dir)
+    try:
+        write_files(tmp_dir)
+        known_checksums = known_checksums or {}
+        file_checksums = {
+            name: known_checksums.get(name) or _file_checksum(os.path.join(tmp_dir, name))
+            for name in os.listdir(tmp_dir)
+        }
+        checksum = _combined_checksum(file_checksums)
+        version = time.strftime('%Y%m%d-%H%M%S') + '-' + checksum[:8]
+        manifest = {
+            'format_version': FORMAT_VERSION,
+            'version': version,
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'checksum': checksum,
+            'files': file_checksums,
+            **manifest_fields
+        }
+        _write_manifest(tmp_dir, manifest)
+        os.rename(tmp_dir, os.path.join(model_dir, version))
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    set_current_version(model_dir, version)
+    prune_versions(model_dir)
+    return version
+
+
+def update_artifact(db_path=DATABASE_PATH, model_dir=MODEL_DIR):
+    """Aktualizacja przyrostowa: nakłada na bieżącą wersję oceny dopisane od jej budowy.
+
+    Znacznikiem jest największy rowid tabel ocen (ratings, implicit_ratings)
+    zapisany w manifeście; ponowna ocena pary przez INSERT OR REPLACE to też
+    dopisanie (nowsza ocena nadpisuje starą), a UPDATE/DELETE wykrywa licznik
+    zmian utrzymywany wyzwalaczami (``ensure_change_tracking``; bez nich - pełna budowa).
+    Przepisywane są tylko pliki macierzy (``matrix_*``); katalog filmów
+    przechodzi do nowej wersji jako twarde dowiązania. Zwraca
+    ``(wersja, movie_id zmienionych filmów)`` albo None, gdy potrzebna jest
+    pełna budowa (zmieniona tabela movies albo oceny usunięte/zmienione w miejscu).
+    """
+    start = time.time()
+    artifact = open_artifact(model_dir)
+    conn = sqlite3.connect(db_path)
+    try:
+        db_state = get_db_state(conn)
+        old_state = artifact.db_state
+        if db_state == old_state:
+            return artifact.version, np.array([], dtype=np.int64)
+        if set(db_state) != set(old_state):
+            print("MODEL INFO: Inny zestaw tabel źródłowych - potrzebna pełna budowa.")
+            return None
+        rows = []
+        appended = {}
+        for table, query in RATING_SOURCES:
+            new_rows = conn.execute(query, (old_state[table]['max_rowid'], db_state[table]['max_rowid'])).fetchall() \
+                if _table_exists(conn, table) else []
+            appended[table] = len(new_rows)
+            rows.extend(new_rows)
+    finally:
+        conn.close()
+
+    # bez ponownego czytania całej tabeli da się nałożyć tylko dopisane oceny
+    if db_state['movies'] != old_state['movies']:
+        print("MODEL INFO: Zmieniła się tabela movies - potrzebna pełna budowa.")
+        return None
+    if not all(only_appended(old_state[table], db_state[table], appended[table]) for table in appended):
+        print("MODEL INFO: Oceny usunięte lub zmienione w miejscu - potrzebna pełna budowa.")
+        return None
+
+    delta = np.array(rows, dtype=np.float64).reshape(-1, 3)
+    movie_index, matrix, user_ids, changed_rows, row_map = patch_item_user_matrix(
+        artifact.movie_index, artifact.matrix, artifact.user_ids,
+        delta[:, 1].astype(np.int64), delta[:, 0].astype(np.int64), delta[:, 2]
+    )
+    norms = np.zeros(matrix.shape[0], dtype=np.float64)
+    norms[row_map] = artifact.row_norms
+    norms[changed_rows] = row_norms(matrix[changed_rows])
+
+    # pliki katalogu nie zależą od ocen - dowiązania do poprzedniej wersji
+    carried = [name for name in artifact.manifest['files']
+               if not name.startswith(('matrix_', 'index_'))]
+
+    def write_files(tmp_dir):
+        for name in carried:
+            src, dst = os.path.join(artifact.path, name), os.path.join(tmp_dir, name)
+            try:
+                os.link(src, dst)
+            except OSError:  # system plików bez twardych dowiązań
+                shutil.copy2(src, dst)
+        write_matrix_files(tmp_dir, movie_index, matrix, user_ids, norms)
+        write_matrix_catalog_rows(tmp_dir, movie_index, artifact.catalog_movie_id, artifact.catalog_id_order)
+
+    version = _write_version(
+        model_dir, write_files,
+        {'db_path': os.path.abspath(db_path), 'db_state': db_state,
+         'shape': list(matrix.shape), 'nnz': int(matrix.nnz),
+         'base_version': artifact.version,
+         'incremental': {'ratings': len(rows), 'changed_movies': len(changed_rows)}},
+        known_checksums={name: artifact.manifest['files'][name] for name in carried}
+    )
+    changed_ids = np.asarray(movie_index.ids)[changed_rows]
+    print(f"MODEL INFO: Artefakt {version} zaktualizowany przyrostowo ({len(rows)} ocen, "
+          f"{len(changed_rows)} filmów) w {time.time() - start:.1f}s.")
+    return version, changed_ids
+
+
+# --- Wersje ---
+def get_current_version(model_dir=MODEL_DIR):
+    try:
+        with open(os.path.join(model_dir, CURRENT_NAME), encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def set_current_version(model_dir, version):
+    tmp_path = os.path.join(model_dir, CURRENT_NAME + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(version)
+    os.replace(tmp_path, os.path.join(model_dir, CURRENT_NAME))
+
+
+def read_manifest(model_dir=MODEL_DIR, version=None):
+    """Manifest wersji (domyślnie bieżącej) bez otwierania plików artefaktu; None, gdy jej brak."""
+    version = version or get_current_version(model_dir)
+    if version is None:
+        return None
+    try:
+        with open(os.path.join(model_dir, version, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def list_versions(model_dir=MODEL_DIR):
+    if not os.path.isdir(model_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(model_dir)
+        if not name.startswith('.') and os.path.isfile(os.path.join(model_dir, name, MANIFEST_NAME))
+    )
+
+
+def prune_versions(model_dir=MODEL_DIR, keep=MODEL_KEEP_VERSIONS):
+    """Usuwa najstarsze wersje, zostawiając ``keep`` najnowszych oraz bieżącą."""
+    current = get_current_version(model_dir)
+    versions = list_versions(model_dir)
+    for version in versions[:-keep] if keep > 0 else versions:
+        if version != current:
+            shutil.rmtree(os.path.join(model_dir, version), ignore_errors=True)
+
+
+# --- Otwieranie artefaktu ---
+class ModelArtifact:
+    """Otwarta (zmapowana w pamięci) wersja artefaktu modelu."""
+
+    def __init__(self, path, mmap=True):
+        self.path = path
+        with open(os.path.join(path, MANIFEST_NAME), encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Nieobsługiwany format artefaktu: {self.manifest.get('format_version')}")
+        self.version = self.manifest['version']
+
+        self.movie_index = MovieIndex(load_array(path, 'matrix_movie_ids', mmap))
+        self.user_ids = load_array(path, 'matrix_user_ids', mmap)
+        self.row_norms = load_array(path, 'matrix_row_norms', mmap)
+        self.matrix = csr_matrix(
+            (
+                load_array(path, 'matrix_data', mmap),
+                load_array(path, 'matrix_indices', mmap),
+                load_array(path, 'matrix_indptr', mmap)
+            ),
+            shape=tuple(self.manifest['shape']),
+            copy=False
+        )
+        self.title_to_id = TitleMap(
+            _load_strings(path, 'title_keys', mmap),
+            load_array(path, 'title_ids', mmap)
+        )
+        self.catalog_movie_id = load_array(path, 'catalog_movie_id', mmap)
+        self.catalog = {
+            column: _load_strings(path, 'catalog_' + column, mmap)
+            for column in CATALOG_STRING_COLUMNS
+        }
+        self.catalog_id_order = load_array(path, 'catalog_id_order', mmap)
+        self.catalog_orders = {
+            column: load_array(path, f'catalog_{column}_order', mmap)
+            for column in CATALOG_SORTED_COLUMNS
+        }
+        self.matrix_catalog_rows = load_array(path, 'matrix_catalog_rows', mmap)
+        self.catalog_titles_path = os.path.join(path, CATALOG_TITLES_NAME)
+
+    @property
+    def db_state(self):
+        return self.manifest['db_state']
+
+    def has_files(self, names):
+        return all(name in self.manifest['files'] for name in names)
+
+    def add_files(self, names):
+        """Dopisuje do manifestu pliki zapisane później w katalogu wersji (np. indeks sąsiadów)."""
+        with _build_lock(os.path.dirname(self.path)):
+            with open(os.path.join(self.path, MANIFEST_NAME), encoding='utf-8') as f:
+                manifest = json.load(f)
+            for name in names:
+                manifest['files'][name] = _file_checksum(os.path.join(self.path, name))
+            manifest['checksum'] = _combined_checksum(manifest['files'])
+            _write_manifest(self.path, manifest)
+        self.manifest = manifest
+
+
+def open_artifact(model_dir=MODEL_DIR, version=None, mmap=True):
+    version = version or get_current_version(model_dir)
+    if version is None:
+        raise FileNotFoundError(f"Brak artefaktu modelu w {model_dir}")
+    return ModelArtifact(os.path.join(model_dir, version), mmap=mmap)
+
+
+def verify_artifact(model_dir=MODEL_DIR, version=None):
+    """Przelicza sumy kontrolne plików i porównuje je z manifestem."""
+    version = version or get_current_version(model_dir)
+    path = os.path.join(model_dir, version)
+    with open(os.path.join(path, MANIFEST_NAME), encoding='utf-8') as f:
+        manifest = json.load(f)
+    file_checksums = {name: _file_checksum(os.path.join(path, name)) for name in manifest['files']}
+    return file_checksums == manifest['files'] and _combined_checksum(file_checksums) == manifest['checksum']
+
+
+def is_stale(artifact, db_path=DATABASE_PATH):
+    """Artefakt jest nieaktualny, jeśli stan tabel w bazie różni się od zapisanego."""
+    conn = sqlite3.connect(db_path)
+    try:
+        return get_db_state(conn) != artifact.db_state
+    finally:
+        conn.close()
+
+
+def load_or_build(db_path=DATABASE_PATH, model_dir=MODEL_DIR, on_progress=_no_progress, force=False):
+    """Otwiera bieżący artefakt, a gdy go brak lub jest nieaktualny (albo ``force``) - buduje nowy."""
+    on_progress('opening_artifact', 0.0)
+    with _build_lock(model_dir):
+        try:
+            artifact = open_artifact(model_dir)
+            if not force and not is_stale(artifact, db_path):
+                print(f"MODEL INFO: Otwarto artefakt {artifact.version}.")
+                return artifact
+            reason = "wymuszona przebudowa" if force else "jest nieaktualny - przebudowa"
+            print(f"MODEL INFO: Artefakt {artifact.version}: {reason}.")
+        except (FileNotFoundError, ValueError, KeyError) as e:
+            print(f"MODEL INFO: Brak poprawnego artefaktu ({e}) - budowa.")
+        version = build_artifact(db_path, model_dir, on_progress)
+    on_progress('opening_artifact', 0.9)
+    return open_artifact(model_dir, version)
+
+
+def update_or_build(db_path=DATABASE_PATH, model_dir=MODEL_DIR, on_progress=_no_progress):
+    """Aktualizacja przyrostowa, a gdy nie jest możliwa - pełna budowa.
+
+    Zwraca (artefakt, movie_id zmienionych filmów) - None zamiast listy po pełnej budowie.
+    """
+    with _build_lock(model_dir):
+        try:
+            result = update_artifact(db_path, model_dir)
+        except (FileNotFoundError, ValueError, KeyError) as e:
+            print(f"MODEL INFO: Brak poprawnego artefaktu ({e}) - budowa.")
+            result = None
+        if result is None:
+            version, changed_ids = build_artifact(db_path, model_dir, on_progress), None
+        else:
+            version, changed_ids = result
+    return open_artifact(model_dir, version), changed_ids
+
+
+# --- CLI ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m app.model_store', description="Artefakt modelu rekomendacji")
+    parser.add_argument('command', choices=['build', 'update', 'verify', 'info'])
+    parser.add_argument('--db', default=DATABASE_PATH, help="ścieżka do movielens.db")
+    parser.add_argument('--model-dir', default=MODEL_DIR, help="katalog artefaktów")
+    parser.add_argument('--force', action='store_true', help="buduj nawet jeśli artefakt jest aktualny")
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        from .config import RECOMMENDER_BACKEND
+        from .neighbors import create_backend
+
+        artifact = load_or_build(args.db, args.model_dir, force=args.force)
+        # indeks skonfigurowanego backendu budujemy od razu, żeby aplikacja tylko go otwierała
+        create_backend(RECOMMENDER_BACKEND, artifact)
+    elif args.command == 'update':
+        from .config import RECOMMENDER_BACKEND
+        from .neighbors import create_backend
+        from .similarity import refresh_similar_movies
+
+        artifact, changed_ids = update_or_build(args.db, args.model_dir)
+        create_backend(RECOMMENDER_BACKEND, artifact)
+        if changed_ids is not None and len(changed_ids):
+            refresh_similar_movies(args.db, artifact, changed_ids)
+    elif args.command == 'verify':
+        ok = verify_artifact(args.model_dir)
+        print("OK" if ok else "BŁĄD: suma kontrolna nie zgadza się")
+        return 0 if ok else 1
+    elif args.command == 'info':
+        artifact = open_artifact(args.model_dir)
+        print(json.dumps(artifact.manifest, indent=2))
+        print("stale:", is_stale(artifact, args.db))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
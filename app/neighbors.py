@@ -0,0 +1,341 @@
+# neighbors.py
+"""Wymienne backendy wyszukiwania sąsiadów dla rekomendacji.
+
+Każdy backend odpowiada na pytanie "które wiersze macierzy film x użytkownik
+są najbardziej podobne (cosinus) do wiersza ``row``" i zwraca
+``(wiersze, podobieństwa)`` posortowane malejąco, bez samego wiersza.
+``query_batch`` robi to samo dla wielu wierszy naraz - jednym iloczynem
+macierzy dla backendów, które to umożliwiają.
+
+    knn          - dokładne przeszukanie (pełny iloczyn macierz-wektor) - punkt odniesienia
+    precomputed  - odczyt z tabeli similar_movies (python -m app.similarity)
+    lsh          - przybliżone: szkice LSH (losowe hiperpłaszczyzny) + dokładny ranking kandydatów
+    svd          - przybliżone: gęste osadzenia z obciętego SVD (iloczyn macierz-wektor)
+
+Indeksy backendów zapisywane są w katalogu wersji artefaktu modelu
+(pliki ``index_<backend>_*``) i otwierane razem z nim przez mmap.
+"""
+import json
+import os
+import sqlite3
+
+import numpy as np
+
+from .config import DATABASE_PATH, LSH_BITS, LSH_CANDIDATES, SVD_DIM
+from .model_store import load_array, save_array
+
+
+def _inverse(values):
+    inv = np.zeros(len(values), dtype=np.float64)
+    np.divide(1.0, values, out=inv, where=np.asarray(values) > 0)
+    return inv
+
+
+def _top_k(candidates, scores, k):
+    """Wybiera k najlepszych kandydatów (argpartition + sortowanie tylko k elementów)."""
+    if len(candidates) > k:
+        part = np.argpartition(-scores, k - 1)[:k]
+        candidates, scores = candidates[part], scores[part]
+    order = np.argsort(-scores, kind='stable')
+    return candidates[order], scores[order]
+
+
+def _top_k_rows(scores, k):
+    """``_top_k`` dla każdego wiersza macierzy wyników (len(rows) x n) naraz."""
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.empty((len(scores), 0), dtype=np.int64), np.empty((len(scores), 0), dtype=scores.dtype)
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind='stable')
+    return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+
+# ile wierszy zapytań liczyć jednym iloczynem (pamięć: BATCH_BLOCK x liczba filmów wyników)
+BATCH_BLOCK = 256
+
+
+class NeighborBackend:
+    """Interfejs backendu. ``load`` zwraca None, gdy w artefakcie nie ma indeksu.
+
+    Backend z indeksem wymienia w ``index_arrays`` atrybuty zapisywane jako
+    ``index_<name>_<atrybut>.npy``, a w ``params`` parametry, które muszą się
+    zgadzać, żeby zapisany indeks można było ponownie otworzyć.
+    """
+
+    name = None
+    index_arrays = ()
+
+    def __init__(self, artifact):
+        self.matrix = artifact.matrix
+        self.inv_norms = _inverse(artifact.row_norms)
+
+    @property
+    def params(self):
+        return {}
+
+    def fit(self):
+        return self
+
+    @classmethod
+    def _params_file(cls):
+        return f'index_{cls.name}_params.json'
+
+    def save(self, artifact):
+        if not self.index_arrays:
+            return
+        names = [save_array(artifact.path, f'index_{self.name}_{attr}', getattr(self, attr))
+                 for attr in self.index_arrays]
+        params_path = os.path.join(artifact.path, self._params_file())
+        with open(params_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.params, f)
+        os.replace(params_path + '.tmp', params_path)
+        artifact.add_files(names + [self._params_file()])
+
+    @classmethod
+    def load(cls, artifact):
+        backend = cls(artifact)
+        if not cls.index_arrays:
+            return backend.fit()
+        files = [cls._params_file()] + [f'index_{cls.name}_{attr}.npy' for attr in cls.index_arrays]
+        if not artifact.has_files(files):
+            return None
+        with open(os.path.join(artifact.path, cls._params_file()), encoding='utf-8') as f:
+            if json.load(f) != backend.params:
+                return None
+        for attr in cls.index_arrays:
+            setattr(backend, attr, load_array(artifact.path, f'index_{cls.name}_{attr}'))
+        return backend
+
+    @property
+    def index_nbytes(self):
+        """Rozmiar struktur przeszukiwanych przy zapytaniu (do porównań w benchmarkach)."""
+        if self.index_arrays:
+            return sum(getattr(self, attr).nbytes for attr in self.index_arrays)
+        return self.matrix.data.nbytes + self.matrix.indices.nbytes + self.matrix.indptr.nbytes
+
+    def query(self, row, k):
+        raise NotImplementedError
+
+    def cosine(self, row, candidates):
+        """Dokładne podobieństwo kosinusowe wiersza ``row`` do wierszy ``candidates``."""
+        scores = (self.matrix[candidates] @ self.matrix[row].T).toarray().ravel()
+        return scores * self.inv_norms[candidates] * self.inv_norms[row]
+
+    def query_batch(self, rows, k, exclude=None):
+        """Sąsiedzi wielu wierszy: (wiersze len(rows) x k, podobieństwa len(rows) x k).
+
+        ``exclude`` - maska wierszy macierzy, które nie mogą trafić do wyników.
+        Brakujące pozycje (za mało sąsiadów) mają wiersz -1 i podobieństwo -inf.
+        Domyślnie - osobne zapytanie dla każdego wiersza, z zapasem na wykluczenia.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        extra = int(exclude.sum()) if exclude is not None else 0
+        neighbors = np.full((len(rows), k), -1, dtype=np.int64)
+        scores = np.full((len(rows), k), -np.inf)
+        for i, row in enumerate(rows):
+            found, found_scores = self.query(int(row), k + extra)
+            if exclude is not None and len(found):
+                keep = ~exclude[found]
+                found, found_scores = found[keep], found_scores[keep]
+            neighbors[i, :len(found[:k])] = found[:k]
+            scores[i, :len(found[:k])] = found_scores[:k]
+        return neighbors, scores
+
+    def _batch_from_scores(self, rows, k, exclude, score_block):
+        """``query_batch`` dla backendów liczących wyniki całych bloków wierszy jednym iloczynem."""
+        rows = np.asarray(rows, dtype=np.int64)
+        k = min(k, self.matrix.shape[0] - 1)
+        neighbors = np.full((len(rows), k), -1, dtype=np.int64)
+        scores = np.full((len(rows), k), -np.inf)
+        for start in range(0, len(rows), BATCH_BLOCK):
+            block = rows[start:start + BATCH_BLOCK]
+            block_scores = score_block(block)
+            if exclude is not None:
+                block_scores[:, exclude] = -np.inf
+            block_scores[np.arange(len(block)), block] = -np.inf
+            top, top_scores = _top_k_rows(block_scores, k)
+            neighbors[start:start + len(block)] = np.where(np.isfinite(top_scores), top, -1)
+            scores[start:start + len(block)] = top_scores
+        return neighbors, scores
+
+    def exact_query(self, row, k):
+        """Pełny skan - iloczyn całej macierzy z wektorem zapytania."""
+        scores = (self.matrix @ self.matrix[row].T).toarray().ravel() * self.inv_norms * self.inv_norms[row]
+        scores[row] = -np.inf
+        k = min(k, len(scores) - 1)
+        return _top_k(np.arange(len(scores)), scores, k)
+
+
+class ExactBackend(NeighborBackend):
+    """Dokładny kosinus do wszystkich filmów (jak NearestNeighbors(metric='cosine', algorithm='brute')).
+
+    Liczone wprost na macierzy z artefaktu (mmap), bez kopii w pamięci
+    prywatnej procesu, jaką robi NearestNeighbors.fit - wszystkie procesy
+    robocze czytają te same strony z page cache.
+    """
+
+    name = 'knn'
+
+    def query(self, row, k):
+        return self.exact_query(row, k)
+
+    def query_batch(self, rows, k, exclude=None):
+        # jeden rzadki iloczyn (blok wierszy x cała macierz) zamiast zapytania na film
+        def score_block(block):
+            scores = (self.matrix[block] @ self.matrix.T).toarray()
+            scores *= self.inv_norms[block, None]
+            scores *= self.inv_norms[None, :]
+            return scores
+        return self._batch_from_scores(rows, k, exclude, score_block)
+
+
+class PrecomputedBackend(NeighborBackend):
+    """Odczyt gotowych list sąsiadów z tabeli similar_movies (indeks po movie_id)."""
+
+    name = 'precomputed'
+
+    def __init__(self, artifact, db_path=DATABASE_PATH):
+        super().__init__(artifact)
+        self.movie_index = artifact.movie_index
+        self.db_path = db_path
+
+    def query(self, row, k):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            rows = conn.execute(
+                "SELECT neighbor_id, score FROM similar_movies WHERE movie_id = ? ORDER BY rank LIMIT ?",
+                (int(self.movie_index[row]), k)
+            ).fetchall()
+        finally:
+            conn.close()
+        neighbors = [(self.movie_index.get_row(neighbor_id), score) for neighbor_id, score in rows]
+        neighbors = [(r, score) for r, score in neighbors if r is not None]
+        return (
+            np.array([r for r, _ in neighbors], dtype=np.int64),
+            np.array([score for _, score in neighbors], dtype=np.float64)
+        )
+
+
+_POPCOUNT8 = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def popcount_rows(words):
+    """Liczba ustawionych bitów w każdym wierszu tablicy uint64."""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(words).sum(axis=1, dtype=np.int64)
+    return _POPCOUNT8[words.view(np.uint8)].reshape(len(words), -1).sum(axis=1, dtype=np.int64)
+
+
+class LSHBackend(NeighborBackend):
+    """Przybliżone wyszukiwanie: szkice LSH z losowych hiperpłaszczyzn (SimHash).
+
+    Każdy wiersz dostaje ``n_bits``-bitowy szkic (znaki rzutów na losowe
+    kierunki); odległość Hamminga szkiców przybliża kąt między wektorami.
+    Zapytanie to skan XOR + popcount po zwartych szkicach (kilkadziesiąt
+    bajtów na film zamiast całego rzadkiego wiersza), a ``n_candidates``
+    najbliższych w sensie Hamminga jest oceniane dokładnym kosinusem.
+
+    Pokrętła: więcej bitów lub kandydatów -> wyższy recall i wolniej.
+    """
+
+    name = 'lsh'
+    index_arrays = ('sketches',)
+    SEED = 20240601
+
+    def __init__(self, artifact, n_bits=LSH_BITS, n_candidates=LSH_CANDIDATES):
+        super().__init__(artifact)
+        if n_bits <= 0 or n_bits % 64:
+            raise ValueError("n_bits musi być dodatnią wielokrotnością 64")
+        self.n_bits = n_bits
+        self.n_candidates = n_candidates
+        self.sketches = None
+
+    @property
+    def params(self):
+        return {'n_bits': self.n_bits, 'seed': self.SEED}
+
+    def fit(self):
+        n_rows, n_cols = self.matrix.shape
+        rng = np.random.default_rng(self.SEED)
+        words = []
+        # rzuty liczone po 64 bity, żeby nie trzymać całej macierzy projekcji w pamięci
+        for _ in range(self.n_bits // 64):
+            projection = rng.standard_normal((n_cols, 64), dtype=np.float32)
+            bits = np.asarray(self.matrix @ projection) > 0
+            words.append(np.packbits(bits, axis=1).view(np.uint64))
+        self.sketches = np.ascontiguousarray(np.hstack(words))
+        return self
+
+    def candidates(self, row):
+        distances = popcount_rows(np.bitwise_xor(self.sketches, self.sketches[row]))
+        distances[row] = np.iinfo(np.int64).max
+        n_candidates = min(self.n_candidates, len(distances) - 1)
+        return np.argpartition(distances, n_candidates - 1)[:n_candidates]
+
+    def query(self, row, k):
+        candidates = self.candidates(row)
+        k = min(k, len(candidates))
+        return _top_k(candidates, self.cosine(row, candidates), k)
+
+
+class EmbeddingBackend(NeighborBackend):
+    """Gęste osadzenia filmów z obciętego SVD macierzy film x użytkownik.
+
+    Wiersze ``U * S`` są normalizowane L2 i zapisywane jako float32, więc
+    podobieństwo to jeden iloczyn macierz-wektor (n_filmów x dim) i
+    argpartition - bez skanu rzadkiej macierzy. Wynik jest przybliżeniem
+    kosinusa na pełnych wektorach ocen.
+    """
+
+    name = 'svd'
+    index_arrays = ('embeddings',)
+    SEED = 20240601
+
+    def __init__(self, artifact, dim=SVD_DIM):
+        super().__init__(artifact)
+        self.dim = max(1, min(dim, min(self.matrix.shape) - 1))
+        self.embeddings = None
+
+    @property
+    def params(self):
+        return {'dim': self.dim, 'seed': self.SEED}
+
+    def fit(self):
+        from sklearn.utils.extmath import randomized_svd
+
+        u, sigma, _ = randomized_svd(self.matrix, n_components=self.dim, random_state=self.SEED)
+        embeddings = (u * sigma).astype(np.float32)
+        embeddings *= _inverse(np.linalg.norm(embeddings, axis=1)).astype(np.float32)[:, None]
+        self.embeddings = embeddings
+        return self
+
+    def query(self, row, k):
+        scores = self.embeddings @ self.embeddings[row]
+        scores[row] = -np.inf
+        k = min(k, len(scores) - 1)
+        return _top_k(np.arange(len(scores)), scores, k)
+
+    def query_batch(self, rows, k, exclude=None):
+        return self._batch_from_scores(rows, k, exclude, lambda block: self.embeddings[block] @ self.embeddings.T)
+
+
+BACKENDS = {
+    ExactBackend.name: ExactBackend,
+    PrecomputedBackend.name: PrecomputedBackend,
+    LSHBackend.name: LSHBackend,
+    EmbeddingBackend.name: EmbeddingBackend,
+}
+
+
+def create_backend(name, artifact):
+    """Otwiera indeks backendu z artefaktu albo buduje go i zapisuje obok artefaktu."""
+    if name not in BACKENDS:
+        raise ValueError(f"Nieznany backend rekomendacji: {name}")
+    backend_cls = BACKENDS[name]
+    backend = backend_cls.load(artifact)
+    if backend is None:
+        backend = backend_cls(artifact).fit()
+        backend.save(artifact)
+        print(f"RECOM INFO: Indeks '{name}' zbudowany i zapisany w artefakcie {artifact.version}.")
+    return backend
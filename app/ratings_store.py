@@ -0,0 +1,307 @@
+# ratings_store.py
+"""Kolumnowa kopia tabel ocen do budowy modelu.
+
+SQLite pozostaje źródłem prawdy - tu trafia tylko kopia do odczytu: oceny
+(ratings + implicit_ratings, jak w ``RATING_SOURCES``) posortowane po
+(movie_id, user_id), bez duplikatów par, w plikach ``.npy`` otwieranych
+przez mmap. Oceny filmu to ciągły wycinek kolumn (``offsets``), więc
+macierz film x użytkownik powstaje bez sortowania i bez czytania wierszy
+przez interfejs sqlite3.
+
+Układ katalogu RATINGS_STORE_DIR (jak MODEL_DIR):
+    current                    - nazwa bieżącej wersji kopii
+    <wersja>/manifest.json     - baza, znacznik (count, max_rowid, changes tabel ocen), skala ocen
+    <wersja>/*.npy             - movie_ids, user_ids (int32), ratings (kody int8 / float32),
+                                 movies + offsets (wycinek ocen każdego filmu)
+
+Odświeżanie jest przyrostowe: z bazy czytane są tylko wiersze o rowid
+większym niż zapisany znacznik i scalane z kopią (nowsza ocena pary
+wygrywa, także po INSERT OR REPLACE). Usunięcie lub zmiana ocen w miejscu
+(UPDATE/DELETE, licznik zmian w znaczniku) wymaga pełnego eksportu.
+
+    python -m app.ratings_store refresh     # przyrostowo (pełny eksport, gdy konieczny)
+    python -m app.ratings_store export      # pełny eksport
+    python -m app.ratings_store info        # manifest bieżącej wersji
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import time
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from .config import DATABASE_PATH, RATINGS_STORE_DIR
+from .model_store import (
+    HALF_STAR_SCALE,
+    MANIFEST_NAME,
+    RATING_SOURCES,
+    MovieIndex,
+    _build_lock,
+    _dense_codes,
+    _unique_last,
+    _write_manifest,
+    get_current_version,
+    get_db_state,
+    load_array,
+    only_appended,
+    prune_versions,
+    read_ratings,
+    save_array,
+    set_current_version
+)
+
+STORE_FORMAT_VERSION = 1
+RATING_TABLES = tuple(table for table, _ in RATING_SOURCES)
+
+
+def _pack_keys(movie_ids, user_ids):
+    """Klucze int64 sortujące oceny po (movie_id, user_id); identyfikatory muszą mieścić się w int32."""
+    keys = movie_ids.astype(np.int64)
+    keys <<= 32
+    keys += user_ids
+    # przesunięcie, żeby ujemne user_id (użytkownicy aplikacji) sortowały się przed dodatnimi
+    keys += 2 ** 31
+    return keys
+
+
+def _movie_offsets(movie_ids):
+    """Unikalne movie_id posortowanej kolumny i początki ich wycinków (długość + 1)."""
+    starts = np.flatnonzero(movie_ids[1:] != movie_ids[:-1]) + 1
+    offsets = np.concatenate([[0], starts, [len(movie_ids)]]).astype(np.int64) if len(movie_ids) \
+        else np.zeros(1, dtype=np.int64)
+    return np.asarray(movie_ids[offsets[:-1]], dtype=np.int64), offsets
+
+
+def _as_store_columns(ratings):
+    """Kolumny z ``RatingColumns`` (kolejność rowid); błąd, gdy identyfikatory nie mieszczą się w int32."""
+    user_ids, movie_ids, values = ratings.columns()
+    if user_ids.dtype != np.int32 or movie_ids.dtype != np.int32:
+        raise ValueError("identyfikatory ocen poza zakresem int32")
+    return movie_ids, user_ids, values
+
+
+def _rescale(values, scale, target_scale):
+    """Oceny zapisane ze skalą ``scale`` w skali docelowej (kody int8 -> float32, gdy docelowa to 1)."""
+    if scale == target_scale:
+        return values
+    return values.astype(np.float32) / np.float32(scale)
+
+
+class RatingsStore:
+    """Otwarta (zmapowana w pamięci) wersja kolumnowej kopii ocen."""
+
+    def __init__(self, path, mmap=True):
+        self.path = path
+        with open(os.path.join(path, MANIFEST_NAME), encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('format_version') != STORE_FORMAT_VERSION:
+            raise ValueError(f"Nieobsługiwany format kopii ocen: {self.manifest.get('format_version')}")
+        self.version = self.manifest['version']
+        self.ratings_scale = self.manifest['ratings_scale']
+        self.movie_ids = load_array(path, 'movie_ids', mmap)
+        self.user_ids = load_array(path, 'user_ids', mmap)
+        self.ratings = load_array(path, 'ratings', mmap)
+        self.movies = load_array(path, 'movies', mmap)
+        self.offsets = load_array(path, 'offsets', mmap)
+
+    def __len__(self):
+        return len(self.ratings)
+
+    @property
+    def sources(self):
+        return self.manifest['sources']
+
+    def movie_ratings(self, movie_id):
+        """(user_ids, oceny jako kody) ocen filmu - widoki na zmapowane kolumny, bez kopii."""
+        pos = int(np.searchsorted(self.movies, movie_id))
+        if pos == len(self.movies) or self.movies[pos] != movie_id:
+            return self.user_ids[:0], self.ratings[:0]
+        start, stop = self.offsets[pos], self.offsets[pos + 1]
+        return self.user_ids[start:stop], self.ratings[start:stop]
+
+    def item_user_matrix(self):
+        """Macierz film x użytkownik (CSR) jak ``build_item_user_matrix`` - bez sortowania ocen.
+
+        Wiersze to wprost wycinki ``offsets``; kolumny to numery user_id
+        (kolejność user_id w wycinku = kolejność kolumn).
+        """
+        unique_user_ids, cols = _dense_codes(self.user_ids)
+        index_dtype = np.int32 if max(len(cols), len(unique_user_ids)) < np.iinfo(np.int32).max else np.int64
+        data = self.ratings.astype(np.float64)
+        if self.ratings_scale != 1:
+            data /= self.ratings_scale
+        matrix = csr_matrix(
+            (data, cols.astype(index_dtype, copy=False), self.offsets.astype(index_dtype)),
+            shape=(len(self.movies), len(unique_user_ids))
+        )
+        matrix.eliminate_zeros()
+        return MovieIndex(np.asarray(self.movies)), matrix, unique_user_ids
+
+
+def open_store(store_dir=RATINGS_STORE_DIR, mmap=True):
+    version = get_current_version(store_dir)
+    if version is None:
+        raise FileNotFoundError(f"Brak kopii ocen w {store_dir}")
+    return RatingsStore(os.path.join(store_dir, version), mmap=mmap)
+
+
+def _write_store(store_dir, db_path, sources, movie_ids, user_ids, ratings, ratings_scale, **manifest_fields):
+    """Zapisuje nową wersję kopii w katalogu tymczasowym, publikuje ją i ustawia jako bieżącą."""
+    os.makedirs(store_dir, exist_ok=True)
+    tmp_dir = os.path.join(store_dir, f'.export-{os.getpid()}-{int(time.time())}')
+    os.makedirs(tmp_dir)
+    state_hash = hashlib.sha256(json.dumps(sources, sort_keys=True).encode()).hexdigest()
+    version = time.strftime('%Y%m%d-%H%M%S') + '-' + state_hash[:8]
+    try:
+        movies, offsets = _movie_offsets(movie_ids)
+        files = [
+            save_array(tmp_dir, 'movie_ids', movie_ids),
+            save_array(tmp_dir, 'user_ids', user_ids),
+            save_array(tmp_dir, 'ratings', ratings),
+            save_array(tmp_dir, 'movies', movies),
+            save_array(tmp_dir, 'offsets', offsets),
+        ]
+        _write_manifest(tmp_dir, {
+            'format_version': STORE_FORMAT_VERSION,
+            'version': version,
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'db_path': os.path.abspath(db_path),
+            'sources': sources,
+            'ratings_scale': ratings_scale,
+            'size': len(ratings),
+            'movies': len(movies),
+            'files': files,
+            **manifest_fields
+        })
+        final_dir = os.path.join(store_dir, version)
+        if os.path.isdir(final_dir):
+            # ten sam stan bazy wyeksportowany w tej samej sekundzie
+            shutil.rmtree(tmp_dir)
+        else:
+            os.rename(tmp_dir, final_dir)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    set_current_version(store_dir, version)
+    prune_versions(store_dir, keep=1)
+    return RatingsStore(final_dir)
+
+
+def export_store(conn, db_state, db_path=DATABASE_PATH, store_dir=RATINGS_STORE_DIR):
+    """Pełny eksport: wszystkie oceny do ``max_rowid`` z ``db_state``, posortowane i bez duplikatów."""
+    start = time.time()
+    ratings = read_ratings(conn, db_state)
+    movie_ids, user_ids, values = _as_store_columns(ratings)
+    _, order = _unique_last(_pack_keys(movie_ids, user_ids))
+    store = _write_store(store_dir, db_path, {table: db_state[table] for table in RATING_TABLES},
+                         movie_ids[order], user_ids[order], values[order], ratings.ratings_scale)
+    print(f"RATINGS INFO: Kopia ocen {store.version} wyeksportowana ({len(store)} ocen) "
+          f"w {time.time() - start:.1f}s.")
+    return store
+
+
+def update_store(conn, db_state, store, db_path=DATABASE_PATH, store_dir=RATINGS_STORE_DIR):
+    """Scala z kopią oceny dopisane od jej znacznika; None, gdy potrzebny jest pełny eksport."""
+    start = time.time()
+    old_sources = store.sources
+    if any(db_state[table]['max_rowid'] < old_sources[table]['max_rowid'] for table in RATING_TABLES):
+        print("RATINGS INFO: Baza cofnięta względem kopii ocen - potrzebny pełny eksport.")
+        return None
+
+    delta = read_ratings(conn, db_state, since=old_sources)
+    movie_ids, user_ids, values = _as_store_columns(delta)
+    appended = {
+        table: conn.execute(f"SELECT COUNT(*) FROM {table} WHERE rowid > ? AND rowid <= ?",
+                            (old_sources[table]['max_rowid'], db_state[table]['max_rowid'])).fetchone()[0]
+        if db_state[table]['max_rowid'] else 0
+        for table in RATING_TABLES
+    }
+    if not all(only_appended(old_sources[table], db_state[table], appended[table]) for table in RATING_TABLES):
+        print("RATINGS INFO: Oceny usunięte lub zmienione w miejscu - potrzebny pełny eksport.")
+        return None
+
+    # nowe oceny: ostatnia ocena każdej pary, posortowane jak kopia
+    keys, last = _unique_last(_pack_keys(movie_ids, user_ids))
+    scale = 1 if 1 in (store.ratings_scale, delta.ratings_scale) else HALF_STAR_SCALE
+    new_values = _rescale(values[last], delta.ratings_scale, scale)
+    ratings = np.array(_rescale(store.ratings, store.ratings_scale, scale))
+
+    # pary już obecne w kopii - nadpisanie oceny; pozostałe - wstawienie w miejscu wynikającym z sortowania
+    old_keys = _pack_keys(store.movie_ids, store.user_ids)
+    pos = np.searchsorted(old_keys, keys)
+    found = pos < len(old_keys)
+    found[found] = old_keys[pos[found]] == keys[found]
+    del old_keys
+    ratings[pos[found]] = new_values[found]
+    insert_at = pos[~found]
+    store = _write_store(
+        store_dir, db_path, {table: db_state[table] for table in RATING_TABLES},
+        np.insert(store.movie_ids, insert_at, movie_ids[last][~found]),
+        np.insert(store.user_ids, insert_at, user_ids[last][~found]),
+        np.insert(ratings, insert_at, new_values[~found]),
+        scale,
+        base_version=store.version,
+        incremental={'ratings': delta.size, 'replaced': int(found.sum()), 'inserted': len(insert_at)}
+    )
+    print(f"RATINGS INFO: Kopia ocen {store.version} zaktualizowana przyrostowo ({delta.size} ocen) "
+          f"w {time.time() - start:.1f}s.")
+    return store
+
+
+def refresh_store(conn, db_state, db_path=DATABASE_PATH, store_dir=RATINGS_STORE_DIR, force=False):
+    """Doprowadza kopię do stanu ``db_state`` (przyrostowo, gdy się da) i zwraca ją otwartą."""
+    with _build_lock(store_dir):
+        store = None
+        if not force:
+            try:
+                store = open_store(store_dir)
+            except (FileNotFoundError, ValueError, KeyError) as e:
+                print(f"RATINGS INFO: Brak poprawnej kopii ocen ({e}) - pełny eksport.")
+        if store is not None and store.manifest.get('db_path') != os.path.abspath(db_path):
+            print("RATINGS INFO: Kopia ocen pochodzi z innej bazy - pełny eksport.")
+            store = None
+        if store is not None:
+            if all(store.sources[table] == db_state[table] for table in RATING_TABLES):
+                return store
+            store = update_store(conn, db_state, store, db_path, store_dir)
+        return store if store is not None else export_store(conn, db_state, db_path, store_dir)
+
+
+def store_for_build(conn, db_state, db_path=DATABASE_PATH, store_dir=RATINGS_STORE_DIR):
+    """Kopia ocen w stanie ``db_state`` dla pełnej budowy modelu albo None (wyłączona lub niedostępna)."""
+    if not store_dir:
+        return None
+    try:
+        return refresh_store(conn, db_state, db_path, store_dir)
+    except (OSError, ValueError) as e:
+        print(f"RATINGS INFO: Kopia ocen niedostępna ({e}) - oceny czytane z bazy.")
+        return None
+
+
+# --- CLI ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m app.ratings_store', description="Kolumnowa kopia ocen")
+    parser.add_argument('command', choices=['refresh', 'export', 'info'])
+    parser.add_argument('--db', default=DATABASE_PATH, help="ścieżka do movielens.db")
+    parser.add_argument('--store-dir', default=RATINGS_STORE_DIR, help="katalog kopii ocen")
+    args = parser.parse_args(argv)
+
+    if args.command == 'info':
+        print(json.dumps(open_store(args.store_dir).manifest, indent=2))
+        return 0
+
+    conn = sqlite3.connect(args.db)
+    try:
+        store = refresh_store(conn, get_db_state(conn), args.db, args.store_dir, force=args.command == 'export')
+    finally:
+        conn.close()
+    print(f"RATINGS INFO: Bieżąca kopia ocen: {store.version} ({len(store)} ocen, {len(store.movies)} filmów).")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -1,101 +1,460 @@
-import pandas as pd
-from sklearn.neighbors import NearestNeighbors
-from scipy.sparse import csr_matrix
-import sqlite3
+import base64
+import json
 import os
-import re
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+from .config import (
+    DATABASE_PATH,
+    MODEL_DIR,
+    MODEL_SYNC_INTERVAL,
+    RECOMMEND_CACHE_MAX_BYTES,
+    RECOMMEND_CACHE_MAX_ENTRIES,
+    RECOMMEND_CACHE_TTL,
+    RECOMMEND_CURSOR_DEPTH,
+    RECOMMEND_WARMUP_MOVIES,
+    RECOMMENDER_BACKEND
+)
+from .admission import recommendation_executor
+from .cache import LRUCache, SingleFlight
+from .catalog import Catalog
+from .model_store import (
+    get_current_version,
+    is_locked,
+    load_or_build,
+    normalize_title,
+    open_artifact,
+    release_lock,
+    try_lock
+)
+from .neighbors import BACKENDS, create_backend
 
 # ---- Połączenie z bazą danych ----
-DATABASE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'movielens.db')
-
 def get_db_connection():
     conn = sqlite3.connect(DATABASE_PATH)
     conn.row_factory = sqlite3.Row
     return conn
 
-# --- Normalizacja tytułów ---
-def normalize_title(title):
-    if not isinstance(title, str):
-        return ""
-    # usuń rok w nawiasach
-    title = re.sub(r'\(\d{4}\)', '', title)
-    title = re.sub(r'\s+', ' ', title).strip()
-    return title.lower()
 
+# --- Pamięć podręczna wyników ---
+# Klucze zawierają wersję modelu, a podmiana modelu czyści całą zawartość.
+recommendation_cache = LRUCache(
+    max_entries=RECOMMEND_CACHE_MAX_ENTRIES or None,
+    max_bytes=RECOMMEND_CACHE_MAX_BYTES or None,
+    ttl=RECOMMEND_CACHE_TTL or None
+)
+# współbieżne żądania o ten sam wynik (np. popularny film) czekają na jedno obliczenie
+recommendation_flights = SingleFlight()
 
-# --- Wczytanie i przygotowanie danych ---
-def load_and_prepare_data():
-    conn = None
-    try:
-        conn = get_db_connection()
-        movies_df = pd.read_sql_query(
-            "SELECT movie_id, title, clean_title, clean_title_lc, genres, overview, poster_path FROM movies",
-            conn
-        )
-        ratings_df = pd.read_sql_query(
-            "SELECT user_id, movie_id, rating FROM ratings",
-            conn
-        )
 
-        print("RECOM INFO: Dane filmów i ocen załadowane z bazy danych.")
+def _cached(key, compute, admit=True):
+    """Wartość z recommendation_cache albo wyliczona raz (single-flight) i zapisana.
 
-        # Konwersja typów
-        movies_df['movie_id'] = pd.to_numeric(movies_df['movie_id'])
-        ratings_df['movie_id'] = pd.to_numeric(ratings_df['movie_id'])
-        ratings_df['user_id'] = pd.to_numeric(ratings_df['user_id'])
-        ratings_df['rating'] = pd.to_numeric(ratings_df['rating'])
+    Obliczenie idzie przez pulę z kontrolą dostępu (``admit=False`` - bez niej,
+    dla prac w tle); przy przeciążeniu wyjątek ``Overloaded``.
+    """
+    value = recommendation_cache.get(key)
+    if value is not None:
+        return value
 
-        # Usunięcie duplikatów
-        ratings_deduplicated = ratings_df.drop_duplicates(subset=['user_id', 'movie_id'])
+    def compute_once():
+        value = recommendation_executor.run(compute) if admit else compute()
+        recommendation_cache.set(key, value)
+        return value
 
-        # Upewnij się, że clean_title_lc jest lowercase
-        movies_df['clean_title_lc'] = movies_df['clean_title'].str.lower()
+    return recommendation_flights.do(key, compute_once)
 
-        # Słownik: normalized_clean_title -> movie_id
-        movie_title_to_id = pd.Series(movies_df.movie_id.values, index=movies_df['clean_title_lc']).to_dict()
 
-        # Macierz użytkownik-film
-        movie_user_mat = ratings_deduplicated.pivot(index='movie_id', columns='user_id', values='rating').fillna(0)
-        movie_user_mat_sparse = csr_matrix(movie_user_mat.values)
-        print("RECOM INFO: Macierz użytkownik-film utworzona.")
+# --- Załadowany model ---
+class RecommenderModel:
+    """Jedna załadowana wersja modelu: artefakt (mmap), katalog i backend sąsiadów."""
 
-        # Trening modelu KNN
-        model_knn = NearestNeighbors(metric='cosine', algorithm='brute')
-        model_knn.fit(movie_user_mat_sparse)
-        print("RECOM INFO: Model KNN wytrenowany.")
+    def __init__(self, artifact, backend):
+        self.artifact = artifact
+        self.version = artifact.version
+        self.catalog = Catalog(artifact)
+        self.movie_index = artifact.movie_index
+        self.matrix = artifact.matrix
+        self.backend = backend
+        self.title_to_id = artifact.title_to_id
+        # wiersze macierzy, których nie da się polecić (film spoza katalogu albo bez tytułu)
+        catalog_rows = self.catalog.rows_for_matrix_rows(np.arange(self.matrix.shape[0]))
+        self.unrecommendable = (catalog_rows < 0) | self.catalog.titles.nulls[np.maximum(catalog_rows, 0)]
+
+
+# --- Wczytanie i przygotowanie danych ---
+def load_and_prepare_data(on_progress=None):
+    """Otwiera artefakt modelu (mmap) - budując go tylko, gdy jest nieaktualny -
+    oraz backend wyszukiwania sąsiadów wybrany w MOVIEMANIAC_RECOMMENDER_BACKEND.
+    """
+    on_progress = on_progress or (lambda phase, fraction: None)
+    try:
+        artifact = load_or_build(on_progress=on_progress)
+        print("RECOM INFO: Katalog filmów i macierz użytkownik-film załadowane z artefaktu.")
 
-        return movies_df, movie_user_mat, movie_user_mat_sparse, model_knn, movie_title_to_id
+        on_progress('loading_index', 0.95)
+        backend = create_backend(RECOMMENDER_BACKEND, artifact)
+        print(f"RECOM INFO: Backend sąsiadów '{backend.name}' gotowy.")
+
+        return RecommenderModel(artifact, backend)
 
     except Exception as e:
         print(f"BŁĄD: Nie udało się załadować danych: {e}")
         raise RuntimeError(f"Nie udało się załadować danych rekomendacji: {e}")
-    finally:
-        if conn:
-            conn.close()
 
 
-# --- Globalne zmienne ---
-movies = None
-movie_user_mat = None
-movie_user_mat_sparse = None
-model_knn = None
-movie_title_to_id = None
+def _build_model_version(db_path, model_dir, backend_name, force):
+    """Budowa artefaktu i indeksu backendu w osobnym procesie (CLI model_store).
+
+    Bez ``force`` - aktualizacja przyrostowa o nowe oceny (pełna budowa tylko gdy konieczna).
+    """
+    command = [sys.executable, '-m', 'app.model_store', 'build' if force else 'update',
+               '--db', db_path, '--model-dir', model_dir]
+    if force:
+        command.append('--force')
+    env = dict(os.environ, MOVIEMANIAC_RECOMMENDER_BACKEND=backend_name)
+    result = subprocess.run(command, env=env, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else
+                           f"kod wyjścia {result.returncode}")
+    return get_current_version(model_dir)
+
+
+# przebudowa jest jedna na cały katalog modelu: blokada pliku i stan ostatniej przebudowy
+# widoczny dla wszystkich procesów roboczych (żądanie statusu może trafić do innego procesu)
+RELOAD_LOCK_NAME = '.reload.lock'
+RELOAD_STATE_NAME = 'reload.json'
+
+
+class ModelHolder:
+    """Przechowuje bieżący model i stan jego ładowania.
+
+    Model ładowany jest w wątku w tle, więc aplikacja (logowanie, listy)
+    działa od razu po starcie; do czasu gotowości ``get()`` zwraca None.
+
+    ``start_reload()`` buduje nową wersję w osobnym procesie (wątki obsługujące
+    żądania nie konkurują z nią o GIL), a potem podmienia referencję do modelu.
+    Żądanie pobiera model raz przez ``get()``, więc zaczęte żądania kończą
+    się na starej wersji.
+    """
+
+    def __init__(self, db_path=DATABASE_PATH, model_dir=MODEL_DIR, backend_name=RECOMMENDER_BACKEND):
+        self.db_path = db_path
+        self.model_dir = model_dir
+        self.backend_name = backend_name
+        self._lock = threading.Lock()
+        self._model = None
+        self._thread = None
+        self._reload_thread = None
+        self.phase = 'idle'
+        self.progress = 0.0
+        self.error = None
+        self.started_at = None
+        self.ready_at = None
+        self.last_reload = None
+        self._last_sync = time.time()
+
+    def get(self):
+        return self._model
+
+    @property
+    def ready(self):
+        return self._model is not None
+
+    def _set_progress(self, phase, fraction):
+        self.phase = phase
+        self.progress = fraction
+
+    def load(self):
+        """Ładuje model w bieżącym wątku."""
+        self.started_at = time.time()
+        self.error = None
+        try:
+            model = load_and_prepare_data(on_progress=self._set_progress)
+        except RuntimeError as e:
+            self.phase, self.error = 'failed', str(e)
+            return None
+        self._model = model
+        self.ready_at = time.time()
+        self._set_progress('ready', 1.0)
+        warm_up_cache(model)
+        return model
+
+    def start_background_load(self):
+        """Uruchamia ładowanie w wątku w tle (raz; ponownie tylko po błędzie)."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            if self.ready:
+                return False
+            self._set_progress('starting', 0.0)
+            self._thread = threading.Thread(target=self.load, name='recommender-loader', daemon=True)
+            self._thread.start()
+            return True
+
+    # --- Podmiana modelu bez przestoju ---
+    def _swap(self, model):
+        with self._lock:
+            previous = self._model
+            self._model = model
+            if self.ready_at is None:
+                self.ready_at = time.time()
+                self._set_progress('ready', 1.0)
+                self.error = None
+        print(f"RECOM INFO: Podmieniono model {previous.version if previous else None} -> {model.version}.")
+        # Czyszczenie całości jest celowe: klucz zawiera wersję, więc wpisy starej wersji i tak nie
+        # będą trafiane, a przeniesienie ich do nowej nie byłoby bezpieczne - zmieniony po złożeniu
+        # ocen wektor filmu może wejść do rankingu (albo z niego wypaść) dowolnego innego filmu,
+        # bo kosinus liczony jest do wszystkich. Zwalniamy więc pamięć i liczymy listy nowej w tle.
+        recommendation_cache.clear()
+        threading.Thread(target=warm_up_cache, args=(model,), name='recommender-warmup', daemon=True).start()
+        return previous
+
+    def sync_with_current(self):
+        """Przechodzi na wersję wskazaną w pliku ``current`` katalogu modelu, bez przebudowy.
+
+        Dzięki temu wszystkie procesy robocze serwera podchwytują wersję
+        zbudowaną przez jeden z nich (albo przez ``python -m app.model_store build``).
+        Wersja, której indeks backendu nie jest jeszcze zapisany, jest pomijana.
+        """
+        self._last_sync = time.time()
+        current = self._model
+        version = get_current_version(self.model_dir)
+        if current is None or version is None or version == current.version:
+            return False
+        try:
+            artifact = open_artifact(self.model_dir, version)
+            backend = BACKENDS[self.backend_name].load(artifact)
+        except (FileNotFoundError, ValueError, KeyError) as e:
+            print(f"RECOM INFO: Wersja {version} jeszcze niegotowa ({e}).")
+            return False
+        if backend is None:
+            return False
+        self._swap(RecommenderModel(artifact, backend))
+        return True
+
+    def maybe_sync_with_current(self, interval=MODEL_SYNC_INTERVAL):
+        """``sync_with_current`` najwyżej raz na ``interval`` sekund (wołane przy żądaniach).
+
+        Bez modelu po nieudanym ładowaniu - w tym samym rytmie ponawia ładowanie w tle.
+        """
+        if interval <= 0 or time.time() - self._last_sync < interval:
+            return False
+        if not self.ready:
+            self._last_sync = time.time()
+            return self.phase == 'failed' and self.start_background_load()
+        try:
+            return self.sync_with_current()
+        except Exception as e:
+            print(f"BŁĄD: Nie udało się przełączyć na bieżącą wersję modelu: {e}")
+            return False
+
+    def _publish_reload_state(self, reload_state):
+        path = os.path.join(self.model_dir, RELOAD_STATE_NAME)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(reload_state, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"BŁĄD: Nie udało się zapisać stanu przebudowy: {e}")
+
+    def reload_state(self):
+        """Stan ostatniej przebudowy w katalogu modelu (z dowolnego procesu) albo None.
+
+        Przebudowa "running" bez trzymanej blokady została przerwana (proces zakończył się w trakcie).
+        """
+        try:
+            with open(os.path.join(self.model_dir, RELOAD_STATE_NAME), encoding='utf-8') as f:
+                reload_state = json.load(f)
+        except (OSError, ValueError):
+            return dict(self.last_reload) if self.last_reload else None
+        if reload_state.get('state') == 'running' and not is_locked(self.model_dir, RELOAD_LOCK_NAME):
+            reload_state['state'] = 'interrupted'
+        return reload_state
+
+    def reload(self, force=False, reload_id=None):
+        """Buduje (jeśli trzeba) nową wersję w osobnym procesie i podmienia model.
+
+        Zwraca wersję serwowaną po zakończeniu. Stan przebudowy (z identyfikatorem
+        ``reload_id``) trafia do ``RELOAD_STATE_NAME`` w katalogu modelu.
+        """
+        started_at = time.time()
+        reload_state = {'id': reload_id or f"{os.getpid()}-{started_at:.6f}", 'state': 'running',
+                        'started_at': started_at, 'force': force, 'pid': os.getpid()}
+        self.last_reload = reload_state
+        self._publish_reload_state(reload_state)
+        try:
+            version = _build_model_version(self.db_path, self.model_dir, self.backend_name, force)
+
+            current = self._model
+            if current is not None and current.version == version:
+                print(f"RECOM INFO: Model {version} jest aktualny - bez podmiany.")
+                reload_state.update(state='unchanged', version=version)
+                return version
+
+            artifact = open_artifact(self.model_dir, version)
+            previous = self._swap(RecommenderModel(artifact, create_backend(self.backend_name, artifact)))
+            reload_state.update(state='swapped', version=version,
+                                previous_version=previous.version if previous else None)
+            return version
+        except Exception as e:
+            print(f"BŁĄD: Przebudowa modelu nie powiodła się: {e}")
+            reload_state.update(state='failed', error=str(e))
+            return self._model.version if self._model is not None else None
+        finally:
+            reload_state['finished_at'] = time.time()
+            reload_state['seconds'] = round(reload_state['finished_at'] - reload_state['started_at'], 2)
+            self._publish_reload_state(reload_state)
+
+    def _reload_locked(self, lock_file, force, reload_id):
+        try:
+            self.reload(force, reload_id)
+        finally:
+            release_lock(lock_file)
+
+    def start_reload(self, force=False):
+        """Uruchamia ``reload`` w wątku w tle i zwraca identyfikator przebudowy (jak w
+        ``reload_state()``). None, gdy trwa ładowanie albo przebudowa (w tym albo w innym
+        procesie roboczym)."""
+        with self._lock:
+            for thread in (self._thread, self._reload_thread):
+                if thread is not None and thread.is_alive():
+                    return None
+            lock_file = try_lock(self.model_dir, RELOAD_LOCK_NAME)
+            if lock_file is None:
+                return None
+            reload_id = f"{os.getpid()}-{time.time():.6f}"
+            self._reload_thread = threading.Thread(
+                target=self._reload_locked, args=(lock_file, force, reload_id), name='recommender-reloader',
+                daemon=True
+            )
+            self._reload_thread.start()
+            return reload_id
+
+    def wait_for_reload(self, timeout=None):
+        thread = self._reload_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def status(self):
+        model = self._model
+        status = {
+            'ready': model is not None,
+            'phase': self.phase,
+            'progress': round(self.progress, 2),
+            'version': model.version if model is not None else None,
+            'backend': model.backend.name if model is not None else RECOMMENDER_BACKEND,
+        }
+        if self.error:
+            status['error'] = self.error
+        if self.started_at:
+            end = self.ready_at or time.time()
+            status['load_seconds'] = round(end - self.started_at, 2)
+        reload_state = self.reload_state()
+        if reload_state:
+            status['last_reload'] = reload_state
+        return status
+
+
+model_holder = ModelHolder()
+
+
+def start_background_load():
+    return model_holder.start_background_load()
+
+
+def is_ready():
+    return model_holder.ready
 
-try:
-    movies, movie_user_mat, movie_user_mat_sparse, model_knn, movie_title_to_id = load_and_prepare_data()
-except RuntimeError:
-    exit(1)
+
+def get_status():
+    return model_holder.status()
+
+
+def start_reload(force=False):
+    return model_holder.start_reload(force)
+
+
+def load_model():
+    """Ładuje model synchronicznie (np. w procesie głównym serwera przed fork)."""
+    return model_holder.load()
+
+
+def sync_model_with_current():
+    return model_holder.maybe_sync_with_current()
 
 
 # --- Pobranie wszystkich tytułów filmów (dla autouzupełniania) ---
+def get_movie_titles_json_path():
+    """Plik JSON z listą {title, poster_path} z artefaktu albo None, gdy model się ładuje."""
+    model = model_holder.get()
+    return model.catalog.titles_json_path if model is not None else None
+
+
 def get_all_original_movie_titles():
-    if movies is None or movies.empty:
-        return []
-    return movies[['title', 'poster_path']].dropna(subset=['title']).to_dict(orient='records')
+    path = get_movie_titles_json_path()
+    if path is not None:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    # model się jeszcze ładuje - lista prosto z bazy
+    with get_db_connection() as conn:
+        rows = conn.execute("SELECT title, poster_path FROM movies WHERE title IS NOT NULL").fetchall()
+    return [dict(row) for row in rows]
+
+
+# --- Rekomendacje zastępcze (popularne filmy) ---
+def get_popular_movies(n=5, exclude_ids=None):
+    """Najpopularniejsze filmy (po liczbie głosów) - gdy model nie jest jeszcze gotowy."""
+    exclude_ids = set(exclude_ids or [])
+    with get_db_connection() as conn:
+        rows = conn.execute(
+            "SELECT movie_id AS id, title, overview, poster_path FROM movies "
+            "WHERE title IS NOT NULL AND vote_count IS NOT NULL "
+            "ORDER BY vote_count DESC LIMIT ?",
+            (n + len(exclude_ids),)
+        ).fetchall()
+    return [dict(row) for row in rows if row['id'] not in exclude_ids][:n]
 
 
 # --- Funkcja rekomendacji ---
+def _ranked_recommendations(model, movie_row, exclude_norm_titles, n):
+    """Do ``n`` filmów najbliższych wierszowi ``movie_row`` - bez tytułów z ``exclude_norm_titles``
+    i bez powtórzeń tytułu."""
+    num_neighbors_to_fetch = max(n, len(exclude_norm_titles) + n + 24)
+    similar_rows, _ = model.backend.query(movie_row, num_neighbors_to_fetch)
+
+    # każdy dodany tytuł też trafia do zbioru (bez duplikatów w partii)
+    normalized_exclude_titles = set(exclude_norm_titles)
+
+    catalog = model.catalog
+    final_recommendations = []
+    for row in catalog.rows_for_matrix_rows(similar_rows):
+        if row < 0 or catalog.titles.nulls[row]:
+            continue
+        normalized_current_title = catalog.norm_titles[row]
+        if normalized_current_title in normalized_exclude_titles:
+            continue
+
+        final_recommendations.append(catalog.movie(row))
+        normalized_exclude_titles.add(normalized_current_title)
+        if len(final_recommendations) >= n:
+            break
+
+    return final_recommendations
+
+
 def get_recommendations(movie_title_from_frontend, n=5, exclude_titles=None):
+    model = model_holder.get()
+    if model is None:
+        return []
+
     if not movie_title_from_frontend or not movie_title_from_frontend.strip():
         return []
 
@@ -103,71 +462,232 @@ def get_recommendations(movie_title_from_frontend, n=5, exclude_titles=None):
         exclude_titles = []
 
     target_movie_for_lookup = normalize_title(movie_title_from_frontend)
-    movie_id = movie_title_to_id.get(target_movie_for_lookup)
+    movie_id = model.title_to_id.get(target_movie_for_lookup)
 
-    if movie_id is None or movie_id not in movie_user_mat.index:
+    movie_idx_in_mat = model.movie_index.get_row(movie_id) if movie_id is not None else None
+    if movie_idx_in_mat is None:
         return []
 
-    movie_idx_in_mat = movie_user_mat.index.get_loc(movie_id)
-    num_movies_in_mat = movie_user_mat_sparse.shape[0]
-    num_neighbors_to_fetch = min(num_movies_in_mat, max(n + 1, len(exclude_titles) + n + 25))
+    # tytuły wykluczone + sam film
+    normalized_exclude_titles = {normalize_title(t) for t in exclude_titles}
+    normalized_exclude_titles.add(target_movie_for_lookup)
+
+    if len(normalized_exclude_titles) == 1 and n <= RECOMMEND_CURSOR_DEPTH:
+        # bez dodatkowych wykluczeń wynik to początek listy rankingowej filmu
+        ranked, _ = _ranked_list(model, movie_id, model.version)
+        return [dict(movie) for movie in ranked[:n]]
 
-    distances, indices = model_knn.kneighbors(
-        movie_user_mat_sparse[movie_idx_in_mat],
-        n_neighbors=num_neighbors_to_fetch
+    key = ('recommendations', model.version, movie_id, n, frozenset(normalized_exclude_titles))
+    recommendations = _cached(
+        key, lambda: _ranked_recommendations(model, movie_idx_in_mat, normalized_exclude_titles, n)
     )
+    return [dict(movie) for movie in recommendations]
 
-    similar_ids = [movie_user_mat.index[i] for i in indices.flatten()[1:] if i < num_movies_in_mat]
-    all_potential_movies_df = movies[movies['movie_id'].isin(similar_ids)]
-    all_potential_titles = all_potential_movies_df['title'].dropna().tolist()
 
-    normalized_exclude_titles = {normalize_title(t) for t in exclude_titles}
-    normalized_input_title_for_exclude = normalize_title(movie_title_from_frontend)
+# --- Kursor "pokaż więcej" ---
+# Lista rankingowa filmu liczona jest raz (RECOMMEND_CURSOR_DEPTH pozycji) i trzymana
+# w recommendation_cache; kolejna strona to wycinek listy. Kursor zawiera wersję modelu,
+# movie_id i przesunięcie. Inny proces roboczy albo wygaśnięcie wpisu przy tej samej
+# wersji modelu oznacza tylko ponowne wyliczenie tej samej listy. Kursor z nowszej
+# wersji (zbudowanej przez inny proces) przełącza proces na nią od razu. Gdy listy
+# wersji z kursora nie da się odtworzyć, przesunięcie dotyczyłoby innego rankingu
+# (powtórzone albo pominięte pozycje) - ``StaleCursor``, a klient zaczyna od pierwszej strony.
 
-    final_recommendations = []
-    seen_in_batch = set()
-
-    for original_title in all_potential_titles:
-        normalized_current_title = normalize_title(original_title)
-        if normalized_current_title not in normalized_exclude_titles and \
-           normalized_current_title != normalized_input_title_for_exclude and \
-           normalized_current_title not in seen_in_batch:
-
-            movie_row = movies[movies['title'] == original_title].iloc[0]
-            final_recommendations.append({
-                "id": movie_row["movie_id"], 
-                "title": original_title,
-                "overview": movie_row.get("overview", "Brak opisu"),
-                "poster_path": movie_row.get("poster_path", None)
-            })
-            seen_in_batch.add(normalized_current_title)
-            if len(final_recommendations) >= n:
-                break
 
-    return final_recommendations
+class StaleCursor(Exception):
+    """Kursor z wersji modelu, której ranking nie jest już dostępny w tym procesie."""
+
+
+def _encode_cursor(version, movie_id, offset):
+    raw = json.dumps([version, movie_id, offset], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        version, movie_id, offset = json.loads(raw)
+        movie_id, offset = int(movie_id), int(offset)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Nieprawidłowy kursor rekomendacji") from e
+    if not isinstance(version, str) or offset < 0:
+        raise ValueError("Nieprawidłowy kursor rekomendacji")
+    return version, movie_id, offset
+
+
+def _ranked_list(model, movie_id, version, admit=True):
+    """Lista rankingowa filmu (z pamięci, jeśli jest) i wersja modelu, z której pochodzi."""
+    if version != model.version:
+        # kursor ze starszej wersji - lista może jeszcze być w pamięci
+        ranked = recommendation_cache.get(('ranked', version, movie_id))
+        if ranked is not None:
+            return ranked, version
+    movie_row = model.movie_index.get_row(movie_id)
+    catalog_row = model.catalog.row_for_id(movie_id)
+    if movie_row is None or catalog_row is None:
+        return [], model.version
+    ranked = _cached(('ranked', model.version, movie_id), lambda: _ranked_recommendations(
+        model, movie_row, {model.catalog.norm_titles[catalog_row]}, RECOMMEND_CURSOR_DEPTH
+    ), admit=admit)
+    return ranked, model.version
+
+
+def warm_up_cache(model=None, limit=RECOMMEND_WARMUP_MOVIES):
+    """Liczy z góry listy rankingowe ``limit`` filmów z największą liczbą ocen.
+
+    Przerywa, gdy w międzyczasie podmieniono model. Zwraca liczbę policzonych list.
+    """
+    model = model or model_holder.get()
+    if model is None or limit <= 0:
+        return 0
+    start = time.time()
+    ratings_per_movie = np.diff(model.matrix.indptr)
+    top_rows = np.argsort(-ratings_per_movie, kind='stable')[:limit]
+    done = 0
+    for movie_id in model.movie_index.ids[top_rows]:
+        if model_holder.get() not in (None, model):
+            break
+        _ranked_list(model, int(movie_id), model.version, admit=False)
+        done += 1
+    print(f"RECOM INFO: Pamięć podręczna rozgrzana: {done} filmów w {time.time() - start:.1f}s.")
+    return done
+
+
+def get_similar_movies(movie_id, n=10, offset=0):
+    """Filmy podobne do ``movie_id`` (bez wyszukiwania po tytule): (filmy, łączna długość listy, wersja modelu).
+
+    None, gdy model się ładuje albo filmu nie ma w modelu.
+    """
+    model = model_holder.get()
+    if model is None or model.movie_index.get_row(movie_id) is None:
+        return None
+    ranked, version = _ranked_list(model, movie_id, model.version)
+    return [dict(movie) for movie in ranked[offset:offset + n]], len(ranked), version
+
+
+def get_recommendation_page(movie_title=None, cursor=None, n=5):
+    """Strona rekomendacji: (filmy, kursor następnej strony albo None).
+
+    Pierwsza strona - po tytule filmu, kolejne - po kursorze z poprzedniej
+    strony. ValueError przy nieprawidłowym kursorze, ``StaleCursor`` - gdy jego
+    wersji modelu nie da się już odtworzyć.
+    """
+    model = model_holder.get()
+    if model is None:
+        return [], None
+
+    if cursor:
+        version, movie_id, offset = _decode_cursor(cursor)
+        if version != model.version and model_holder.sync_with_current():
+            # kursor z nowszej wersji, na którą ten proces jeszcze nie przeszedł
+            model = model_holder.get()
+    else:
+        if not movie_title or not movie_title.strip():
+            return [], None
+        movie_id = model.title_to_id.get(normalize_title(movie_title))
+        if movie_id is None:
+            return [], None
+        version, offset = model.version, 0
+
+    ranked, ranked_version = _ranked_list(model, movie_id, version)
+    if ranked_version != version:
+        raise StaleCursor("Ranking rekomendacji się zmienił - zacznij od pierwszej strony")
+    # kopie - wywołujący dopisują do filmów własne pola
+    page = [dict(movie) for movie in ranked[offset:offset + n]]
+    next_cursor = _encode_cursor(version, movie_id, offset + n) if offset + n < len(ranked) else None
+    return page, next_cursor
+
+
+def get_recommendations_batch(movie_ids, n=5, exclude_ids=None):
+    """Rekomendacje dla wielu filmów naraz (np. całej listy do obejrzenia).
+
+    Zwraca ``(lista (movie_id, [filmy]) w kolejności movie_ids, wersja modelu,
+    który je policzył)``; film spoza modelu dostaje pustą listę. Sąsiedzi wszystkich filmów liczeni są
+    jednym zapytaniem backendu (``query_batch``), a wykluczenia (``exclude_ids``,
+    filmy bez tytułu) to maska wierszy macierzy. Przy przeciążeniu - ``Overloaded``.
+    """
+    model = model_holder.get()
+    if model is None:
+        return [], None
+
+    seed_rows = model.movie_index.get_rows(movie_ids)
+    found = seed_rows >= 0
+
+    exclude = model.unrecommendable.copy()
+    if exclude_ids:
+        exclude_rows = model.movie_index.get_rows(exclude_ids)
+        exclude[exclude_rows[exclude_rows >= 0]] = True
+
+    neighbors, _ = recommendation_executor.run(model.backend.query_batch, seed_rows[found], n, exclude=exclude)
+
+    catalog = model.catalog
+    results = []
+    seed_lists = iter(zip(catalog.rows_for_matrix_rows(np.maximum(neighbors, 0)), neighbors >= 0))
+    for movie_id, is_found in zip(movie_ids, found):
+        if not is_found:
+            results.append((movie_id, []))
+            continue
+        rows, valid = next(seed_lists)
+        results.append((movie_id, [catalog.movie(row) for row in rows[valid]]))
+    return results, model.version
+
+
+def get_personalized_recommendations(seed_ids, seed_weights=None, seen_ids=None, n=20):
+    """Rekomendacje dla całej historii użytkownika (ulubione, obejrzane).
+
+    Wynik kandydata to suma ważonych podobieństw kosinusowych do wszystkich
+    filmów z ``seed_ids``. Suma iloczynów skalarnych to iloczyn skalarny z sumą
+    wektorów, więc całość to jedno mnożenie macierzy przez wektor
+    (znormalizowane wiersze seedów zsumowane w jeden profil użytkownika).
+    Filmy z ``seen_ids`` (i same seedy) wyklucza maska bitowa.
+    """
+    model = model_holder.get()
+    if model is None:
+        return []
+
+    seed_rows = model.movie_index.get_rows(seed_ids)
+    found = seed_rows >= 0
+    if not found.any():
+        return []
+    weights = np.ones(len(seed_rows)) if seed_weights is None else np.asarray(seed_weights, dtype=np.float64)
+    seed_rows, weights = seed_rows[found], weights[found] * model.backend.inv_norms[seed_rows[found]]
+
+    profile = model.matrix[seed_rows].T @ weights
+    scores = model.matrix @ profile * model.backend.inv_norms
+
+    seen = model.unrecommendable.copy()
+    seen[seed_rows] = True
+    if seen_ids:
+        seen_rows = model.movie_index.get_rows(seen_ids)
+        seen[seen_rows[seen_rows >= 0]] = True
+    scores[seen] = -np.inf
+
+    candidates = np.flatnonzero(scores > 0)
+    if len(candidates) > n:
+        candidates = candidates[np.argpartition(-scores[candidates], n - 1)[:n]]
+    candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+
+    catalog = model.catalog
+    return [catalog.movie(row) for row in catalog.rows_for_matrix_rows(candidates)]
 
 
 # --- Pobranie szczegółów filmu ---
 def get_movie_details(movie_title):
-    if movies is None or movies.empty:
-        return {
-            "title": movie_title,
-            "poster_path": None,
-            "overview": None
-        }
-
-    movie_row = movies[movies['title'] == movie_title]
+    model = model_holder.get()
+    if model is None:
+        return _get_movie_details_from_db(movie_title)
 
-    if movie_row.empty:
-        norm_title = normalize_title(movie_title)
-        movie_row = movies[movies['clean_title_lc'] == norm_title]
+    catalog = model.catalog
+    row = catalog.row_for_title(movie_title)
+    if row is None:
+        row = catalog.row_for_clean_title(normalize_title(movie_title))
 
-    if not movie_row.empty:
-        row = movie_row.iloc[0]
+    if row is not None:
+        movie = catalog.movie(row)
         return {
-            "title": row["title"],
-            "poster_path": row.get("poster_path", None),
-            "overview": row.get("overview", None)
+            "title": movie["title"],
+            "poster_path": movie["poster_path"],
+            "overview": movie["overview"]
         }
 
     return {
@@ -177,6 +697,21 @@ def get_movie_details(movie_title):
     }
 
 
+def _get_movie_details_from_db(movie_title):
+    query = "SELECT title, poster_path, overview FROM movies WHERE {} = ? ORDER BY rowid LIMIT 1"
+    with get_db_connection() as conn:
+        row = conn.execute(query.format('title'), (movie_title,)).fetchone()
+        if row is None:
+            row = conn.execute(query.format('LOWER(clean_title)'), (normalize_title(movie_title),)).fetchone()
+    if row:
+        return dict(row)
+    return {
+        "title": movie_title,
+        "poster_path": None,
+        "overview": None
+    }
+
+
 def get_movie_full_details(title_with_year):
     """Pobiera pełne dane o filmie z tabeli movies."""
     with get_db_connection() as conn:
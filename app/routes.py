@@ -1,11 +1,28 @@
 # routes.py
 import json
-from flask import Blueprint, flash, render_template, request, jsonify, session, redirect, url_for
+from flask import Blueprint, flash, render_template, request, jsonify, send_file, session, redirect, url_for
+from .admission import Overloaded
+from .config import (
+    BATCH_MAX_N,
+    BATCH_MAX_SEEDS,
+    RECOMMEND_CURSOR_DEPTH,
+    RECOMMEND_RETRY_AFTER,
+    SIMILAR_MAX_AGE,
+    SIMILAR_MAX_N
+)
+from .feed import get_feed
 from .recommender import (
-    get_recommendations,
+    StaleCursor,
+    get_recommendation_page,
+    get_recommendations_batch,
+    get_similar_movies,
     get_all_original_movie_titles,
+    get_movie_titles_json_path,
     get_movie_full_details,
-    get_movie_details
+    get_movie_details,
+    get_popular_movies,
+    get_status,
+    is_ready
 )
 from .db_utils import (
     get_all_genres,
@@ -23,6 +40,16 @@ from .db_utils import (
 
 main = Blueprint('main', __name__)
 
+
+def _overloaded_response(error):
+    """Szybka odmowa, gdy pula obliczeń rekomendacji jest przeciążona."""
+    response = jsonify({'error': str(error), 'overloaded': True})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(RECOMMEND_RETRY_AFTER)
+    response.cache_control.no_store = True
+    return response
+
+
 # --- Strony główne ---
 @main.route("/", methods=["GET"])
 def index():
@@ -32,10 +59,37 @@ def index():
 def dashboard():
     if 'user_id' not in session:
         return redirect(url_for('auth.login'))
-    return render_template("dashboard.html")
+    # gotowa lista z pamięci (liczona w tle) - None, gdy jeszcze w przygotowaniu
+    return render_template("dashboard.html", feed=get_feed(session['user_id']))
+
+
+@main.route("/api/feed", methods=["GET"])
+def feed():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Nieautoryzowany dostęp'}), 401
+    items = get_feed(session['user_id'])
+    return jsonify({'ready': items is not None, 'recommendations': items or []})
+
+# --- Stan aplikacji ---
+@main.route("/healthz", methods=["GET"])
+def healthz():
+    """Liveness: proces odpowiada (niezależnie od stanu modelu)."""
+    return jsonify({'status': 'ok', 'model': get_status()})
+
+
+@main.route("/readyz", methods=["GET"])
+def readyz():
+    """Readiness: 200 dopiero, gdy model rekomendacji jest załadowany."""
+    status = get_status()
+    return jsonify(status), (200 if status['ready'] else 503)
+
 
 @main.route("/get_movie_titles", methods=["GET"])
 def get_movie_titles():
+    # gotowy plik z artefaktu modelu - wspólny dla wszystkich procesów przez page cache
+    path = get_movie_titles_json_path()
+    if path is not None:
+        return send_file(path, mimetype='application/json')
     all_titles = get_all_original_movie_titles()
     return jsonify(all_titles)
 
@@ -53,8 +107,19 @@ def recommend():
         flash('Nie wybrano filmu do rekomendacji.', 'error')
         return redirect(url_for('main.dashboard'))
 
-    # pobieramy 20 rekomendacji
-    recommendations = get_recommendations(movie_title, n=20)
+    # pobieramy 20 rekomendacji (albo popularne filmy, gdy model jeszcze się ładuje)
+    # kursor wskazuje kolejne pozycje tej samej listy (przycisk "Load more")
+    cursor = None
+    recommendations = None
+    if is_ready():
+        try:
+            recommendations, cursor = get_recommendation_page(movie_title, n=20)
+        except Overloaded:
+            flash('Serwer jest teraz mocno obciążony - na razie pokazujemy popularne filmy.', 'info')
+    else:
+        flash('Rekomendacje są jeszcze przygotowywane - na razie pokazujemy popularne filmy.', 'info')
+    if recommendations is None:
+        recommendations = get_popular_movies(n=20)
     selected_movie = get_movie_details(movie_title)
 
     user_id = session['user_id']
@@ -68,6 +133,7 @@ def recommend():
         "recommendations.html",
         movie=selected_movie,
         recommendations=recommendations,
+        cursor=cursor,
         watchlist_ids=watchlist_ids,
         watched_ids=watched_ids,
         favorite_ids=[m['movie_id'] for m in get_favorites_for_user(user_id)]
@@ -79,39 +145,128 @@ def recommend():
 
 @main.route('/get_new_recommendations', methods=['POST'])
 def get_new_recommendations():
+    """Kolejna strona rekomendacji.
+
+    Wejście: {"cursor": ...} z poprzedniej strony (albo {"movie_title": ..., "n": ...}
+    dla pierwszej). Gdy model się ładuje - popularne filmy z pominięciem ``displayed_ids``.
+    Kursor z rankingu, którego nie da się już odtworzyć (nowa wersja modelu) - 409
+    z ``restart``: klient pobiera listę od pierwszej strony zamiast dopisywać powtórki.
+    """
     if 'user_id' not in session:
         return jsonify({'error': 'Nieautoryzowany dostęp'}), 401
 
-    from .recommender import normalize_title
-
     data = request.get_json() or {}
-    movie_title = data.get('movie_title', '')
-    displayed_raw = data.get('displayed_titles', [])
-
-    # normalizacja tytułów
-    displayed_norm = []
-    for x in displayed_raw:
-        if isinstance(x, dict) and 'title' in x:
-            displayed_norm.append(normalize_title(x['title']))
-        elif isinstance(x, str):
-            displayed_norm.append(normalize_title(x))
-
-    movie_norm = normalize_title(movie_title)
-    exclude_titles = list(set(displayed_norm + [movie_norm]))
-
-    new_recs = get_recommendations(movie_title, n=5, exclude_titles=exclude_titles)
+    n = data.get('n', 5)
+    if type(n) is not int or not 1 <= n <= RECOMMEND_CURSOR_DEPTH:
+        return jsonify({'error': f'n od 1 do {RECOMMEND_CURSOR_DEPTH}'}), 400
+
+    warming_up = not is_ready()
+    next_cursor = None
+    if warming_up:
+        new_recs = get_popular_movies(n=n, exclude_ids=data.get('displayed_ids', []))
+    else:
+        try:
+            new_recs, next_cursor = get_recommendation_page(
+                data.get('movie_title', ''), cursor=data.get('cursor'), n=n
+            )
+        except StaleCursor as e:
+            return jsonify({'error': str(e), 'restart': True}), 409
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Overloaded as e:
+            return _overloaded_response(e)
 
     user_id = session['user_id']
-    user_watchlist = get_watchlist_for_user(user_id)
-    user_watchlist_ids = [m['movie_id'] for m in user_watchlist]
+    # in_watchlist jak wcześniej - każdy wpis listy, także już obejrzany
+    watchlist = get_watchlist_for_user(user_id)
+    watchlist_ids = {m['movie_id'] for m in watchlist}
+    watched_ids = {m['movie_id'] for m in watchlist if m['watched']}
+    favorite_ids = {m['movie_id'] for m in get_favorites_for_user(user_id)}
 
     # używamy movie_id zamiast tytułu
-    final_recs = []
     for rec in new_recs:
-        rec['in_watchlist'] = rec['id'] in user_watchlist_ids
-        final_recs.append(rec)
+        rec['in_watchlist'] = rec['id'] in watchlist_ids
+        rec['in_watched'] = rec['id'] in watched_ids
+        rec['in_favorites'] = rec['id'] in favorite_ids
+
+    return jsonify({'recommendations': new_recs, 'cursor': next_cursor, 'warming_up': warming_up})
+
+
+@main.route('/api/movies/<int:movie_id>/similar', methods=['GET'])
+def similar_movies(movie_id):
+    """Filmy podobne po movie_id: ?n=10&offset=0.
+
+    Celowo bez sprawdzania sesji, jak strona filmu i lista tytułów: to dane
+    katalogu, bez pól zależnych od użytkownika (na liście do obejrzenia itp.).
+    Odpowiedź zależy tylko od wersji modelu, więc ETag to wersja, a
+    Cache-Control: public pozwala przeglądarkom, proxy i CDN trzymać ją
+    ``SIMILAR_MAX_AGE`` s - wspólnie dla wszystkich użytkowników.
+    """
+    n = request.args.get('n', 10, type=int)
+    offset = request.args.get('offset', 0, type=int)
+    if not 1 <= n <= SIMILAR_MAX_N or offset < 0:
+        return jsonify({'error': f'n od 1 do {SIMILAR_MAX_N}, offset >= 0'}), 400
+
+    if not is_ready():
+        response = jsonify({'error': 'Model rekomendacji jeszcze się ładuje', 'warming_up': True})
+        response.status_code = 503
+        response.headers['Retry-After'] = '5'
+        response.cache_control.no_store = True
+        return response
+
+    try:
+        result = get_similar_movies(movie_id, n=n, offset=offset)
+    except Overloaded as e:
+        return _overloaded_response(e)
+    if result is None:
+        return jsonify({'error': 'Nie znaleziono filmu w modelu rekomendacji'}), 404
+    movies, total, version = result
+
+    next_offset = offset + n if offset + n < total else None
+    response = jsonify({'movie_id': movie_id, 'similar': movies, 'next_offset': next_offset, 'version': version})
+    response.set_etag(version)
+    response.cache_control.public = True
+    response.cache_control.max_age = SIMILAR_MAX_AGE
+    return response.make_conditional(request)
+
+
+@main.route('/api/recommendations/batch', methods=['POST'])
+def recommendations_batch():
+    """Rekomendacje dla wielu filmów w jednym wywołaniu.
+
+    Wejście: {"movie_ids": [...], "n": 5, "exclude_ids": [...]}
+    Wyjście: {"results": [{"movie_id": ..., "recommendations": [...]}, ...], "version": ...}
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Nieautoryzowany dostęp'}), 401
 
-    return jsonify({'recommendations': final_recs})
+    data = request.get_json(silent=True) or {}
+    try:
+        movie_ids = [int(x) for x in data.get('movie_ids', [])]
+        exclude_ids = [int(x) for x in data.get('exclude_ids', [])]
+        n = int(data.get('n', 5))
+    except (TypeError, ValueError, OverflowError):
+        return jsonify({'error': 'movie_ids, exclude_ids i n muszą być liczbami całkowitymi'}), 400
+    # identyfikatory trafiają do tablic int64
+    if any(not -2 ** 63 <= x < 2 ** 63 for x in movie_ids + exclude_ids):
+        return jsonify({'error': 'movie_ids i exclude_ids poza zakresem identyfikatorów'}), 400
+    if not movie_ids:
+        return jsonify({'error': 'Brak movie_ids'}), 400
+    if len(movie_ids) > BATCH_MAX_SEEDS or not 1 <= n <= BATCH_MAX_N:
+        return jsonify({'error': f'Limit: {BATCH_MAX_SEEDS} filmów, n od 1 do {BATCH_MAX_N}'}), 400
+
+    if not is_ready():
+        return jsonify({'error': 'Model rekomendacji jeszcze się ładuje', 'warming_up': True}), 503
+
+    try:
+        results, version = get_recommendations_batch(movie_ids, n=n, exclude_ids=exclude_ids)
+    except Overloaded as e:
+        return _overloaded_response(e)
+    # wersja modelu, który policzył wynik (nie bieżąca - mogła się zmienić w trakcie)
+    return jsonify({
+        'results': [{'movie_id': movie_id, 'recommendations': recs} for movie_id, recs in results],
+        'version': version
+    })
 
 # --- Watchlist ---
 @main.route('/movies-list', methods=['GET'])
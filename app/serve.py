@@ -0,0 +1,105 @@
+# serve.py
+"""Produkcyjny serwer aplikacji (gunicorn) z modelem ładowanym przed fork.
+
+Proces główny tworzy aplikację i synchronicznie ładuje model rekomendacji,
+a dopiero potem uruchamia procesy robocze - dzielą one strony modelu
+(mmap artefaktu i obiekty Pythona, copy-on-write) zamiast ładować go osobno.
+
+    python -m app.serve [--bind 0.0.0.0:5000] [--workers N] [--threads T]
+
+Sygnały procesu głównego (gunicorn): HUP - łagodny restart procesów
+roboczych, TERM - łagodne zatrzymanie, TTIN/TTOU - +/- jeden proces roboczy.
+Nowy proces roboczy przechodzi na bieżącą wersję artefaktu (plik ``current``),
+jeśli od startu serwera zbudowano nowszą, a gdy proces główny nie załadował
+modelu - ładuje go sam w tle.
+"""
+import argparse
+
+from .config import (
+    SERVE_BIND,
+    SERVE_GRACEFUL_TIMEOUT,
+    SERVE_MAX_REQUESTS,
+    SERVE_MAX_REQUESTS_JITTER,
+    SERVE_THREADS,
+    SERVE_TIMEOUT,
+    SERVE_WORKERS
+)
+
+
+def _post_fork(server, worker):
+    from .recommender import model_holder
+    from .threads import limit_native_threads
+    limit_native_threads()
+    if model_holder.ready:
+        model_holder.sync_with_current()
+    else:
+        # ładowanie w procesie głównym się nie udało (brak artefaktu, baza niegotowa) -
+        # proces roboczy próbuje sam, w tle, zamiast odpowiadać 503 do ręcznej przebudowy
+        model_holder.start_background_load()
+
+
+def _when_ready(server):
+    from .recommender import get_status
+    status = get_status()
+    server.log.info("SERVE INFO: model %s (%s) gotowy: %s", status['version'], status['backend'], status['ready'])
+
+
+def build_options(args):
+    return {
+        'bind': args.bind,
+        'workers': args.workers,
+        'threads': args.threads,
+        'worker_class': 'gthread' if args.threads > 1 else 'sync',
+        'preload_app': True,
+        'max_requests': args.max_requests,
+        'max_requests_jitter': args.max_requests_jitter,
+        'timeout': args.timeout,
+        'graceful_timeout': args.graceful_timeout,
+        'accesslog': '-',
+        'post_fork': _post_fork,
+        'when_ready': _when_ready
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m app.serve', description="Serwer produkcyjny MovieManiac")
+    parser.add_argument('--bind', default=SERVE_BIND, help="adres:port")
+    parser.add_argument('--workers', type=int, default=SERVE_WORKERS, help="liczba procesów roboczych")
+    parser.add_argument('--threads', type=int, default=SERVE_THREADS, help="wątki na proces roboczy")
+    parser.add_argument('--max-requests', type=int, default=SERVE_MAX_REQUESTS,
+                        help="restart procesu roboczego po tylu żądaniach (0 = bez limitu)")
+    parser.add_argument('--max-requests-jitter', type=int, default=SERVE_MAX_REQUESTS_JITTER)
+    parser.add_argument('--timeout', type=int, default=SERVE_TIMEOUT, help="limit czasu żądania (s)")
+    parser.add_argument('--graceful-timeout', type=int, default=SERVE_GRACEFUL_TIMEOUT,
+                        help="czas na dokończenie żądań przy restarcie (s)")
+    args = parser.parse_args(argv)
+
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        print("BŁĄD: Brak pakietu gunicorn (pip install -r requirements.txt); "
+              "do pracy lokalnej służy `python main.py`.")
+        return 1
+
+    from . import create_app
+
+    class MovieManiacServer(BaseApplication):
+
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            # wywoływane raz w procesie głównym (preload_app) - przed fork
+            return create_app(preload_model=True)
+
+    MovieManiacServer(build_options(args)).run()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
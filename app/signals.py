@@ -0,0 +1,296 @@
+# signals.py
+"""Sygnały z aplikacji (ulubione, obejrzane, lista do obejrzenia) jako oceny niejawne.
+
+Funkcje z db_utils zgłaszają zmianę pary (użytkownik, film) przez
+``record_signal`` - to tylko wrzucenie do kolejki w pamięci. Wątek zapisujący
+co ``SIGNALS_FLUSH_INTERVAL`` s (albo po ``SIGNALS_BATCH_SIZE`` zdarzeniach)
+wylicza bieżącą ocenę niejawną każdej zmienionej pary z tabel favorites /
+watchlist i dopisuje ją jedną transakcją do tabeli ``implicit_ratings``
+(dziennik tylko do dopisywania - ostatni wpis pary wygrywa, 0 usuwa ocenę).
+
+Model czyta ten dziennik razem z tabelą ratings (użytkownicy aplikacji jako
+ujemne user_id, żeby nie zderzyć się z użytkownikami MovieLens), a
+``python -m app.model_store update`` nakłada nowe wpisy przyrostowo.
+
+CLI: ``python -m app.signals backfill|stats``.
+"""
+import argparse
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from .config import (
+    DATABASE_PATH,
+    MODEL_DIR,
+    SIGNALS_BATCH_SIZE,
+    SIGNALS_FLUSH_INTERVAL,
+    SIGNALS_FOLD_INTERVAL,
+    SIGNALS_QUEUE_SIZE
+)
+
+# ocena niejawna pary = waga najsilniejszego bieżącego sygnału
+SIGNAL_WEIGHTS = {
+    'favorite': 5.0,
+    'watched': 4.0,
+    'watchlist': 3.5,
+}
+
+# oceny nakłada na model jeden proces roboczy - ten, który trzyma blokadę w katalogu modelu
+FOLD_LOCK_NAME = '.fold.lock'
+
+IMPLICIT_RATINGS_DDL = """
+    CREATE TABLE IF NOT EXISTS implicit_ratings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        movie_id INTEGER NOT NULL,
+        rating REAL NOT NULL,
+        created_at REAL NOT NULL
+    )
+"""
+
+
+def ensure_schema(conn):
+    conn.execute(IMPLICIT_RATINGS_DDL)
+
+
+def implicit_ratings(conn, pairs):
+    """Bieżące oceny niejawne dla listy par (user_id, movie_id) na podstawie favorites i watchlist."""
+    ratings = {pair: 0.0 for pair in pairs}
+    for start in range(0, len(pairs), 400):
+        chunk = pairs[start:start + 400]
+        values = ','.join(['(?, ?)'] * len(chunk))
+        params = [value for pair in chunk for value in pair]
+        for user_id, movie_id, watched in conn.execute(
+                f"SELECT user_id, movie_id, watched FROM watchlist WHERE (user_id, movie_id) IN (VALUES {values})",
+                params):
+            weight = SIGNAL_WEIGHTS['watched'] if watched else SIGNAL_WEIGHTS['watchlist']
+            ratings[(user_id, movie_id)] = max(ratings[(user_id, movie_id)], weight)
+        for user_id, movie_id in conn.execute(
+                f"SELECT user_id, movie_id FROM favorites WHERE (user_id, movie_id) IN (VALUES {values})",
+                params):
+            ratings[(user_id, movie_id)] = SIGNAL_WEIGHTS['favorite']
+    return ratings
+
+
+class SignalWriter:
+    """Kolejka zdarzeń i wątek, który zapisuje je partiami do implicit_ratings.
+
+    Wątek startuje leniwie przy pierwszym zdarzeniu w danym procesie (także
+    w procesie roboczym po fork). Gdy kolejka jest pełna, zdarzenie jest
+    pomijane i liczone w ``dropped`` - stan da się odtworzyć przez ``backfill``.
+    Model aktualizuje tylko jeden proces roboczy (zob. ``_maybe_fold``).
+    """
+
+    def __init__(self, db_path=DATABASE_PATH, batch_size=SIGNALS_BATCH_SIZE,
+                 flush_interval=SIGNALS_FLUSH_INTERVAL, fold_interval=SIGNALS_FOLD_INTERVAL, model_dir=MODEL_DIR):
+        self.db_path = db_path
+        self.model_dir = model_dir
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fold_interval = fold_interval
+        self._queue = queue.Queue(maxsize=SIGNALS_QUEUE_SIZE)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._last_fold = time.time()
+        self._unfolded = False
+        self._fold_lock = None
+        self._fold_pid = None
+        self.received = 0
+        self.dropped = 0
+        self.batches = 0
+        self.rows_written = 0
+        self.last_lag = None
+
+    def record(self, user_id, movie_id, kind):
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((int(user_id), int(movie_id), kind, time.time()))
+            self.received += 1
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_started(self):
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='signal-writer', daemon=True)
+            self._thread.start()
+
+    def _next_batch(self, timeout=None):
+        """Czeka na pierwsze zdarzenie, potem zbiera kolejne do limitu partii albo upływu interwału.
+
+        Zwraca pustą listę, gdy przez ``timeout`` s nie przyszło żadne zdarzenie.
+        """
+        try:
+            batch = [self._queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        deadline = time.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            # z niezłożonymi zapisami czekamy najwyżej do terminu nałożenia ich na model
+            timeout = None
+            if (self._unfolded or self._fold_lock is not None) and self.fold_interval > 0:
+                timeout = max(0.0, self._last_fold + self.fold_interval - time.time())
+            batch = self._next_batch(timeout)
+            if batch:
+                try:
+                    self.flush(batch)
+                except sqlite3.Error as e:
+                    print(f"BŁĄD: Zapis sygnałów nie powiódł się ({len(batch)} zdarzeń): {e}")
+            self._maybe_fold()
+
+    def flush(self, batch):
+        """Zapisuje partię: jedna ocena na parę (zdarzenia tej samej pary są scalane)."""
+        pairs = list(dict.fromkeys((user_id, movie_id) for user_id, movie_id, _, _ in batch))
+        now = time.time()
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            ensure_schema(conn)
+            ratings = implicit_ratings(conn, pairs)
+            conn.executemany(
+                "INSERT INTO implicit_ratings (user_id, movie_id, rating, created_at) VALUES (?, ?, ?, ?)",
+                [(user_id, movie_id, ratings[(user_id, movie_id)], now) for user_id, movie_id in pairs]
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        self._unfolded = True
+        self.batches += 1
+        self.rows_written += len(pairs)
+        self.last_lag = round(time.time() - min(created for _, _, _, created in batch), 3)
+
+    def _is_folder(self):
+        """Czy ten proces nakłada oceny na model; przejmuje tę rolę, gdy nikt jej nie ma (np. po końcu procesu)."""
+        if self._fold_lock is not None and self._fold_pid == os.getpid():
+            return True
+        from .model_store import try_lock
+        self._fold_lock = try_lock(self.model_dir, FOLD_LOCK_NAME)
+        self._fold_pid = os.getpid()
+        return self._fold_lock is not None
+
+    def _has_unfolded_rows(self):
+        """Czy w implicit_ratings są oceny nowsze niż w opublikowanej wersji modelu (też z innych procesów)."""
+        from .model_store import read_manifest
+        manifest = read_manifest(self.model_dir)
+        if manifest is None:
+            return False
+        watermark = manifest['db_state'].get('implicit_ratings', {}).get('max_rowid', 0)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            ensure_schema(conn)
+            max_rowid = conn.execute("SELECT MAX(rowid) FROM implicit_ratings").fetchone()[0] or 0
+        finally:
+            conn.close()
+        return max_rowid > watermark
+
+    def _maybe_fold(self):
+        """Co ``fold_interval`` s nakłada zapisane oceny na model (aktualizacja przyrostowa).
+
+        Robi to tylko jeden proces roboczy (blokada ``FOLD_LOCK_NAME`` w katalogu
+        modelu), także za pozostałe - one tylko zapisują oceny do bazy, a nową
+        wersję podchwytują przez ``sync_with_current``.
+        """
+        if self.fold_interval <= 0 or time.time() - self._last_fold < self.fold_interval:
+            return
+        if not self._unfolded and self._fold_lock is None:
+            return
+        self._last_fold = time.time()
+        if not self._is_folder():
+            # oceny są już w bazie - nałoży je proces, który trzyma blokadę
+            self._unfolded = False
+            return
+        try:
+            pending = self._unfolded or self._has_unfolded_rows()
+        except sqlite3.Error as e:
+            print(f"BŁĄD: Nie udało się sprawdzić niezłożonych ocen: {e}")
+            return
+        from .recommender import start_reload
+        # gdy trwa inne ładowanie/przebudowa - kolejna próba po następnym interwale
+        if pending and start_reload():
+            self._unfolded = False
+
+    def stats(self):
+        return {
+            'received': self.received,
+            'dropped': self.dropped,
+            'queued': self._queue.qsize(),
+            'batches': self.batches,
+            'rows_written': self.rows_written,
+            'events_per_row': round(self.received / self.rows_written, 2) if self.rows_written else None,
+            'last_lag_seconds': self.last_lag,
+            'folds_model': self._fold_lock is not None and self._fold_pid == os.getpid(),
+        }
+
+
+signal_writer = SignalWriter()
+
+
+def record_signal(user_id, movie_id, kind):
+    """Zgłasza zmianę sygnału pary (użytkownik, film) - nie blokuje żądania."""
+    from .feed import invalidate_feed
+    signal_writer.record(user_id, movie_id, kind)
+    invalidate_feed(user_id)
+
+
+def backfill(db_path=DATABASE_PATH):
+    """Dopisuje bieżące oceny niejawne wszystkich par z favorites i watchlist."""
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        ensure_schema(conn)
+        pairs = conn.execute(
+            "SELECT user_id, movie_id FROM favorites UNION SELECT user_id, movie_id FROM watchlist"
+        ).fetchall()
+        ratings = implicit_ratings(conn, pairs)
+        now = time.time()
+        conn.executemany(
+            "INSERT INTO implicit_ratings (user_id, movie_id, rating, created_at) VALUES (?, ?, ?, ?)",
+            [(user_id, movie_id, rating, now) for (user_id, movie_id), rating in ratings.items()]
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    print(f"SIGNALS INFO: Zapisano {len(pairs)} ocen niejawnych.")
+    return len(pairs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m app.signals', description="Oceny niejawne z sygnałów aplikacji")
+    parser.add_argument('command', choices=['backfill', 'stats'])
+    parser.add_argument('--db', default=DATABASE_PATH, help="ścieżka do movielens.db")
+    args = parser.parse_args(argv)
+
+    if args.command == 'backfill':
+        backfill(args.db)
+    elif args.command == 'stats':
+        conn = sqlite3.connect(args.db)
+        try:
+            ensure_schema(conn)
+            rows, pairs, users = conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT user_id || ':' || movie_id), COUNT(DISTINCT user_id) "
+                "FROM implicit_ratings"
+            ).fetchone()
+        finally:
+            conn.close()
+        print(f"wpisy: {rows}, pary: {pairs}, użytkownicy: {users}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
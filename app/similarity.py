@@ -0,0 +1,290 @@
+# similarity.py
+"""Offline'owe wyliczenie top-K podobnych filmów dla całego katalogu.
+
+Podobieństwo kosinusowe liczone jest blokami wierszy (iloczyn rzadkiej
+macierzy bloku i transpozycji całej macierzy), a bloki rozdzielane są między
+procesy. Wynik trafia do tabeli ``similar_movies(movie_id, rank, neighbor_id, score)``
+w movielens.db, z której get_recommendations czyta przy
+``MOVIEMANIAC_RECOMMENDER_BACKEND=precomputed``.
+
+Uruchomienie: ``python -m app.similarity [--k 100] [--workers N]``.
+"""
+import argparse
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .config import DATABASE_PATH, MODEL_DIR, SIMILAR_TOP_K
+from .model_store import open_artifact
+
+DEFAULT_BLOCK_SIZE = 256
+
+# artefakt otwierany raz na proces roboczy (mmap - strony współdzielone przez page cache)
+_worker_state = {}
+
+
+def _safe_inverse(norms):
+    inv = np.zeros_like(norms, dtype=np.float64)
+    np.divide(1.0, norms, out=inv, where=norms > 0)
+    return inv
+
+
+def cosine_block(matrix, inv_norms, rows):
+    """Podobieństwa kosinusowe wierszy ``rows`` do wszystkich wierszy (float32, len(rows) x n)."""
+    scores = (matrix[rows] @ matrix.T).toarray().astype(np.float32)
+    scores *= inv_norms[rows, None].astype(np.float32)
+    scores *= inv_norms[None, :].astype(np.float32)
+    return scores
+
+
+def topk_rows(matrix, inv_norms, rows, k):
+    """Zwraca (wiersze sąsiadów, podobieństwa) dla wierszy ``rows`` - bez samego filmu."""
+    rows = np.asarray(rows)
+    scores = cosine_block(matrix, inv_norms, rows)
+    scores[np.arange(len(rows)), rows] = -np.inf
+
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind='stable')
+    return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+
+def topk_block(matrix, inv_norms, start, stop, k):
+    """``topk_rows`` dla ciągłego bloku wierszy [start, stop)."""
+    return topk_rows(matrix, inv_norms, np.arange(start, stop), k)
+
+
+def _init_worker(model_dir, version):
+    artifact = open_artifact(model_dir, version)
+    _worker_state['matrix'] = artifact.matrix
+    _worker_state['inv_norms'] = _safe_inverse(artifact.row_norms)
+
+
+def _worker_block(args):
+    start, stop, k = args
+    rows, scores = topk_block(_worker_state['matrix'], _worker_state['inv_norms'], start, stop, k)
+    return start, rows, scores
+
+
+SIMILAR_MOVIES_DDL = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        movie_id INTEGER NOT NULL,
+        rank INTEGER NOT NULL,
+        neighbor_id INTEGER NOT NULL,
+        score REAL NOT NULL,
+        PRIMARY KEY (movie_id, rank)
+    ) WITHOUT ROWID
+"""
+
+
+def ensure_schema(conn):
+    conn.execute(SIMILAR_MOVIES_DDL.format(table='similar_movies'))
+    conn.execute("CREATE TABLE IF NOT EXISTS model_meta (key TEXT PRIMARY KEY, value TEXT)")
+
+
+def compute_similar_movies(db_path=DATABASE_PATH, model_dir=MODEL_DIR, k=SIMILAR_TOP_K,
+                           block_size=DEFAULT_BLOCK_SIZE, workers=None):
+    """Liczy top-K sąsiadów każdego filmu i podmienia zawartość tabeli similar_movies."""
+    start_time = time.time()
+    artifact = open_artifact(model_dir)
+    n_movies = artifact.matrix.shape[0]
+    k = min(k, n_movies - 1)
+    if k <= 0:
+        raise ValueError("Za mało filmów w macierzy, aby wyznaczyć sąsiadów")
+    movie_ids = np.asarray(artifact.movie_index.ids)
+    workers = workers or os.cpu_count() or 1
+
+    tasks = [(start, min(start + block_size, n_movies), k) for start in range(0, n_movies, block_size)]
+
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        ensure_schema(conn)
+        conn.execute("DROP TABLE IF EXISTS similar_movies_new")
+        conn.execute(SIMILAR_MOVIES_DDL.format(table='similar_movies_new'))
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(model_dir, artifact.version)) as pool:
+            done = 0
+            for start, rows, scores in pool.map(_worker_block, tasks):
+                seed_ids = np.repeat(movie_ids[start:start + len(rows)], k)
+                ranks = np.tile(np.arange(1, k + 1), len(rows))
+                conn.executemany(
+                    "INSERT INTO similar_movies_new (movie_id, rank, neighbor_id, score) VALUES (?, ?, ?, ?)",
+                    zip(seed_ids.tolist(), ranks.tolist(), movie_ids[rows.ravel()].tolist(),
+                        scores.ravel().astype(np.float64).tolist())
+                )
+                done += len(rows)
+                print(f"SIMILAR INFO: {done}/{n_movies} filmów", end='\r')
+
+        # podmiana tabeli w jednej transakcji - czytelnicy widzą starą albo nową wersję
+        conn.execute("DROP TABLE similar_movies")
+        conn.execute("ALTER TABLE similar_movies_new RENAME TO similar_movies")
+        conn.executemany(
+            "INSERT OR REPLACE INTO model_meta (key, value) VALUES (?, ?)",
+            [('similar_movies_version', artifact.version), ('similar_movies_k', str(k))]
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    print(f"\nSIMILAR INFO: Tabela similar_movies ({n_movies} x {k}) zapisana w {time.time() - start_time:.1f}s.")
+    return artifact.version
+
+
+# powyżej tego ułamka zmienionych filmów taniej jest przeliczyć całą tabelę
+FULL_REFRESH_FRACTION = 0.2
+
+
+def _rows_for_ids(movie_ids, ids):
+    """Wiersze macierzy dla tablicy movie_id (-1 dla filmów spoza macierzy)."""
+    ids = np.asarray(ids, dtype=np.int64)
+    pos = np.minimum(np.searchsorted(movie_ids, ids), max(len(movie_ids) - 1, 0))
+    return np.where(movie_ids[pos] == ids, pos, -1) if len(movie_ids) else np.full(len(ids), -1)
+
+
+def _chunks(values, size=500):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def refresh_similar_movies(db_path, artifact, changed_ids, block_size=DEFAULT_BLOCK_SIZE):
+    """Aktualizuje tabelę similar_movies po przyrostowej aktualizacji artefaktu.
+
+    Podobieństwo dwóch filmów zmienia się tylko wtedy, gdy zmienił się któryś
+    z nich, więc: listy zmienionych filmów liczone są od nowa, a w listach
+    pozostałych filmów wymieniane są wyłącznie pozycje zmienionych filmów
+    (wchodzą, gdy ich nowe podobieństwo nie jest niższe od ostatniej pozycji
+    listy). Lista, z której zmieniony film wypadł bez następcy, jest liczona
+    od nowa. Tabela musi odpowiadać wersji bazowej artefaktu - inaczej nic
+    nie jest zmieniane. Zwraca True, gdy tabela została zaktualizowana.
+    """
+    start_time = time.time()
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        try:
+            meta = dict(conn.execute("SELECT key, value FROM model_meta").fetchall())
+        except sqlite3.OperationalError:
+            return False
+        base_version = artifact.manifest.get('base_version')
+        if meta.get('similar_movies_version') != base_version:
+            print("SIMILAR INFO: Tabela similar_movies nie odpowiada poprzedniej wersji modelu - "
+                  "pełne przeliczenie: python -m app.similarity")
+            return False
+
+        movie_ids = np.asarray(artifact.movie_index.ids)
+        n_movies = len(movie_ids)
+        k = min(int(meta['similar_movies_k']), n_movies - 1)
+        changed_rows = np.searchsorted(movie_ids, np.asarray(changed_ids))
+        if len(changed_rows) > FULL_REFRESH_FRACTION * n_movies:
+            conn.close()
+            compute_similar_movies(db_path, os.path.dirname(artifact.path), k)
+            return True
+
+        matrix = artifact.matrix
+        inv_norms = _safe_inverse(artifact.row_norms)
+        is_changed = np.zeros(n_movies, dtype=bool)
+        is_changed[changed_rows] = True
+
+        # próg listy każdego filmu: najniższe zapisane podobieństwo (-inf, gdy lista niepełna)
+        stats = np.array(conn.execute(
+            "SELECT movie_id, MIN(score), COUNT(*) FROM similar_movies GROUP BY movie_id").fetchall(),
+            dtype=np.float64).reshape(-1, 3)
+        thresholds = np.full(n_movies, -np.inf, dtype=np.float32)
+        stat_rows = _rows_for_ids(movie_ids, stats[:, 0])
+        full = (stat_rows >= 0) & (stats[:, 2] >= k)
+        thresholds[stat_rows[full]] = stats[full, 1]
+
+        new_lists = {}
+        # (wiersz filmu, wiersz zmienionego filmu, podobieństwo) - kandydaci do list pozostałych filmów
+        entering = []
+        for start in range(0, len(changed_rows), block_size):
+            rows = changed_rows[start:start + block_size]
+            top, top_scores = topk_rows(matrix, inv_norms, rows, k)
+            for row, neighbors, scores in zip(rows, top, top_scores):
+                new_lists[int(row)] = (neighbors, scores)
+
+            scores = cosine_block(matrix, inv_norms, rows)
+            block_rows, others = np.nonzero((scores >= thresholds[None, :]) & ~is_changed[None, :])
+            entering.append(np.column_stack([others, rows[block_rows], scores[block_rows, others]]))
+        entering = np.vstack(entering) if entering else np.empty((0, 3))
+
+        # filmy, w których listach był któryś ze zmienionych filmów
+        referencing = []
+        for chunk in _chunks(movie_ids[changed_rows].tolist()):
+            placeholders = ','.join('?' * len(chunk))
+            referencing.extend(movie_id for (movie_id,) in conn.execute(
+                f"SELECT DISTINCT movie_id FROM similar_movies WHERE neighbor_id IN ({placeholders})", chunk))
+        to_merge = np.union1d(entering[:, 0].astype(np.int64), _rows_for_ids(movie_ids, referencing))
+        to_merge = to_merge[(to_merge >= 0) & ~is_changed[to_merge]]
+
+        # zapisane listy bez zmienionych filmów + wchodzący kandydaci, k najlepszych na film
+        stored = []
+        for chunk in _chunks(movie_ids[to_merge].tolist()):
+            placeholders = ','.join('?' * len(chunk))
+            stored.extend(conn.execute(
+                f"SELECT movie_id, neighbor_id, score FROM similar_movies WHERE movie_id IN ({placeholders})", chunk))
+        stored = np.array(stored, dtype=np.float64).reshape(-1, 3)
+        stored[:, 0] = _rows_for_ids(movie_ids, stored[:, 0])
+        stored[:, 1] = _rows_for_ids(movie_ids, stored[:, 1])
+        keep = stored[:, 1] >= 0
+        keep[keep] = ~is_changed[stored[keep, 1].astype(np.int64)]
+        candidates = np.vstack([stored[keep], entering])
+        order = np.lexsort((-candidates[:, 2], candidates[:, 0]))
+        candidates = candidates[order]
+        owners = candidates[:, 0].astype(np.int64)
+        position = np.arange(len(owners)) - np.searchsorted(owners, owners)
+        counts = np.bincount(owners, minlength=n_movies)[to_merge]
+        merged = candidates[position < k]
+        # zmieniony film wypadł z listy bez następcy - brakującej pozycji nie ma w tabeli
+        incomplete = to_merge[counts < k]
+        complete = to_merge[counts >= k]
+        merged = merged[np.isin(merged[:, 0].astype(np.int64), complete)].reshape(len(complete), k, 3)
+        for row, neighbors in zip(complete, merged):
+            new_lists[int(row)] = (neighbors[:, 1].astype(np.int64), neighbors[:, 2])
+
+        # listy, których nie da się uzupełnić z tabeli - liczone od nowa
+        for start in range(0, len(incomplete), block_size):
+            rows = incomplete[start:start + block_size]
+            top, top_scores = topk_rows(matrix, inv_norms, rows, k)
+            for row, neighbors, scores in zip(rows, top, top_scores):
+                new_lists[int(row)] = (neighbors, scores)
+
+        rewritten = movie_ids[sorted(new_lists)].tolist()
+        for chunk in _chunks(rewritten):
+            conn.execute(f"DELETE FROM similar_movies WHERE movie_id IN ({','.join('?' * len(chunk))})", chunk)
+        for row, (neighbors, scores) in new_lists.items():
+            conn.executemany(
+                "INSERT INTO similar_movies (movie_id, rank, neighbor_id, score) VALUES (?, ?, ?, ?)",
+                zip([int(movie_ids[row])] * len(neighbors), range(1, len(neighbors) + 1),
+                    movie_ids[neighbors].tolist(), np.asarray(scores, dtype=np.float64).tolist())
+            )
+        conn.executemany(
+            "INSERT OR REPLACE INTO model_meta (key, value) VALUES (?, ?)",
+            [('similar_movies_version', artifact.version), ('similar_movies_k', str(k))]
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    print(f"SIMILAR INFO: similar_movies zaktualizowana: {len(changed_rows) + len(incomplete)} list od nowa, "
+          f"{len(new_lists) - len(changed_rows) - len(incomplete)} scalonych, w {time.time() - start_time:.1f}s.")
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m app.similarity', description="Tabela podobnych filmów (top-K)")
+    parser.add_argument('--db', default=DATABASE_PATH, help="ścieżka do movielens.db")
+    parser.add_argument('--model-dir', default=MODEL_DIR, help="katalog artefaktów")
+    parser.add_argument('--k', type=int, default=SIMILAR_TOP_K, help="liczba sąsiadów na film")
+    parser.add_argument('--block-size', type=int, default=DEFAULT_BLOCK_SIZE, help="liczba wierszy w bloku")
+    parser.add_argument('--workers', type=int, default=None, help="liczba procesów (domyślnie wszystkie rdzenie)")
+    args = parser.parse_args(argv)
+    compute_similar_movies(args.db, args.model_dir, args.k, args.block_size, args.workers)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
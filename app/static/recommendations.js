@@ -32,7 +32,7 @@ document.addEventListener('DOMContentLoaded', function() {
 
     const itemsPerPage = 5;
     let currentPage = 0;
-    const totalPages = Math.ceil(allRecommendations.length / itemsPerPage);
+    let totalPages = Math.ceil(allRecommendations.length / itemsPerPage);
 
     function renderPage(page) {
         if (!recommendationsList) return;
@@ -69,6 +69,111 @@ document.addEventListener('DOMContentLoaded', function() {
 
     renderPage(currentPage);
 
+    // --- "Load more" - kolejne pozycje listy wskazane kursorem z serwera ---
+    const loadMoreBtn = document.getElementById('loadMoreBtn');
+
+    function checkboxLabel(className, icon, movieId, checked) {
+        const label = document.createElement('label');
+        label.className = 'checkbox-container';
+        const input = document.createElement('input');
+        input.type = 'checkbox';
+        input.className = className;
+        input.dataset.movieId = movieId;
+        input.checked = checked;
+        const box = document.createElement('span');
+        box.className = 'custom-checkbox';
+        box.innerHTML = `<i class="fas ${icon}"></i>`;
+        label.append(input, box);
+        return label;
+    }
+
+    function createRecommendationElement(rec) {
+        const item = document.createElement('div');
+        item.className = 'movie-item-content';
+        item.dataset.movieId = rec.id;
+        if (rec.poster_path) {
+            const img = document.createElement('img');
+            img.src = rec.poster_path;
+            img.alt = rec.title;
+            img.className = 'poster-thumb';
+            item.appendChild(img);
+        }
+        const info = document.createElement('div');
+        info.className = 'movie-info';
+        const title = document.createElement('span');
+        title.className = 'movie-title';
+        title.textContent = rec.title;
+        const overview = document.createElement('p');
+        overview.className = 'movie-description';
+        overview.textContent = rec.overview || 'No description available';
+        info.append(title, overview);
+        item.append(
+            info,
+            checkboxLabel('watchlist-checkbox', 'fa-plus', rec.id, rec.in_watchlist),
+            checkboxLabel('watched-checkbox', 'fa-eye', rec.id, rec.in_watched),
+            checkboxLabel('favorite-checkbox', 'fa-heart', rec.id, rec.in_favorites)
+        );
+        return item;
+    }
+
+    async function fetchRecommendations(payload) {
+        const res = await fetch('/get_new_recommendations', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            credentials: 'same-origin',
+            body: JSON.stringify(payload)
+        });
+        const data = await res.json();
+        return { res, data };
+    }
+
+    function toEntry(rec) {
+        return { element: createRecommendationElement(rec), title: rec.title, movie_id: rec.id };
+    }
+
+    function updateLoadMore(cursor) {
+        if (cursor) {
+            loadMoreBtn.dataset.cursor = cursor;
+            loadMoreBtn.disabled = false;
+        } else {
+            loadMoreBtn.remove();
+        }
+    }
+
+    loadMoreBtn?.addEventListener('click', async () => {
+        loadMoreBtn.disabled = true;
+        try {
+            let { res, data } = await fetchRecommendations({ cursor: loadMoreBtn.dataset.cursor });
+
+            if (res.status === 409 && data.restart) {
+                // nowa wersja modelu - cała lista od pierwszej strony nowego rankingu, bez powtórek
+                const movieTitle = document.getElementById('movieBeingRecommended')?.dataset.movieTitle || '';
+                ({ res, data } = await fetchRecommendations({
+                    movie_title: movieTitle, n: allRecommendations.length + itemsPerPage
+                }));
+                if (!res.ok || data.error) throw new Error(data.error);
+                allRecommendations = data.recommendations.map(toEntry);
+                totalPages = Math.ceil(allRecommendations.length / itemsPerPage);
+                currentPage = Math.min(currentPage, Math.max(totalPages - 1, 0));
+                renderPage(currentPage);
+                showNotification('🔄 Recommendations were updated');
+                updateLoadMore(data.cursor);
+                return;
+            }
+            if (!res.ok || data.error) throw new Error(data.error);
+
+            const firstNew = allRecommendations.length;
+            data.recommendations.forEach(rec => allRecommendations.push(toEntry(rec)));
+            totalPages = Math.ceil(allRecommendations.length / itemsPerPage);
+            currentPage = Math.floor(firstNew / itemsPerPage);
+            renderPage(currentPage);
+            updateLoadMore(data.cursor);
+        } catch {
+            loadMoreBtn.disabled = false;
+            showNotification('⚠️ Not able to load more recommendations');
+        }
+    });
+
     // --- Powiadomienia ---
     function showNotification(message) {
         const notif = document.getElementById("notification");
@@ -0,0 +1,98 @@
+# threads.py
+"""Budżet wątków procesu: limity wątków natywnych (BLAS/OpenMP) i raport równoległości.
+
+Serwer ma ``workers`` procesów, każdy z pulą ``RECOMMEND_MAX_CONCURRENCY``
+wątków obliczeniowych (app/admission.py); gdyby każde wywołanie numpy/scipy
+mogło dodatkowo uruchomić własne wątki BLAS na wszystkich rdzeniach, maszyna
+miałaby ich workers x wątki x rdzenie i opóźnienia p99 rosłyby wielokrotnie.
+Dlatego proces ustawia limit ``NATIVE_THREADS`` (threadpoolctl) przy starcie,
+po fork i w każdym wątku puli obliczeniowej.
+
+    python -m app.threads     # raport równoległości dla bieżących ustawień
+"""
+import argparse
+import json
+import os
+
+from .config import NATIVE_THREADS, RECOMMEND_MAX_CONCURRENCY, SERVE_THREADS, SERVE_WORKERS
+
+
+def usable_cpus():
+    """Rdzenie dostępne dla procesu (z uwzględnieniem przypisania CPU / cgroup cpuset)."""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def native_thread_limit():
+    """Limit wątków natywnych na proces: NATIVE_THREADS albo (0) rdzenie / (procesy x wątki obliczeniowe)."""
+    if NATIVE_THREADS > 0:
+        return NATIVE_THREADS
+    return max(1, usable_cpus() // (max(1, SERVE_WORKERS) * max(1, RECOMMEND_MAX_CONCURRENCY)))
+
+
+def limit_native_threads(limit=None):
+    """Ustawia limit wątków BLAS/OpenMP dla bieżącego procesu (i wątku - OpenMP)."""
+    limit = limit or native_thread_limit()
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return None
+    # bez `with` - limit zostaje do końca procesu
+    threadpool_limits(limits=limit)
+    return limit
+
+
+def native_pools():
+    """Załadowane biblioteki z pulami wątków natywnych i ich bieżąca liczba wątków."""
+    try:
+        from threadpoolctl import threadpool_info
+    except ImportError:
+        return []
+    return [
+        {'user_api': pool.get('user_api'), 'internal_api': pool.get('internal_api'),
+         'num_threads': pool.get('num_threads'), 'version': pool.get('version')}
+        for pool in threadpool_info()
+    ]
+
+
+def parallelism_report():
+    limit = native_thread_limit()
+    return {
+        'pid': os.getpid(),
+        'cpu_count': os.cpu_count(),
+        'usable_cpus': usable_cpus(),
+        'serve_workers': SERVE_WORKERS,
+        'serve_threads': SERVE_THREADS,
+        'recommend_concurrency': RECOMMEND_MAX_CONCURRENCY,
+        'native_thread_limit': limit,
+        # najwięcej wątków, które naraz mogą liczyć rekomendacje na całej maszynie
+        'max_busy_threads': SERVE_WORKERS * RECOMMEND_MAX_CONCURRENCY * limit,
+        'native_pools': native_pools(),
+    }
+
+
+def log_parallelism():
+    report = parallelism_report()
+    print(f"THREADS INFO: {report['serve_workers']} proc. x {report['recommend_concurrency']} wątków obliczeń "
+          f"x {report['native_thread_limit']} wątków natywnych = {report['max_busy_threads']} "
+          f"(rdzenie: {report['usable_cpus']}).")
+    for pool in report['native_pools']:
+        print(f"THREADS INFO: {pool['internal_api']} ({pool['user_api']}): {pool['num_threads']} wątków.")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m app.threads', description="Raport równoległości procesu")
+    parser.parse_args(argv)
+
+    import numpy  # noqa: F401 - ładuje biblioteki BLAS, żeby threadpoolctl je widział
+    import scipy.sparse  # noqa: F401
+
+    limit_native_threads()
+    print(json.dumps(parallelism_report(), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,90 @@
+# benchmarks/bench_batch.py
+"""Przepustowość rekomendacji wsadowych: filmy (seedy) na sekundę dla
+osobnych zapytań ``query`` w pętli i dla jednego ``query_batch`` na partię,
+przy różnych rozmiarach partii.
+
+Uruchomienie (z katalogu głównego repozytorium, na zbudowanym artefakcie):
+
+    python -m benchmarks.bench_batch --seeds 1000 --batch-sizes 1 16 64 256 --k 20
+    python -m benchmarks.bench_batch --backends knn svd lsh
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from app.config import MODEL_DIR
+from app.model_store import open_artifact
+from app.neighbors import BACKENDS
+
+
+def seeds_per_second(seconds, n_seeds):
+    return round(n_seeds / seconds, 1) if seconds > 0 else None
+
+
+def run_single(backend, rows, k):
+    start = time.perf_counter()
+    results = [backend.query(int(row), k)[0] for row in rows]
+    return time.perf_counter() - start, results
+
+
+def run_batched(backend, rows, k, batch_size):
+    start = time.perf_counter()
+    results = []
+    for i in range(0, len(rows), batch_size):
+        neighbors, _ = backend.query_batch(rows[i:i + batch_size], k)
+        results.extend(neighbors)
+    return time.perf_counter() - start, results
+
+
+def agreement(batched, single, k):
+    """Średnie pokrycie list z query_batch i z query (1.0 = te same sąsiedzi)."""
+    hits = [len(set(map(int, b[b >= 0][:k])) & set(map(int, s[:k]))) / max(1, min(k, len(s)))
+            for b, s in zip(batched, single)]
+    return round(float(np.mean(hits)), 4)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model-dir', default=MODEL_DIR)
+    parser.add_argument('--backends', nargs='+', default=['knn', 'svd'], choices=sorted(BACKENDS))
+    parser.add_argument('--seeds', type=int, default=1000)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 16, 64, 256])
+    parser.add_argument('--k', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="zapisz wyniki do pliku JSON")
+    args = parser.parse_args(argv)
+
+    artifact = open_artifact(args.model_dir)
+    n_rows = artifact.matrix.shape[0]
+    rows = np.random.default_rng(args.seed).choice(n_rows, size=min(args.seeds, n_rows), replace=False)
+    print(f"Artefakt {artifact.version}: {n_rows} filmów, {len(rows)} seedów, k={args.k}")
+
+    report = []
+    for name in args.backends:
+        backend = BACKENDS[name].load(artifact)
+        if backend is None:
+            backend = BACKENDS[name](artifact).fit()
+        seconds, single = run_single(backend, rows, args.k)
+        report.append({'backend': name, 'mode': 'query', 'batch_size': 1,
+                       'seeds_per_s': seeds_per_second(seconds, len(rows)), 'agreement': 1.0})
+        for batch_size in args.batch_sizes:
+            seconds, batched = run_batched(backend, rows, args.k, batch_size)
+            report.append({'backend': name, 'mode': 'query_batch', 'batch_size': batch_size,
+                           'seeds_per_s': seeds_per_second(seconds, len(rows)),
+                           'agreement': agreement(batched, single, args.k)})
+
+    print(f"{'backend':<12}{'tryb':<13}{'partia':>8}{'seedy/s':>12}{'zgodność':>10}")
+    for entry in report:
+        print(f"{entry['backend']:<12}{entry['mode']:<13}{entry['batch_size']:>8}"
+              f"{entry['seeds_per_s']:>12}{entry['agreement']:>10.3f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'version': artifact.version, 'k': args.k, 'seeds': len(rows), 'results': report}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,102 @@
+# benchmarks/bench_neighbors.py
+"""Porównanie backendów wyszukiwania sąsiadów: recall@k (pokrycie sąsiadów)
+względem wyniku dokładnego, opóźnienia zapytań (p50 / p99) oraz rozmiar
+przeszukiwanego indeksu.
+
+Uruchomienie (z katalogu głównego repozytorium, na zbudowanym artefakcie):
+
+    python -m benchmarks.bench_neighbors --queries 200 --k 20
+    python -m benchmarks.bench_neighbors --lsh-bits 256 512 1024 --lsh-candidates 250 500 1000
+    python -m benchmarks.bench_neighbors --svd-dims 64 128 256
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from app.config import MODEL_DIR
+from app.model_store import open_artifact
+from app.neighbors import EmbeddingBackend, ExactBackend, LSHBackend
+
+
+def run_queries(backend, rows, k):
+    latencies, results = [], []
+    for row in rows:
+        start = time.perf_counter()
+        neighbors, _ = backend.query(int(row), k)
+        latencies.append(time.perf_counter() - start)
+        results.append(neighbors)
+    return results, np.array(latencies) * 1000
+
+
+def recall_at_k(results, truth, k):
+    hits = [len(set(map(int, r[:k])) & set(map(int, t[:k]))) / max(1, min(k, len(t))) for r, t in zip(results, truth)]
+    return float(np.mean(hits))
+
+
+def summarize(backend, params, results, latencies, truth, k, build_seconds=0.0):
+    return {
+        'backend': backend.name,
+        'params': params,
+        f'recall@{k}': round(recall_at_k(results, truth, k), 4),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 3),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 3),
+        'build_s': round(build_seconds, 2),
+        'index_mb': round(backend.index_nbytes / 2 ** 20, 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model-dir', default=MODEL_DIR)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--lsh-bits', type=int, nargs='+', default=[256, 512])
+    parser.add_argument('--lsh-candidates', type=int, nargs='+', default=[500, 1000])
+    parser.add_argument('--svd-dims', type=int, nargs='+', default=[64, 128])
+    parser.add_argument('--json', help="zapisz wyniki do pliku JSON")
+    args = parser.parse_args(argv)
+
+    artifact = open_artifact(args.model_dir)
+    n_rows = artifact.matrix.shape[0]
+    rows = np.random.default_rng(args.seed).choice(n_rows, size=min(args.queries, n_rows), replace=False)
+    print(f"Artefakt {artifact.version}: {n_rows} filmów, {artifact.matrix.shape[1]} użytkowników, nnz={artifact.matrix.nnz}")
+
+    start = time.perf_counter()
+    exact = ExactBackend(artifact).fit()
+    exact_build = time.perf_counter() - start
+    truth, latencies = run_queries(exact, rows, args.k)
+    report = [summarize(exact, {}, truth, latencies, truth, args.k, exact_build)]
+
+    for n_bits in args.lsh_bits:
+        start = time.perf_counter()
+        lsh = LSHBackend(artifact, n_bits=n_bits).fit()
+        build_seconds = time.perf_counter() - start
+        for n_candidates in args.lsh_candidates:
+            lsh.n_candidates = n_candidates
+            results, latencies = run_queries(lsh, rows, args.k)
+            params = {'n_bits': n_bits, 'n_candidates': n_candidates}
+            report.append(summarize(lsh, params, results, latencies, truth, args.k, build_seconds))
+
+    for dim in args.svd_dims:
+        start = time.perf_counter()
+        svd = EmbeddingBackend(artifact, dim=dim).fit()
+        build_seconds = time.perf_counter() - start
+        results, latencies = run_queries(svd, rows, args.k)
+        report.append(summarize(svd, {'dim': svd.dim}, results, latencies, truth, args.k, build_seconds))
+
+    print(f"{'backend':<12}{'recall@' + str(args.k):>10}{'p50 ms':>10}{'p99 ms':>10}{'build s':>9}{'index MB':>10}  params")
+    for entry in report:
+        print(f"{entry['backend']:<12}{entry[f'recall@{args.k}']:>10.3f}{entry['p50_ms']:>10.3f}"
+              f"{entry['p99_ms']:>10.3f}{entry['build_s']:>9.2f}{entry['index_mb']:>10.2f}  {entry['params']}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'version': artifact.version, 'k': args.k, 'results': report}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
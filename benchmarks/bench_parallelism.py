@@ -0,0 +1,128 @@
+# benchmarks/bench_parallelism.py
+"""Przepustowość i opóźnienia zapytań o sąsiadów przy różnej liczbie
+procesów x wątków x wątków natywnych (BLAS/OpenMP) - pokazuje koszt
+nadsubskrypcji rdzeni i dobiera ``--workers`` / ``RECOMMEND_MAX_CONCURRENCY`` /
+``MOVIEMANIAC_NATIVE_THREADS``.
+
+Backend ładowany jest raz, przed fork (jak w serwerze z preload); każdy proces
+ustawia własny limit wątków natywnych i uruchamia ``threads`` wątków, które
+dzielą między siebie losowe seedy.
+
+Uruchomienie (z katalogu głównego repozytorium, na zbudowanym artefakcie):
+
+    python -m benchmarks.bench_parallelism --workers 1 2 4 --threads 1 2 4
+    python -m benchmarks.bench_parallelism --backends knn --native 1 0 --queries 2000
+"""
+import argparse
+import json
+import multiprocessing
+import threading
+import time
+
+import numpy as np
+
+from app.config import MODEL_DIR
+from app.model_store import open_artifact
+from app.neighbors import BACKENDS
+from app.threads import limit_native_threads, usable_cpus
+
+
+def _run_threads(backend, rows, k, threads):
+    latencies = [[] for _ in range(threads)]
+
+    def work(i):
+        for row in rows[i::threads]:
+            start = time.perf_counter()
+            backend.query(int(row), k)
+            latencies[i].append(time.perf_counter() - start)
+
+    pool = [threading.Thread(target=work, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return [latency for part in latencies for latency in part]
+
+
+def _worker(backend, rows, k, threads, native, barrier, results):
+    limit_native_threads(native)
+    barrier.wait()
+    start = time.perf_counter()
+    latencies = _run_threads(backend, rows, k, threads)
+    results.put((start, time.perf_counter(), latencies))
+
+
+def run_grid_point(backend, rows, k, workers, threads, native):
+    """Jeden punkt siatki: zapytania/s (ściana zegara dla wszystkich procesów) i p50/p99 pojedynczego zapytania."""
+    ctx = multiprocessing.get_context('fork')
+    barrier = ctx.Barrier(workers)
+    results = ctx.Queue()
+    processes = [ctx.Process(target=_worker, args=(backend, rows[i::workers], k, threads, native, barrier, results))
+                 for i in range(workers)]
+    for process in processes:
+        process.start()
+    parts = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    wall = max(end for _, end, _ in parts) - min(start for start, _, _ in parts)
+    latencies = np.array([latency for _, _, part in parts for latency in part]) * 1000
+    return {
+        'workers': workers,
+        'threads': threads,
+        'native_threads': native,
+        'busy_threads': workers * threads * native,
+        'queries_per_s': round(len(latencies) / wall, 1) if wall > 0 else None,
+        'p50_ms': round(float(np.percentile(latencies, 50)), 3),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 3),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model-dir', default=MODEL_DIR)
+    parser.add_argument('--backends', nargs='+', default=['knn', 'svd'], choices=sorted(BACKENDS))
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--native', type=int, nargs='+', default=[1, 0],
+                        help="wątki natywne na proces; 0 = wszystkie rdzenie (bez limitu)")
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--k', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="zapisz wyniki do pliku JSON")
+    args = parser.parse_args(argv)
+
+    cpus = usable_cpus()
+    artifact = open_artifact(args.model_dir)
+    n_rows = artifact.matrix.shape[0]
+    rows = np.random.default_rng(args.seed).integers(0, n_rows, size=args.queries)
+    print(f"Artefakt {artifact.version}: {n_rows} filmów, {args.queries} zapytań, k={args.k}, rdzenie: {cpus}")
+
+    report = []
+    for name in args.backends:
+        backend = BACKENDS[name].load(artifact)
+        if backend is None:
+            backend = BACKENDS[name](artifact).fit()
+        for native in args.native:
+            for workers in args.workers:
+                for threads in args.threads:
+                    entry = run_grid_point(backend, rows, args.k, workers, threads, native or cpus)
+                    entry['backend'] = name
+                    report.append(entry)
+
+    print(f"{'backend':<12}{'procesy':>8}{'wątki':>7}{'natywne':>9}{'zajęte':>8}"
+          f"{'zapytania/s':>13}{'p50 ms':>10}{'p99 ms':>10}")
+    for entry in report:
+        marker = '  (nadsubskrypcja)' if entry['busy_threads'] > cpus else ''
+        print(f"{entry['backend']:<12}{entry['workers']:>8}{entry['threads']:>7}{entry['native_threads']:>9}"
+              f"{entry['busy_threads']:>8}{entry['queries_per_s']:>13}{entry['p50_ms']:>10}{entry['p99_ms']:>10}{marker}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'version': artifact.version, 'k': args.k, 'queries': args.queries, 'cpus': cpus,
+                       'results': report}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
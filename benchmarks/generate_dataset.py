@@ -0,0 +1,373 @@
+# benchmarks/generate_dataset.py
+"""Syntetyczna baza movielens.db w skali MovieLens - do benchmarków i testów
+obciążeniowych bez prawdziwego zbioru i bez sieci.
+
+Schemat i kolumny pochodne jak po ``python -m app.ingest``. Rozkłady:
+popularność filmów z długim ogonem (Zipf), aktywność użytkowników
+log-normalna (co najmniej ``--min-user-ratings`` ocen), gusta jako wagi
+gatunków (Dirichlet), oceny w półgwiazdkach z przewagą pełnych gwiazdek
+(średnia ~3.5, jak w MovieLens) zależne od jakości filmu, surowości
+użytkownika i dopasowania gatunku. Dochodzą konta aplikacji z listami do
+obejrzenia i ulubionymi (w tym konta z testów Selenium, hasła jak w testach)
+oraz film "Interstellar (2014)" jako najpopularniejszy tytuł.
+
+Ten sam ``--seed`` daje tę samą bazę. Uruchomienie (z katalogu głównego repozytorium):
+
+    python -m benchmarks.generate_dataset --scale small            # 10k filmów, 1M ocen
+    python -m benchmarks.generate_dataset --scale ml25m            # 60k filmów, 25M ocen
+    python -m benchmarks.generate_dataset --scale xl --db /tmp/xl.db
+    python -m benchmarks.generate_dataset --movies 2000 --users 3000 --ratings 200000 --db /tmp/tiny.db
+"""
+import argparse
+import os
+import sqlite3
+import time
+
+import numpy as np
+from werkzeug.security import generate_password_hash
+
+from app.ingest import DEFAULT_BATCH_SIZE, MOVIE_COLUMNS, SCHEMA, bulk_load, ensure_ratings_index, movie_row
+from app.signals import backfill, ensure_schema as ensure_signals_schema
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+# skala: (filmy, użytkownicy MovieLens, oceny)
+SCALES = {
+    'tiny': (2000, 3000, 200000),
+    'small': (10000, 10000, 1000000),
+    'medium': (60000, 60000, 5000000),
+    'ml25m': (60000, 160000, 25000000),
+    'xl': (200000, 300000, 25000000),
+}
+
+# gatunki MovieLens i ich częstość
+GENRES = {
+    'Drama': 0.25, 'Comedy': 0.17, 'Thriller': 0.08, 'Romance': 0.07, 'Action': 0.07, 'Horror': 0.05,
+    'Documentary': 0.05, 'Crime': 0.05, 'Adventure': 0.04, 'Sci-Fi': 0.03, 'Children': 0.025,
+    'Animation': 0.025, 'Mystery': 0.02, 'Fantasy': 0.02, 'War': 0.015, 'Western': 0.01,
+    'Musical': 0.01, 'Film-Noir': 0.005, 'IMAX': 0.005,
+}
+# część ocen zaokrąglana do pełnych gwiazdek (razem ~70% pełnych, jak w MovieLens)
+WHOLE_STAR_SHARE = 0.4
+
+ADJECTIVES = ('Silent', 'Dark', 'Last', 'Lost', 'Golden', 'Broken', 'Hidden', 'Burning', 'Frozen', 'Wild',
+              'Secret', 'Eternal', 'Crimson', 'Midnight', 'Forgotten', 'Iron', 'Electric', 'Little', 'Final',
+              'Savage', 'Quiet', 'Endless', 'Distant', 'Fallen', 'Bright', 'Hollow', 'Red', 'Blue', 'Black')
+NOUNS = ('River', 'City', 'Storm', 'Kingdom', 'Heart', 'Road', 'Night', 'Garden', 'Empire', 'Dream', 'Island',
+         'Shadow', 'Mountain', 'Sea', 'Star', 'Game', 'House', 'Machine', 'Promise', 'Horizon', 'Winter',
+         'Summer', 'Voyage', 'Mirror', 'Station', 'Circus', 'Frontier', 'Letter', 'Orchard', 'Signal')
+PLACES = ('a small town', 'the old city', 'deep space', 'the frontier', 'a remote island', 'the suburbs',
+          'a crumbling empire', 'the near future', 'post-war Europe', 'the desert')
+KEYWORDS = ('friendship', 'rescue', 'revenge', 'based on novel', 'space', 'heist', 'coming of age', 'family',
+            'time travel', 'love', 'betrayal', 'survival', 'war', 'detective', 'dystopia', 'robot', 'magic',
+            'road trip', 'high school', 'small town', 'murder', 'sequel', 'biography', 'music', 'sport',
+            'artificial intelligence', 'prison', 'monster', 'superhero', 'journey', 'conspiracy', 'island')
+STUDIOS = tuple(f"{name} {kind}" for name in ('Northlight', 'Bluebird', 'Atlas', 'Harbor', 'Summit', 'Pioneer',
+                                               'Lantern', 'Orbit', 'Meridian', 'Granite')
+                for kind in ('Pictures', 'Studios', 'Films'))
+COUNTRIES = ('US', 'GB', 'FR', 'DE', 'JP', 'KR', 'IN', 'IT', 'ES', 'CA')
+LANGUAGES = {'en': 0.7, 'fr': 0.06, 'ja': 0.05, 'es': 0.04, 'de': 0.04, 'ko': 0.04, 'it': 0.04, 'hi': 0.03}
+
+# konta z testów Selenium (tests/) - (nazwa, e-mail, hasło)
+FIXTURE_ACCOUNTS = (
+    ('rampam', 'rampam@gmail.com', 'rampam123'),
+    ('testuser', 'testuser@example.com', 'validpassword'),
+    ('marysia123', 'marysia123@example.com', 'validpassword'),
+)
+APP_USER_PASSWORD = 'password'
+FIXTURE_TITLE = ('Interstellar', 2014)
+
+
+def _weights(mapping):
+    values = np.array(list(mapping.values()), dtype=np.float64)
+    return list(mapping), values / values.sum()
+
+
+def generate_movies(rng, n_movies, zipf_exponent):
+    """Kolumny filmów (słownik tablic) i ich popularność (suma 1)."""
+    # identyfikatory rosnące z przerwami, jak w MovieLens
+    ids = np.cumsum(rng.geometric(0.6, n_movies))
+    ids += 1 - ids[0]
+    years = (1920 + rng.beta(4, 1.4, n_movies) * 104).astype(np.int64)
+    # długi ogon: popularność ~ 1 / ranga^a, ranga losowa względem id
+    ranks = rng.permutation(n_movies) + 1
+    popularity = 1.0 / ranks ** zipf_exponent
+    popularity /= popularity.sum()
+
+    genre_names, genre_p = _weights(GENRES)
+    n_genres = rng.choice([1, 2, 3], size=n_movies, p=[0.35, 0.4, 0.25])
+    genre_sets = [rng.choice(len(genre_names), size=k, replace=False, p=genre_p) for k in n_genres]
+    primary = np.array([genres[0] for genres in genre_sets])
+    quality = rng.normal(0, 0.45, n_movies)
+    return {
+        'ids': ids,
+        'years': years,
+        'popularity': popularity,
+        'primary_genre': primary,
+        'genres': ['|'.join(genre_names[g] for g in genres) for genres in genre_sets],
+        'quality': quality,
+    }, genre_names
+
+
+def movie_rows(rng, movies):
+    """Wiersze tabeli movies (z metadanymi TMDB) w kolejności MOVIE_COLUMNS."""
+    n = len(movies['ids'])
+    popularity = movies['popularity']
+    top = int(np.argmax(popularity))
+    adjectives = rng.integers(0, len(ADJECTIVES), n)
+    nouns = rng.integers(0, len(NOUNS), n)
+    places = rng.integers(0, len(PLACES), n)
+    vote_counts = np.round(popularity / popularity.max() * 30000 * rng.lognormal(0, 0.3, n)).astype(np.int64)
+    vote_averages = np.clip(np.round(6.4 + 2.2 * movies['quality'] + rng.normal(0, 0.4, n), 1), 1.0, 10.0)
+    runtimes = np.clip(rng.normal(105, 20, n), 60, 240).astype(np.int64)
+    budgets = np.round(rng.lognormal(16, 1.2, n), -3).astype(np.int64)
+    revenues = np.round(budgets * rng.lognormal(0.5, 1.0, n), -3).astype(np.int64)
+    language_names, language_p = _weights(LANGUAGES)
+    languages = rng.choice(len(language_names), size=n, p=language_p)
+    keyword_p = 1.0 / np.arange(1, len(KEYWORDS) + 1)
+    keyword_p /= keyword_p.sum()
+
+    seen_titles = {}
+    subtitles = rng.integers(0, len(ADJECTIVES) * len(NOUNS), n)
+    for i in range(n):
+        title = f"The {ADJECTIVES[adjectives[i]]} {NOUNS[nouns[i]]}"
+        if i % 3:
+            adjective, noun = divmod(int(subtitles[i]), len(NOUNS))
+            title = f"{title}: {ADJECTIVES[adjective]} {NOUNS[noun]}"
+        year = int(movies['years'][i])
+        if i == top:
+            title, year = FIXTURE_TITLE
+            movies['years'][i] = year
+        else:
+            # powtórzony tytuł - kontynuacja
+            count = seen_titles.get(title, 0)
+            seen_titles[title] = count + 1
+            if count:
+                title = f"{title} {count + 1}"
+        keywords = rng.choice(len(KEYWORDS), size=rng.integers(2, 6), replace=False, p=keyword_p)
+        metadata = {
+            'overview': f"A {ADJECTIVES[adjectives[i]].lower()} story about {NOUNS[nouns[i]].lower()}s "
+                        f"set in {PLACES[places[i]]}.",
+            'poster_path': f"/synthetic/{movies['ids'][i]}.jpg",
+            'vote_average': float(vote_averages[i]),
+            'vote_count': int(vote_counts[i]),
+            'keywords': ', '.join(KEYWORDS[k] for k in keywords),
+            'tagline': f"Every {NOUNS[nouns[i]].lower()} has a story.",
+            'status': 'Released',
+            'release_date': f"{year}-{rng.integers(1, 13):02d}-{rng.integers(1, 29):02d}",
+            'runtime': int(runtimes[i]),
+            'budget': int(budgets[i]),
+            'revenue': int(revenues[i]),
+            'original_language': language_names[languages[i]],
+            'production_companies': '|'.join(rng.choice(STUDIOS, size=rng.integers(1, 3), replace=False)),
+            'production_countries': '|'.join(rng.choice(COUNTRIES, size=rng.integers(1, 3), replace=False)),
+            'homepage': None,
+        }
+        yield movie_row(int(movies['ids'][i]), f"{title} ({year})", movies['genres'][i], metadata)
+
+
+def user_activity(rng, n_users, n_ratings, n_movies, min_ratings):
+    """Liczba ocen każdego użytkownika: log-normalna, co najmniej ``min_ratings``, suma ~``n_ratings``."""
+    min_ratings = min(min_ratings, max(1, n_ratings // n_users))
+    activity = rng.lognormal(0, 1.2, n_users)
+    counts = min_ratings + np.floor(activity / activity.sum() * max(0, n_ratings - min_ratings * n_users))
+    return np.minimum(counts, max(1, n_movies // 2)).astype(np.int64)
+
+
+def _sample_categorical(rng, cumulative, rows):
+    """Jedna kategoria na wiersz; ``cumulative`` - skumulowane prawdopodobieństwa wierszy (ostatnie = 1).
+
+    Wiersze spłaszczone z przesunięciem o numer wiersza, więc wystarcza jedno searchsorted
+    bez tablicy wiersze x kategorie.
+    """
+    n_categories = cumulative.shape[1]
+    flat = (cumulative + np.arange(len(cumulative))[:, None]).ravel()
+    pos = np.searchsorted(flat, rows + rng.random(len(rows)), side='right')
+    return np.minimum(pos - rows * n_categories, n_categories - 1)
+
+
+def generate_ratings(rng, movies, n_genres, counts, chunk_ratings=2000000):
+    """Oceny partiami użytkowników: (user_id, indeks filmu, ocena, timestamp); bez duplikatów par."""
+    n_users = len(counts)
+    n_movies = len(movies['ids'])
+    popularity = movies['popularity']
+    taste = rng.dirichlet(np.full(n_genres, 0.4), n_users)
+    taste_cumulative = np.cumsum(taste, axis=1)
+    taste_cumulative[:, -1] = 1.0
+    severity = rng.normal(0, 0.35, n_users)
+    # filmy każdego gatunku głównego i skumulowana popularność w gatunku
+    by_genre = [np.flatnonzero(movies['primary_genre'] == g) for g in range(n_genres)]
+    genre_cumulative = [np.cumsum(popularity[m]) for m in by_genre]
+    global_cumulative = np.cumsum(popularity)
+    first_seen = rng.integers(820454400, 1577836800, n_users)  # 1996-2020
+
+    def pick_movies(users):
+        # 70% ocen z ulubionych gatunków użytkownika, reszta z ogólnej popularności
+        picks = np.empty(len(users), dtype=np.int64)
+        by_taste = rng.random(len(users)) < 0.7
+        genres = _sample_categorical(rng, taste_cumulative, users[by_taste])
+        taste_picks = np.empty(len(genres), dtype=np.int64)
+        for g in range(n_genres):
+            mask = genres == g
+            if not mask.any() or not len(by_genre[g]):
+                taste_picks[mask] = rng.integers(0, n_movies, mask.sum())
+                continue
+            cumulative = genre_cumulative[g]
+            pos = np.searchsorted(cumulative, rng.random(mask.sum()) * cumulative[-1])
+            taste_picks[mask] = by_genre[g][np.minimum(pos, len(by_genre[g]) - 1)]
+        picks[by_taste] = taste_picks
+        pos = np.searchsorted(global_cumulative, rng.random((~by_taste).sum()) * global_cumulative[-1])
+        picks[~by_taste] = np.minimum(pos, n_movies - 1)
+        return picks
+
+    bounds = np.concatenate([[0], np.cumsum(counts)])
+    start_user = 0
+    while start_user < n_users:
+        stop_user = int(np.searchsorted(bounds, bounds[start_user] + chunk_ratings, side='right'))
+        stop_user = max(stop_user - 1, start_user + 1)
+        wanted = counts[start_user:stop_user]
+        keys = np.empty(0, dtype=np.int64)
+        # losowanie z dobieraniem: powtórzone pary (użytkownik, film) odpadają, brakujące oceny losowane ponownie
+        for _ in range(8):
+            have = np.bincount(keys // n_movies - start_user, minlength=len(wanted))
+            missing = np.maximum(wanted - have, 0)
+            if not missing.any():
+                break
+            users = np.repeat(np.arange(start_user, stop_user), missing)
+            keys = np.union1d(keys, users * n_movies + pick_movies(users))
+        users, picks = keys // n_movies, keys % n_movies
+
+        affinity = taste[users, movies['primary_genre'][picks]] * n_genres - 1
+        score = 3.4 + movies['quality'][picks] - severity[users] + 0.25 * np.clip(affinity, -1, 3) \
+            + rng.normal(0, 0.75, len(users))
+        whole = rng.random(len(users)) < WHOLE_STAR_SHARE
+        ratings = np.where(whole, np.round(score), np.round(score * 2) / 2)
+        ratings = np.clip(ratings, 0.5, 5.0)
+        timestamps = first_seen[users] + rng.integers(0, 3 * 365 * 86400, len(users))
+        yield users + 1, picks, ratings, timestamps
+        start_user = stop_user
+
+
+def app_users(rng, movies, n_app_users):
+    """Konta aplikacji (z kontami testów) oraz ich listy do obejrzenia i ulubione."""
+    password_hashes = {}
+
+    def password_hash(password):
+        # pbkdf2 jest celowo wolne - jeden skrót na hasło
+        if password not in password_hashes:
+            password_hashes[password] = generate_password_hash(password, method='pbkdf2:sha256')
+        return password_hashes[password]
+
+    accounts = [(name, email, password_hash(password)) for name, email, password in FIXTURE_ACCOUNTS]
+    accounts += [(f"user{i}", f"user{i}@example.com", password_hash(APP_USER_PASSWORD))
+                 for i in range(1, n_app_users + 1)]
+
+    watchlist, favorites = [], []
+    ids = movies['ids']
+    for user_id in range(1, len(accounts) + 1):
+        size = min(len(ids), int(rng.integers(5, 41)))
+        picked = rng.choice(len(ids), size=size, replace=False, p=movies['popularity'])
+        watched = rng.random(size) < 0.5
+        watchlist += [(user_id, int(ids[m]), int(w)) for m, w in zip(picked, watched)]
+        liked = picked[watched][:int(rng.integers(0, 16))]
+        favorites += [(user_id, int(ids[m])) for m in liked]
+    return accounts, watchlist, favorites
+
+
+def generate(db_path, n_movies, n_users, n_ratings, n_app_users=200, seed=0, zipf_exponent=1.0,
+             min_user_ratings=20, batch_size=DEFAULT_BATCH_SIZE):
+    """Buduje bazę ``db_path``; zwraca statystyki (liczby wierszy, rozkład ocen, udział 1% najpopularniejszych filmów)."""
+    start = time.time()
+    rng = np.random.default_rng(seed)
+    movies, genre_names = generate_movies(rng, n_movies, zipf_exponent)
+    counts = user_activity(rng, n_users, n_ratings, n_movies, min_user_ratings)
+
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    stats = {'movies': n_movies, 'users': n_users, 'ratings': 0}
+    histogram = np.zeros(10, dtype=np.int64)
+    movie_counts = np.zeros(n_movies, dtype=np.int64)
+    try:
+        conn.executescript(SCHEMA)
+        ensure_signals_schema(conn)
+        with bulk_load(conn):
+            insert = (f"INSERT INTO movies ({', '.join(MOVIE_COLUMNS)}) "
+                      f"VALUES ({', '.join('?' * len(MOVIE_COLUMNS))})")
+            conn.executemany(insert, movie_rows(rng, movies))
+            conn.commit()
+            print(f"DATASET INFO: {n_movies} filmów w {time.time() - start:.1f}s.")
+
+            ensure_ratings_index(conn)
+            for users, picks, ratings, timestamps in generate_ratings(rng, movies, len(genre_names), counts):
+                movie_ids = movies['ids'][picks]
+                # wiersze jako obiekty Pythona tylko po jednej partii naraz
+                for i in range(0, len(users), batch_size):
+                    part = slice(i, i + batch_size)
+                    conn.executemany(
+                        "INSERT INTO ratings (user_id, movie_id, rating, timestamp) VALUES (?, ?, ?, ?)",
+                        zip(users[part].tolist(), movie_ids[part].tolist(), ratings[part].tolist(),
+                            timestamps[part].tolist())
+                    )
+                conn.commit()
+                stats['ratings'] += len(users)
+                histogram += np.bincount((ratings * 2).astype(np.int64) - 1, minlength=10)
+                movie_counts += np.bincount(picks, minlength=n_movies)
+                print(f"DATASET INFO: {stats['ratings']} ocen ({time.time() - start:.1f}s).")
+
+            accounts, watchlist, favorites = app_users(rng, movies, n_app_users)
+            conn.executemany("INSERT INTO users (username, email, password) VALUES (?, ?, ?)", accounts)
+            conn.executemany("INSERT INTO watchlist (user_id, movie_id, watched) VALUES (?, ?, ?)", watchlist)
+            conn.executemany("INSERT INTO favorites (user_id, movie_id) VALUES (?, ?)", favorites)
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+    # oceny niejawne kont aplikacji - jak po pierwszym wdrożeniu (python -m app.signals backfill)
+    backfill(db_path)
+
+    top_share = np.sort(movie_counts)[::-1][:max(1, n_movies // 100)].sum() / max(1, stats['ratings'])
+    stats.update({
+        'app_users': len(accounts),
+        'watchlist': len(watchlist),
+        'favorites': len(favorites),
+        'mean_rating': round(float((np.arange(1, 11) / 2 * histogram).sum() / max(1, histogram.sum())), 3),
+        'rating_histogram': {str(k / 2): int(v) for k, v in zip(range(1, 11), histogram)},
+        'top_1pct_movies_share': round(float(top_share), 3),
+        'seconds': round(time.time() - start, 1),
+    })
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--movies', type=int, help="liczba filmów (nadpisuje --scale)")
+    parser.add_argument('--users', type=int, help="liczba użytkowników MovieLens (nadpisuje --scale)")
+    parser.add_argument('--ratings', type=int, help="docelowa liczba ocen (nadpisuje --scale)")
+    parser.add_argument('--app-users', type=int, default=200, help="konta aplikacji z listami i ulubionymi")
+    parser.add_argument('--zipf', type=float, default=1.0, help="wykładnik długiego ogona popularności")
+    parser.add_argument('--min-user-ratings', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--db', help="plik wynikowy (domyślnie benchmarks/data/<skala>.db)")
+    parser.add_argument('--force', action='store_true', help="nadpisz istniejący plik")
+    args = parser.parse_args(argv)
+
+    n_movies, n_users, n_ratings = SCALES[args.scale]
+    n_movies, n_users, n_ratings = args.movies or n_movies, args.users or n_users, args.ratings or n_ratings
+    db_path = args.db or os.path.join(DATA_DIR, f'{args.scale}.db')
+    if os.path.exists(db_path):
+        if not args.force:
+            parser.error(f"{db_path} już istnieje (--force nadpisuje)")
+        os.remove(db_path)
+
+    stats = generate(db_path, n_movies, n_users, n_ratings, args.app_users, args.seed, args.zipf,
+                     args.min_user_ratings)
+    print(f"DATASET INFO: {db_path}: {stats['movies']} filmów, {stats['users']} użytkowników, "
+          f"{stats['ratings']} ocen (średnia {stats['mean_rating']}, 1% filmów ma "
+          f"{stats['top_1pct_movies_share']:.0%} ocen), {stats['app_users']} kont aplikacji "
+          f"w {stats['seconds']}s.")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,273 @@
+# benchmarks/run.py
+"""Mikrobenchmarki w procesie (bez przeglądarki i serwera) na syntetycznej bazie:
+``load_and_prepare_data`` (budowa i otwarcie artefaktu), ``get_recommendations``
+(zimne - pusta pamięć podręczna - i ciepłe), ``search_movies``, ``get_top_movies``
+przy głębokich przesunięciach, ``get_all_keywords``, ``get_all_genres`` oraz
+trasy z listami przez klienta testowego Flask (zalogowany użytkownik z testów).
+
+Wyniki (czasy w ms: min / mediana / p95) zapisywane są jako JSON i porównywane
+z zapisanym punktem odniesienia: przypadek, którego mediana wzrosła o więcej niż
+``--tolerance`` (i więcej niż ``--min-delta-ms``), jest regresją - kod wyjścia 1.
+
+Model budowany jest za każdym razem od zera w katalogu tymczasowym, więc przebiegi
+są porównywalne. Baza powstaje przez ``benchmarks.generate_dataset``, gdy jej brak.
+
+Uruchomienie (z katalogu głównego repozytorium):
+
+    python -m benchmarks.run --scale small --save-baseline      # punkt odniesienia
+    python -m benchmarks.run --scale small                      # porównanie z nim
+    python -m benchmarks.run --db /tmp/xl.db --only recommend search --repeat 50
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+# trasy z listami (GET) przez klienta testowego; strona rankingu "deep" wyliczana z liczby filmów
+LIST_ROUTES = ('/dashboard', '/movies-list', '/watched', '/favorites', '/ranking', '/all_genres', '/all_keywords')
+BENCH_ACCOUNT = ('rampam@gmail.com', 'rampam123')
+GROUPS = ('load', 'recommend', 'search', 'top', 'lists', 'routes')
+
+
+def timings(calls, warmup=0):
+    """Czasy (ms) kolejnych wywołań bezargumentowych funkcji z ``calls``; pierwsze ``warmup`` pominięte."""
+    samples = []
+    for i, call in enumerate(calls):
+        start = time.perf_counter()
+        call()
+        elapsed = (time.perf_counter() - start) * 1000
+        if i >= warmup:
+            samples.append(elapsed)
+    return summarize(samples)
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        'runs': len(ordered),
+        'min_ms': round(ordered[0], 3),
+        'median_ms': round(statistics.median(ordered), 3),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 3),
+    }
+
+
+def dataset_info(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return {
+            'db': os.path.basename(db_path),
+            'movies': conn.execute("SELECT COUNT(*) FROM movies").fetchone()[0],
+            'ratings': conn.execute("SELECT COUNT(*) FROM ratings").fetchone()[0],
+            'ranked_movies': conn.execute("SELECT COUNT(*) FROM movies WHERE vote_average IS NOT NULL "
+                                          "AND vote_count >= 1000").fetchone()[0],
+        }
+    finally:
+        conn.close()
+
+
+def sample_titles(db_path, n, seed):
+    """Tytuły do zapytań o rekomendacje: połowa z najpopularniejszych filmów, połowa losowa z ocenianych."""
+    conn = sqlite3.connect(db_path)
+    try:
+        popular = [row[0] for row in conn.execute(
+            "SELECT title FROM movies ORDER BY vote_count DESC LIMIT ?", (n,))]
+        rated = [row[0] for row in conn.execute(
+            "SELECT title FROM movies WHERE movie_id IN (SELECT DISTINCT movie_id FROM ratings)")]
+    finally:
+        conn.close()
+    rng = random.Random(seed)
+    titles = popular[:n - n // 2] + rng.sample(rated, min(len(rated), n // 2))
+    rng.shuffle(titles)
+    return titles
+
+
+def run_suite(db_path, groups, repeat, queries, seed):
+    """Wszystkie przypadki z wybranych grup; zwraca {nazwa: statystyki}."""
+    # moduły aplikacji czytają konfigurację przy imporcie - zmienne środowiskowe ustawia main()
+    from app import create_app
+    from app.db_utils import get_all_genres, get_all_keywords, get_top_movies, search_movies
+    from app.recommender import get_recommendations, load_and_prepare_data, recommendation_cache
+
+    results = {}
+    dataset = dataset_info(db_path)
+
+    if 'load' in groups:
+        results['load_and_prepare_data[build]'] = timings([load_and_prepare_data])
+        results['load_and_prepare_data[open]'] = timings([load_and_prepare_data] * repeat)
+
+    app = create_app(preload_model=True)
+
+    if 'recommend' in groups:
+        titles = sample_titles(db_path, queries, seed)
+
+        def cold(title):
+            recommendation_cache.clear()
+            get_recommendations(title, n=20)
+
+        results['get_recommendations[cold]'] = timings([lambda t=t: cold(t) for t in titles])
+        # pierwszy przebieg wypełnia pamięć podręczną, mierzony jest drugi
+        results['get_recommendations[warm]'] = timings(
+            [lambda t=t: get_recommendations(t, n=20) for t in titles * 2], warmup=len(titles))
+        results['get_recommendations[exclude]'] = timings(
+            [lambda t=t: get_recommendations(t, n=20, exclude_titles=titles[:5]) for t in titles])
+
+    if 'search' in groups:
+        cases = {
+            'title': {'title': 'the lost'},
+            'genre': {'genre': 'drama'},
+            'year': {'year': 2014},
+            'keywords': {'keywords': 'space'},
+            'combined': {'title': 'star', 'genre': 'sci-fi', 'keywords': 'rescue'},
+        }
+        for name, kwargs in cases.items():
+            results[f'search_movies[{name}]'] = timings([lambda kw=kwargs: search_movies(**kw)] * repeat, warmup=1)
+
+    if 'top' in groups:
+        for label, min_votes, eligible in (('ranked', 1000, dataset['ranked_movies']),
+                                           ('all', 0, dataset['movies'])):
+            for depth in (0, 0.5, 1.0):
+                offset = max(0, int(eligible * depth) - 20)
+                results[f'get_top_movies[{label},offset={offset}]'] = timings(
+                    [lambda mv=min_votes, o=offset: get_top_movies(limit=20, min_votes=mv, offset=o)] * repeat,
+                    warmup=1)
+
+    if 'lists' in groups:
+        results['get_all_keywords'] = timings([get_all_keywords] * repeat, warmup=1)
+        results['get_all_genres'] = timings([get_all_genres] * repeat, warmup=1)
+
+    if 'routes' in groups:
+        client = app.test_client()
+        email, password = BENCH_ACCOUNT
+        response = client.post('/login', data={'email': email, 'password': password})
+        if response.status_code != 302:
+            raise RuntimeError(f"logowanie {email} nie powiodło się (kod {response.status_code})")
+        deep_page = max(1, dataset['ranked_movies'] // 20)
+        urls = list(LIST_ROUTES) + [f'/ranking?page={deep_page}']
+
+        def get(url):
+            response = client.get(url)
+            if response.status_code != 200:
+                raise RuntimeError(f"GET {url}: kod {response.status_code}")
+
+        for url in urls:
+            results[f'GET {url}'] = timings([lambda u=url: get(u)] * repeat, warmup=1)
+        results['POST /search'] = timings(
+            [lambda: client.post('/search', data={'title': 'the lost', 'genre': 'Drama'})] * repeat, warmup=1)
+    return results
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """Wiersze porównania (nazwa, mediana odniesienia, mediana, stosunek, status) i lista regresji."""
+    rows, regressions = [], []
+    for name, current in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            rows.append((name, None, current['median_ms'], None, 'nowy'))
+            continue
+        before, after = reference['median_ms'], current['median_ms']
+        ratio = after / before if before > 0 else float('inf')
+        if ratio > 1 + tolerance and after - before > min_delta_ms:
+            status = 'REGRESJA'
+            regressions.append(name)
+        elif ratio < 1 / (1 + tolerance) and before - after > min_delta_ms:
+            status = 'szybciej'
+        else:
+            status = 'ok'
+        rows.append((name, before, after, ratio, status))
+    return rows, regressions
+
+
+def _fmt(value, digits=3):
+    return '-' if value is None else f"{value:.{digits}f}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', help="syntetyczna baza (domyślnie benchmarks/data/<skala>.db)")
+    parser.add_argument('--scale', default='small', help="skala generowanej bazy, gdy jej brak")
+    parser.add_argument('--only', nargs='+', choices=GROUPS, default=list(GROUPS), help="grupy przypadków")
+    parser.add_argument('--repeat', type=int, default=20, help="powtórzenia przypadków z ciepłą bazą")
+    parser.add_argument('--queries', type=int, default=50, help="liczba tytułów w zapytaniach o rekomendacje")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="plik wyników JSON (domyślnie benchmarks/data/results-<baza>.json)")
+    parser.add_argument('--baseline', help="punkt odniesienia (domyślnie benchmarks/data/baseline-<baza>.json)")
+    parser.add_argument('--save-baseline', action='store_true', help="zapisz wyniki jako nowy punkt odniesienia")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="dopuszczalny względny wzrost mediany")
+    parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                        help="wzrost mediany poniżej tej wartości nie jest regresją (szum pomiaru)")
+    args = parser.parse_args(argv)
+
+    db_path = os.path.abspath(args.db or os.path.join(DATA_DIR, f'{args.scale}.db'))
+    name = os.path.splitext(os.path.basename(db_path))[0]
+    output = args.output or os.path.join(DATA_DIR, f'results-{name}.json')
+    baseline_path = args.baseline or os.path.join(DATA_DIR, f'baseline-{name}.json')
+
+    # konfiguracja aplikacji czytana jest przy imporcie - ustawiamy ją przed importem app
+    work_dir = tempfile.mkdtemp(prefix='moviemaniac-bench-')
+    os.environ['MOVIEMANIAC_DB'] = db_path
+    os.environ['MOVIEMANIAC_MODEL_DIR'] = os.path.join(work_dir, 'model')
+    os.environ['MOVIEMANIAC_RATINGS_STORE_DIR'] = os.path.join(work_dir, 'ratings_store')
+    try:
+        if not os.path.exists(db_path):
+            from benchmarks.generate_dataset import main as generate_main
+            print(f"BENCH INFO: Brak {db_path} - generowanie bazy w skali '{args.scale}'.")
+            generate_main(['--scale', args.scale, '--db', db_path, '--seed', str(args.seed)])
+        results = run_suite(db_path, args.only, args.repeat, args.queries, args.seed)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'dataset': dataset_info(db_path),
+        'environment': {'python': platform.python_version(), 'numpy': np.__version__,
+                        'platform': platform.platform(), 'cpus': os.cpu_count()},
+        'settings': {'repeat': args.repeat, 'queries': args.queries, 'seed': args.seed},
+        'results': results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    baseline = None
+    if os.path.exists(baseline_path) and not args.save_baseline:
+        with open(baseline_path, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('dataset') != report['dataset']:
+            print(f"BENCH INFO: Inna baza niż w punkcie odniesienia ({baseline.get('dataset')}) - "
+                  f"porównanie może być niemiarodajne.")
+
+    rows, regressions = compare(results, baseline['results'] if baseline else {}, args.tolerance, args.min_delta_ms)
+    width = max(len(row[0]) for row in rows) + 2
+    print(f"{'przypadek':<{width}}{'odniesienie ms':>16}{'mediana ms':>12}{'p95 ms':>10}{'x':>7}  status")
+    for case, before, after, ratio, status in rows:
+        print(f"{case:<{width}}{_fmt(before):>16}{_fmt(after):>12}{_fmt(results[case]['p95_ms']):>10}"
+              f"{_fmt(ratio, 2):>7}  {status}")
+    print(f"BENCH INFO: Wyniki zapisane w {output}.")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(baseline_path)), exist_ok=True)
+        shutil.copyfile(output, baseline_path)
+        print(f"BENCH INFO: Zapisano punkt odniesienia {baseline_path}.")
+    elif baseline is None:
+        print(f"BENCH INFO: Brak punktu odniesienia {baseline_path} (--save-baseline zapisuje bieżące wyniki).")
+
+    if regressions:
+        for case in regressions:
+            print(f"BŁĄD: Regresja wydajności: {case}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
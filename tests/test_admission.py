@@ -0,0 +1,49 @@
+import threading
+
+import pytest
+
+from app.admission import BoundedExecutor, Overloaded
+
+
+def _occupy(executor):
+    """Zajmuje jedyny wątek puli do czasu ustawienia zwróconego zdarzenia"""
+    started, release = threading.Event(), threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    thread = threading.Thread(target=executor.run, args=(block,))
+    thread.start()
+    assert started.wait(5)
+    return release, thread
+
+
+def test_executor_rejects_when_queue_full():
+    """Zadanie ponad limit wątków i kolejki dostaje od razu Overloaded"""
+    executor = BoundedExecutor(max_workers=1, max_queue=0, queue_timeout=5)
+    release, thread = _occupy(executor)
+    try:
+        with pytest.raises(Overloaded):
+            executor.run(lambda: 1)
+    finally:
+        release.set()
+        thread.join(5)
+
+    assert executor.stats()['rejected'] == 1
+
+
+def test_executor_times_out_in_queue():
+    """Zadanie czekające w kolejce dłużej niż queue_timeout dostaje Overloaded i nie jest wykonywane"""
+    executor = BoundedExecutor(max_workers=1, max_queue=1, queue_timeout=0.05)
+    calls = []
+    release, thread = _occupy(executor)
+    try:
+        with pytest.raises(Overloaded):
+            executor.run(calls.append, 1)
+    finally:
+        release.set()
+        thread.join(5)
+
+    assert executor.stats()['timed_out'] == 1
+    assert calls == []
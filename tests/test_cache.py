@@ -0,0 +1,38 @@
+import time
+
+from app.cache import LRUCache
+
+
+def test_lru_evicts_least_recently_used_by_bytes():
+    """Po przekroczeniu limitu bajtów wypadają najdawniej używane wpisy"""
+    cache = LRUCache(max_bytes=10, sizeof=len)
+    cache.set('a', 'xxxx')
+    cache.set('b', 'xxxx')
+    assert cache.get('a') == 'xxxx'
+    cache.set('c', 'xxxx')
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 'xxxx' and cache.get('c') == 'xxxx'
+    assert cache.bytes == 8 and cache.evictions == 1
+
+
+def test_lru_rejects_value_larger_than_limit():
+    """Wartość większa niż cały limit nie wypycha pozostałych wpisów"""
+    cache = LRUCache(max_bytes=10, sizeof=len)
+    cache.set('a', 'xxxx')
+    cache.set('big', 'x' * 11)
+
+    assert cache.get('big') is None
+    assert cache.get('a') == 'xxxx'
+    assert cache.rejected == 1
+
+
+def test_lru_entry_expires_after_ttl():
+    """Wpis starszy niż ttl jest chybieniem i znika z pamięci"""
+    cache = LRUCache(ttl=0.05)
+    cache.set('a', 1)
+    assert cache.get('a') == 1
+    time.sleep(0.1)
+
+    assert cache.get('a') is None
+    assert len(cache) == 0 and cache.expirations == 1
@@ -0,0 +1,89 @@
+import base64
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app import recommender
+from app.recommender import StaleCursor, _decode_cursor, _encode_cursor, get_recommendation_page
+
+
+def _raw_cursor(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def test_cursor_round_trip():
+    """Kursor odtwarza wersję modelu, film i przesunięcie"""
+    cursor = _encode_cursor('20240101-120000-abcdef12', 1, 40)
+    assert _decode_cursor(cursor) == ('20240101-120000-abcdef12', 1, 40)
+
+
+@pytest.mark.parametrize('cursor', [
+    'nie-kursor',
+    _raw_cursor({'version': 'v'}),
+    _raw_cursor(['v', 1]),
+    _raw_cursor([1, 1, 0]),
+    _raw_cursor([None, 1, 0]),
+    _raw_cursor(['v', 'abc', 0]),
+    _raw_cursor(['v', 1, -20]),
+])
+def test_cursor_rejected(cursor):
+    """Zniekształcony kursor kończy się ValueError (trasa odpowiada wtedy 400)"""
+    with pytest.raises(ValueError):
+        _decode_cursor(cursor)
+
+
+class _Holder:
+    """Zastępczy model_holder: bieżący model i wersja, na którą przejdzie sync_with_current"""
+
+    def __init__(self, version, newer=None):
+        self.model = SimpleNamespace(version=version, title_to_id={})
+        self.newer = newer
+
+    def get(self):
+        return self.model
+
+    def sync_with_current(self):
+        if self.newer is None:
+            return False
+        self.model, self.newer = SimpleNamespace(version=self.newer, title_to_id={}), None
+        return True
+
+
+@pytest.fixture
+def ranked_lists(monkeypatch):
+    """Listy rankingowe istnieją tylko dla wersji bieżącego modelu (jak po wygaśnięciu starych)"""
+    def ranked_list(model, movie_id, version, admit=True):
+        return [{'id': i, 'version': model.version} for i in range(10)], model.version
+
+    monkeypatch.setattr(recommender, '_ranked_list', ranked_list)
+
+    def use(holder):
+        monkeypatch.setattr(recommender, 'model_holder', holder)
+        return holder
+    return use
+
+
+def test_cursor_same_version_continues(ranked_lists):
+    """Kursor bieżącej wersji to kolejny wycinek tej samej listy"""
+    ranked_lists(_Holder('v2'))
+    page, cursor = get_recommendation_page(cursor=_encode_cursor('v2', 1, 5), n=3)
+
+    assert [movie['id'] for movie in page] == [5, 6, 7]
+    assert _decode_cursor(cursor) == ('v2', 1, 8)
+
+
+def test_cursor_from_unavailable_version_is_stale(ranked_lists):
+    """Kursor wersji, której rankingu nie ma, nie zaczyna listy od nowa (powtórki) - StaleCursor"""
+    ranked_lists(_Holder('v1'))
+    with pytest.raises(StaleCursor):
+        get_recommendation_page(cursor=_encode_cursor('v2', 1, 5), n=3)
+
+
+def test_cursor_from_newer_version_switches_model(ranked_lists):
+    """Kursor z nowszej wersji przełącza proces, który jeszcze na nią nie przeszedł"""
+    ranked_lists(_Holder('v1', newer='v2'))
+    page, cursor = get_recommendation_page(cursor=_encode_cursor('v2', 1, 5), n=3)
+
+    assert [(movie['id'], movie['version']) for movie in page] == [(5, 'v2'), (6, 'v2'), (7, 'v2')]
+    assert _decode_cursor(cursor) == ('v2', 1, 8)
@@ -0,0 +1,63 @@
+import sqlite3
+
+import numpy as np
+
+from app.model_store import (
+    build_item_user_matrix,
+    ensure_change_tracking,
+    get_db_state,
+    only_appended,
+    patch_item_user_matrix
+)
+
+
+def test_patch_matches_full_build():
+    """Nałożenie nowych ocen na macierz daje to samo co pełna budowa ze wszystkich ocen"""
+    old = (np.array([10, 10, 20, 30]), np.array([1, 2, 1, 3]), np.array([4.0, 3.0, 5.0, 2.0]))
+    # nadpisanie pary (10, 1), nowy film 25, nowy użytkownik 7, usunięcie oceny (30, 3) zerem
+    new = (np.array([10, 25, 20, 30]), np.array([1, 7, 2, 3]), np.array([1.5, 4.5, 3.5, 0.0]))
+
+    movie_index, matrix, user_ids = build_item_user_matrix(*old)
+    patched_index, patched, patched_users, changed_rows, _ = patch_item_user_matrix(
+        movie_index, matrix, user_ids, new[0], new[1], new[2])
+    full_index, full, full_users = build_item_user_matrix(*(np.concatenate(pair) for pair in zip(old, new)))
+
+    assert np.array_equal(patched_index.ids, full_index.ids)
+    assert np.array_equal(patched_users, full_users)
+    assert np.array_equal(patched.toarray(), full.toarray())
+    assert patched.nnz == full.nnz
+    assert sorted(patched_index.ids[changed_rows]) == [10, 20, 25, 30]
+
+
+def _ratings_db():
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE movies (movie_id INTEGER PRIMARY KEY, title TEXT)")
+    conn.execute("CREATE TABLE ratings (user_id INTEGER, movie_id INTEGER, rating REAL, timestamp INTEGER)")
+    conn.executemany("INSERT INTO ratings VALUES (?, ?, ?, 0)", [(1, 10, 4.0), (2, 10, 3.0)])
+    conn.commit()
+    return conn
+
+
+def test_db_state_does_not_change_schema():
+    """Odczyt stanu bazy nie zakłada wyzwalaczy - bez nich stan zmian jest nieznany (pełna budowa)"""
+    conn = _ratings_db()
+    schema = conn.execute("SELECT name FROM sqlite_master").fetchall()
+    state = get_db_state(conn)
+
+    assert conn.execute("SELECT name FROM sqlite_master").fetchall() == schema
+    assert state['ratings']['changes'] is None
+    assert not only_appended(state['ratings'], state['ratings'], 0)
+
+
+def test_change_counter_detects_update_in_place():
+    """UPDATE oceny nie zmienia liczności ani rowid, ale zmienia licznik zmian"""
+    conn = _ratings_db()
+    assert ensure_change_tracking(conn)
+    old = get_db_state(conn)['ratings']
+    conn.execute("INSERT INTO ratings VALUES (3, 10, 5.0, 0)")
+    appended = get_db_state(conn)['ratings']
+    conn.execute("UPDATE ratings SET rating = 1.0 WHERE user_id = 1")
+    updated = get_db_state(conn)['ratings']
+
+    assert only_appended(old, appended, 1)
+    assert not only_appended(old, updated, 1)
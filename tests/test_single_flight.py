@@ -0,0 +1,37 @@
+import threading
+import time
+
+from app.cache import SingleFlight
+
+
+def test_single_flight_propagates_error_to_waiters():
+    """Wyjątek z obliczenia dostaje zarówno wątek liczący, jak i czekający"""
+    flights = SingleFlight()
+    release = threading.Event()
+    errors = []
+
+    def compute():
+        release.wait(5)
+        raise RuntimeError('błąd obliczenia')
+
+    def call(fn):
+        try:
+            flights.do('key', fn)
+        except RuntimeError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=call, args=(compute,))
+    leader.start()
+    while flights.stats()['in_flight'] == 0:
+        time.sleep(0.001)
+    waiter = threading.Thread(target=call, args=(lambda: 'nie powinno się liczyć',))
+    waiter.start()
+    while flights.stats()['coalesced'] == 0:
+        time.sleep(0.001)
+    release.set()
+    leader.join(5)
+    waiter.join(5)
+
+    assert len(errors) == 2 and errors[0] is errors[1]
+    stats = flights.stats()
+    assert stats['computations'] == 1 and stats['errors'] == 1 and stats['in_flight'] == 0